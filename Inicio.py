@@ -245,6 +245,14 @@ if __name__ == "__main__":
             use_container_width=True
         )
     
+    st.markdown("")
+    st.page_link(
+        "pages/4_🔍_Buscar_Transcripciones.py",
+        label="🔍 Buscar en todas las transcripciones guardadas",
+        icon="🔍",
+        use_container_width=True
+    )
+    
     st.markdown("---")
     
     # Sección de tecnologías
@@ -0,0 +1,261 @@
+"""
+API HTTP local para enviar audios y recoger transcripciones sin la interfaz.
+
+Corre junto a la aplicación Streamlit y usa la misma lógica de lotes y de
+división que las páginas y que cli.py:
+
+    python api.py --port 8765
+
+    # ZIP o un único audio; opciones en la query string
+    curl -X POST --data-binary @audios.zip "http://127.0.0.1:8765/jobs/transcribe?keywords=robo,emergencia&filename=audios.zip"
+    curl -X POST --data-binary @grabacion.mp3 "http://127.0.0.1:8765/jobs/split?filename=grabacion.mp3&interval_minutes=5"
+    curl -N http://127.0.0.1:8765/jobs/<id>/events      # progreso en líneas JSON hasta terminar
+    curl http://127.0.0.1:8765/jobs/<id>/result         # resultados en JSON
+    curl -o r.zip http://127.0.0.1:8765/jobs/<id>/archive
+    curl -X DELETE http://127.0.0.1:8765/jobs/<id>      # detener (o borrar si ya terminó)
+
+Los clientes se identifican con la cabecera X-Client-Id (o su IP) y solo ven sus
+propios trabajos; cada uno puede tener un número limitado de trabajos activos.
+Los trabajos terminados se borran pasadas JOB_RETENTION_HOURS horas (24 por defecto).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.jobs import ClientLimitError, JobManager
+
+# Configuración del servicio (configurable por entorno)
+API_HOST = os.environ.get('API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('API_PORT', '8765'))
+API_RUNNERS = int(os.environ.get('API_RUNNERS', '1'))
+API_MAX_JOBS_PER_CLIENT = int(os.environ.get('API_MAX_JOBS_PER_CLIENT', '2'))
+API_MAX_UPLOAD_MB = int(os.environ.get('API_MAX_UPLOAD_MB', '2048'))
+API_MAX_WORKERS = 8
+
+JOB_PATH = re.compile(r'^/jobs/(?P<id>[0-9a-f]+)(?:/(?P<action>events|result|archive))?$')
+TRUE_VALUES = ('1', 'true', 'yes', 'si', 'sí')
+
+
+class BadRequest(Exception):
+    """Invalid job parameters"""
+
+
+def query_flag(query: Dict, name: str, default: bool) -> bool:
+    if name not in query:
+        return default
+    return query[name][-1].strip().lower() in TRUE_VALUES
+
+
+def query_int(query: Dict, name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(query[name][-1]) if name in query else default
+    except ValueError:
+        raise BadRequest(f"'{name}' debe ser un entero")
+    if not low <= value <= high:
+        raise BadRequest(f"'{name}' debe estar entre {low} y {high}")
+    return value
+
+
+def transcribe_params(query: Dict) -> Dict:
+    """Batch options from the query string (keywords may be repeated or comma-separated)"""
+    from utils.profiles import DEFAULT_PROFILE, PROFILES
+
+    keywords = [k.strip() for value in query.get('keywords', []) for k in value.split(',') if k.strip()]
+    if not keywords:
+        raise BadRequest("Indica al menos una palabra clave en 'keywords'")
+    profile = query.get('profile', [DEFAULT_PROFILE])[-1]
+    if profile not in PROFILES:
+        raise BadRequest(f"Perfil desconocido: {profile}")
+    return {
+        'keywords': keywords,
+        'workers': query_int(query, 'workers', 1, 1, API_MAX_WORKERS),
+        'watchdog': query_flag(query, 'watchdog', True),
+        'streaming': query_flag(query, 'streaming', False),
+        'cascade': query_flag(query, 'cascade', False),
+        'profile': profile,
+        'tolerance': query_int(query, 'tolerance', 0, 0, 2),
+        'budget_minutes': query_int(query, 'budget_minutes', 0, 0, 24 * 60),
+    }
+
+
+def split_params(query: Dict) -> Dict:
+    """Splitter options from the query string"""
+    output_format = query.get('format', ['mp3'])[-1]
+    quality = query.get('quality', ['medium'])[-1]
+    if output_format not in ('mp3', 'wav', 'm4a'):
+        raise BadRequest(f"Formato no soportado: {output_format}")
+    if quality not in ('low', 'medium', 'high', 'very_high'):
+        raise BadRequest(f"Calidad desconocida: {quality}")
+    return {
+        'interval_minutes': query_int(query, 'interval_minutes', 2, 1, 30),
+        'silence_detection': query_flag(query, 'silence_detection', True),
+        'min_silence_len': query_int(query, 'min_silence_len', 1000, 500, 3000),
+        'silence_thresh': query_int(query, 'silence_thresh', 16, 10, 30),
+        'format': output_format,
+        'quality': quality,
+        'budget_minutes': query_int(query, 'budget_minutes', 0, 0, 24 * 60),
+    }
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """Rutas de la API; `server.jobs` es el JobManager compartido"""
+
+    server_version = 'isterAudioAPI/1.0'
+
+    @property
+    def client(self) -> str:
+        return self.headers.get('X-Client-Id') or self.client_address[0]
+
+    def send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str) -> None:
+        self.send_json(status, {'error': message})
+
+    def find_job(self, path: str):
+        match = JOB_PATH.match(path)
+        job = self.server.jobs.get(match['id'], self.client) if match else None
+        if job is None:
+            self.send_error_json(404, "Trabajo no encontrado")
+        return job, match['action'] if match else None
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path == '/health':
+            return self.send_json(200, {'status': 'ok'})
+        if path == '/jobs':
+            return self.send_json(200, {'jobs': [job.info() for job in self.server.jobs.list(self.client)]})
+        job, action = self.find_job(path)
+        if job is None:
+            return
+        if action is None:
+            return self.send_json(200, job.info())
+        if action == 'events':
+            return self.stream_events(job)
+        if not job.finished:
+            return self.send_error_json(409, f"El trabajo aún no ha terminado ({job.state})")
+        if action == 'result':
+            return self.send_json(200, dict(job.info(), result=job.result))
+        if not job.archive_path:
+            return self.send_error_json(404, "El trabajo no generó archivos")
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(os.path.getsize(job.archive_path)))
+        self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(job.archive_path)}"')
+        self.end_headers()
+        with open(job.archive_path, 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                self.wfile.write(chunk)
+
+    def stream_events(self, job) -> None:
+        """Every event so far and then the new ones, one JSON per line, until the job ends"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        sent = 0
+        try:
+            while True:
+                events, finished = self.server.jobs.wait_events(job, sent)
+                for event in events:
+                    self.wfile.write((json.dumps(event, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+                sent += len(events)
+                self.wfile.flush()
+                if finished and not events:
+                    break
+            self.wfile.write((json.dumps(dict(job.info(), event='end'), default=str) + '\n').encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente dejó de escuchar; el trabajo sigue
+            pass
+        self.close_connection = True
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        kind = {'/jobs/transcribe': 'transcribe', '/jobs/split': 'split'}.get(parsed.path.rstrip('/'))
+        if kind is None:
+            return self.send_error_json(404, "Ruta no encontrada")
+        query = parse_qs(parsed.query)
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            return self.send_error_json(411, "Falta Content-Length")
+        if length <= 0:
+            return self.send_error_json(400, "El cuerpo debe contener el archivo")
+        if length > API_MAX_UPLOAD_MB * 1024 * 1024:
+            return self.send_error_json(413, f"El archivo supera {API_MAX_UPLOAD_MB} MB")
+        filename = query.get('filename', [self.headers.get('X-Filename') or ''])[-1]
+        if not os.path.basename(filename):
+            filename = 'audios.zip' if kind == 'transcribe' else ''
+        if not filename:
+            return self.send_error_json(400, "Indica el nombre del audio en 'filename'")
+        try:
+            params = transcribe_params(query) if kind == 'transcribe' else split_params(query)
+            job = self.server.jobs.submit(kind, self.client, params, filename, self.rfile, length)
+        except BadRequest as e:
+            return self.send_error_json(400, str(e))
+        except ClientLimitError as e:
+            return self.send_error_json(429, str(e))
+        except ValueError as e:
+            # Subida cortada antes de Content-Length
+            return self.send_error_json(400, str(e))
+        self.send_json(202, dict(job.info(), links={
+            'status': f"/jobs/{job.id}", 'events': f"/jobs/{job.id}/events",
+            'result': f"/jobs/{job.id}/result", 'archive': f"/jobs/{job.id}/archive",
+        }))
+
+    def do_DELETE(self):
+        job, action = self.find_job(urlparse(self.path).path.rstrip('/'))
+        if job is None:
+            return
+        if action is not None:
+            return self.send_error_json(405, "Solo se puede borrar el trabajo")
+        if job.finished:
+            self.server.jobs.delete(job)
+            return self.send_json(200, {'id': job.id, 'deleted': True})
+        self.server.jobs.cancel(job)
+        self.send_json(202, job.info())
+
+
+def create_server(host: str = API_HOST, port: int = API_PORT, jobs: Optional[JobManager] = None) -> ThreadingHTTPServer:
+    """HTTP server bound to `host:port` (port 0 picks a free one)"""
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.jobs = jobs or JobManager(API_RUNNERS, API_MAX_JOBS_PER_CLIENT)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=API_HOST, help="Interfaz de escucha (por defecto solo local)")
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--runners', type=int, default=API_RUNNERS, help="Trabajos ejecutados a la vez")
+    parser.add_argument('--max-jobs-per-client', type=int, default=API_MAX_JOBS_PER_CLIENT,
+                        help="Trabajos en cola o en curso permitidos por cliente")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, JobManager(args.runners, args.max_jobs_per_client))
+    print(f"API escuchando en http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.jobs.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import os
+from typing import List, Optional, Tuple
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.wave', '.m4a', '.flac', '.aac', '.ogg')
+
+
+def list_audio_files(audio_dir: str, require_reference: bool = True) -> List[Tuple[str, Optional[str]]]:
+    """
+    (audio, reference) pairs of a benchmark set. A reference is the .txt file
+    with the same base name next to the audio, or None if it does not exist.
+    """
+    pairs = []
+    for name in sorted(os.listdir(audio_dir)):
+        base, ext = os.path.splitext(name)
+        if ext.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference = os.path.join(audio_dir, base + '.txt')
+        if not os.path.exists(reference):
+            if require_reference:
+                continue
+            reference = None
+        pairs.append((os.path.join(audio_dir, name), reference))
+    return pairs
+
+
+def read_reference(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
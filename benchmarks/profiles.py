@@ -0,0 +1,98 @@
+"""
+Factor de tiempo real (RTF) de cada perfil de decodificación.
+
+Transcribe todos los audios del directorio con cada perfil y reporta RTF,
+porcentaje de segmentos re-decodificados por temperatura y, si hay
+referencias .txt junto a los audios, el WER.
+
+    python benchmarks/profiles.py --audio-dir bench_audio --model base
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import list_audio_files, read_reference
+
+
+def run_profile(backend, profile, files, language: str) -> dict:
+    """Transcribe the whole set with one profile"""
+    import whisper
+    from utils.metrics import word_errors
+
+    audio_seconds = transcribe_seconds = 0.0
+    segments = fallback_segments = 0
+    edits = reference_words = 0
+    for audio_path, reference_path in files:
+        audio = whisper.load_audio(audio_path)
+        audio_seconds += len(audio) / whisper.audio.SAMPLE_RATE
+
+        start = time.time()
+        result = backend.transcribe(audio, language=language, verbose=None, **profile.transcribe_options())
+        transcribe_seconds += time.time() - start
+
+        segments += len(result.get('segments', []))
+        fallback_segments += len([s for s in result.get('segments', []) if s.get('temperature', 0) > 0])
+        if reference_path:
+            file_edits, file_words = word_errors(read_reference(reference_path), result.get('text', ''))
+            edits += file_edits
+            reference_words += file_words
+
+    return {
+        'profile': profile.name,
+        'audio_seconds': audio_seconds,
+        'transcribe_seconds': transcribe_seconds,
+        'rtf': transcribe_seconds / audio_seconds if audio_seconds else 0.0,
+        'fallback_ratio': fallback_segments / segments if segments else 0.0,
+        'wer': edits / reference_words if reference_words else None,
+    }
+
+
+def format_table(rows) -> str:
+    lines = [
+        "| Perfil | RTF | Audio (s) | Proceso (s) | Re-decodificados | WER |",
+        "|---|---|---|---|---|---|",
+    ]
+    for row in rows:
+        wer = f"{row['wer']:.1%}" if row['wer'] is not None else "—"
+        lines.append(
+            f"| {row['profile']} | {row['rtf']:.3f} | {row['audio_seconds']:.1f} | "
+            f"{row['transcribe_seconds']:.1f} | {row['fallback_ratio']:.1%} | {wer} |"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    from utils.backends import create_backend
+    from utils.profiles import PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', required=True, help="Directorio con los audios de prueba")
+    parser.add_argument('--model', default=None, help="Modelo Whisper (por defecto WHISPER_MODEL)")
+    parser.add_argument('--backend', default='whisper', choices=['whisper', 'fake'])
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--language', default='es')
+    parser.add_argument('--json', help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    files = list_audio_files(args.audio_dir, require_reference=False)
+    if not files:
+        sys.exit(f"No hay audios en {args.audio_dir}")
+
+    backend = create_backend(args.backend, model_name=args.model)
+    rows = []
+    for name in args.profiles:
+        rows.append(run_profile(backend, PROFILES[name], files, args.language))
+        print(f"✓ {name}", file=sys.stderr)
+
+    print(format_table(rows))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark FP32 vs int8 dinámico en CPU sobre un conjunto local de audios.
+
+El directorio de audios debe contener, junto a cada archivo, una referencia
+con el mismo nombre y extensión .txt (p. ej. llamada_01.wav + llamada_01.txt).
+Cada configuración se ejecuta en un proceso aparte para medir la memoria pico.
+
+    python benchmarks/quantization.py --audio-dir bench_audio --models base small
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import list_audio_files, read_reference
+
+
+def run_single(model_name: str, quantized: bool, audio_dir: str, language: str) -> dict:
+    """Load one configuration and transcribe the whole set (runs in a child process)"""
+    import torch
+    import whisper
+    from utils.metrics import word_errors
+    from utils.models import load_whisper_model
+
+    torch.set_num_threads(os.cpu_count() or 1)
+
+    start = time.time()
+    model = load_whisper_model(model_name, quantized=quantized, device='cpu')
+    load_seconds = time.time() - start
+
+    audio_seconds = transcribe_seconds = 0.0
+    edits = reference_words = 0
+    for audio_path, reference_path in list_audio_files(audio_dir):
+        audio = whisper.load_audio(audio_path)
+        audio_seconds += len(audio) / whisper.audio.SAMPLE_RATE
+
+        start = time.time()
+        result = model.transcribe(audio, language=language, fp16=False, verbose=None)
+        transcribe_seconds += time.time() - start
+
+        file_edits, file_words = word_errors(read_reference(reference_path), result.get('text', ''))
+        edits += file_edits
+        reference_words += file_words
+
+    return {
+        'model': model_name,
+        'mode': 'int8' if quantized else 'fp32',
+        'load_seconds': load_seconds,
+        'audio_seconds': audio_seconds,
+        'transcribe_seconds': transcribe_seconds,
+        'rtf': transcribe_seconds / audio_seconds if audio_seconds else 0.0,
+        'throughput': audio_seconds / transcribe_seconds if transcribe_seconds else 0.0,
+        # ru_maxrss está en KiB en Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'wer': edits / reference_words if reference_words else 0.0,
+    }
+
+
+def format_table(rows) -> str:
+    lines = [
+        "| Modelo | Modo | RTF | Audio s / CPU s | Memoria pico (MB) | WER | Carga (s) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for row in rows:
+        lines.append(
+            f"| {row['model']} | {row['mode']} | {row['rtf']:.3f} | {row['throughput']:.2f} | "
+            f"{row['peak_rss_mb']:.0f} | {row['wer']:.1%} | {row['load_seconds']:.1f} |"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', required=True, help="Directorio con audios y referencias .txt")
+    parser.add_argument('--models', nargs='+', default=['base'], help="Modelos Whisper a comparar")
+    parser.add_argument('--language', default='es')
+    parser.add_argument('--json', help="Guardar los resultados en este archivo JSON")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--quantized', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.models[0], args.quantized, args.audio_dir, args.language)))
+        return
+
+    if not list_audio_files(args.audio_dir):
+        sys.exit(f"No hay pares audio/.txt en {args.audio_dir}")
+
+    rows = []
+    for model_name in args.models:
+        for quantized in (False, True):
+            cmd = [sys.executable, os.path.abspath(__file__), '--single',
+                   '--audio-dir', args.audio_dir, '--models', model_name, '--language', args.language]
+            if quantized:
+                cmd.append('--quantized')
+            output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+            rows.append(json.loads(output.strip().splitlines()[-1]))
+            print(f"✓ {model_name} {'int8' if quantized else 'fp32'}", file=sys.stderr)
+
+    print(format_table(rows))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""
+Transcripción por lotes y división de audio sin navegador (cron, scripts).
+
+Usa la misma lógica que las páginas de lotes y de división:
+
+    python cli.py transcribe audios.zip --keywords robo emergencia --output resultados --workers 2
+    python cli.py transcribe carpeta_audios/ --keywords auxilio --output resultados --progress json
+    python cli.py split grabacion.mp3 --output segmentos --interval-minutes 5 --zip segmentos.zip
+
+Varios equipos pueden repartirse un lote a través de una cola compartida
+(SQLite en un disco común, WORK_QUEUE_DB):
+
+    python cli.py enqueue audios.zip --keywords robo emergencia --chunk-minutes 10   # imprime el id del lote
+    python cli.py worker --workers 2                    # en cada equipo; --exit-when-idle para terminar
+    python cli.py collect <lote> --output resultados --zip resultados.zip
+
+Con --progress json cada evento (start, file/segment, done) se escribe como una
+línea JSON en stdout; con text, un resumen legible en stderr. SIGINT/SIGTERM
+detienen el trabajo en la siguiente frontera y conservan lo terminado (una
+segunda señal lo aborta). Código de salida: 0 si todo se procesó, 1 si hubo
+errores o quedaron archivos pendientes.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.cancellation import CancelToken
+
+
+class ProgressLog:
+    """Progress events as JSON lines on stdout, or short readable lines on stderr"""
+
+    def __init__(self, mode: str = 'text'):
+        self.mode = mode
+
+    def __call__(self, event: str, data: dict) -> None:
+        if self.mode == 'json':
+            print(json.dumps(dict(data, event=event, time=time.time()), ensure_ascii=False, default=str), flush=True)
+            return
+        message = self.format(event, data)
+        if message:
+            print(message, file=sys.stderr, flush=True)
+
+    @staticmethod
+    def format(event: str, data: dict) -> str:
+        if event == 'start' and 'to_transcribe' in data:
+            return (f"🎵 {data['to_transcribe']} archivos por transcribir ({data['audio_seconds']:.0f} s de audio), "
+                    f"{data['resumed']} recuperados, {data['duplicates']} duplicados, {data['invalid']} inválidos")
+        if event == 'file':
+            status = f"❌ {data['error']}" if data['status'] == 'error' else f"✅ {sum(data['keywords'].values())} aciertos"
+            if 'done_files' not in data:
+                # Recogida de un lote de la cola: el progreso ya se informó con "progress"
+                return f"{data['file']}: {status}"
+            eta = f" · quedan ~{data['eta_seconds']:.0f} s" if data.get('eta_seconds') is not None else ""
+            return (f"[{data['done_files']}/{data['total_files']}] {data['file']}: {status}"
+                    f" · {data['fraction']:.0%} del audio{eta}")
+        if event == 'chunked':
+            return f"✂️ {data['file']}: {data['duration_seconds']:.0f} s en {data['chunks']} fragmentos"
+        if event == 'enqueued':
+            return (f"📥 Lote {data['batch']}: {data['items']} elementos ({data['audio_seconds']:.0f} s de audio) "
+                    f"de {data['valid']} archivos válidos, {data['duplicates']} duplicados")
+        if event == 'node':
+            return f"🖥️ Nodo {data['owner']}: {data['workers']} trabajadores"
+        if event == 'item':
+            status = f"❌ {data['error']}" if data['status'] == 'error' else \
+                "⚠️ arrendamiento perdido, resultado descartado" if data['status'] == 'lost' else "✅"
+            return f"[{data['batch']}] {data['item']} (intento {data['attempt']}): {status}"
+        if event == 'progress':
+            return (f"⏳ {data['done'] + data['failed']}/{data['total']} elementos, {data['leased']} en curso"
+                    f" · {data['fraction']:.0%} del audio")
+        if event == 'start':
+            return f"✂️ {data['file']}: {data['duration_seconds']:.0f} s, ~{data['estimated_segments']} segmentos"
+        if event == 'segment':
+            return f"{data['filename']}: {data['start_time']:.1f} → {data['end_time']:.1f} s · {data['fraction']:.0%}"
+        if event == 'outputs':
+            return "\n".join(f"📁 {name}: {path}" for name, path in data.items())
+        if event == 'done':
+            stop = f" · detenido ({data['stop_reason']})" if data.get('stop_reason') else ""
+            return f"🏁 Terminado{stop}: " + ", ".join(f"{k}={v}" for k, v in data.items()
+                                                      if k not in ('stop_reason', 'pending'))
+        return ""
+
+
+def install_signal_handlers(token: CancelToken) -> None:
+    """First SIGINT/SIGTERM stops at the next boundary; a second one aborts"""
+    def handler(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        token.cancel()
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+
+def directory_hash(audio_files, base_dir: str) -> str:
+    """Checkpoint key of a directory: relative paths, sizes and modification times"""
+    from utils.hashing import hash_bytes
+
+    listing = [(os.path.relpath(path, base_dir), os.path.getsize(path), int(os.path.getmtime(path)))
+               for path in audio_files]
+    return hash_bytes(json.dumps([os.path.abspath(base_dir), listing]).encode('utf-8'))
+
+
+def transcribe_command(args) -> int:
+    from utils.batch import (BatchOptions, create_download_zip, extract_zip, find_audio_files, run_batch,
+                             write_batch_outputs)
+    from utils.hashing import hash_file
+
+    extracted = not os.path.isdir(args.input)
+    if extracted:
+        audio_files, base_dir = extract_zip(args.input)
+        archive_hash = hash_file(args.input)
+    else:
+        base_dir = args.input
+        audio_files = find_audio_files(base_dir)
+        archive_hash = directory_hash(audio_files, base_dir)
+    if args.no_resume:
+        archive_hash = None
+
+    options = BatchOptions(
+        keywords=args.keywords, workers=args.workers, watchdog=not args.no_watchdog, streaming=args.streaming,
+        cascade=args.cascade, profile=args.profile, backend=args.backend, model_name=args.model,
+        quantized=args.quantized, engine=args.engine, tolerance=args.tolerance, language=args.language,
+    )
+    token = CancelToken(args.budget_minutes * 60 or None)
+    install_signal_handlers(token)
+    log = ProgressLog(args.progress)
+
+    try:
+        run = run_batch(audio_files, base_dir, options, args.output, emit=log, cancel=token,
+                        archive_hash=archive_hash, index_source='cli')
+    finally:
+        if extracted:
+            shutil.rmtree(base_dir, ignore_errors=True)
+    paths = write_batch_outputs(run, args.keywords, args.output, args.tolerance)
+    if args.zip:
+        with open(args.zip, 'wb') as f:
+            f.write(create_download_zip(run.results, args.keywords, run.pending, run.stop_reason,
+                                        args.tolerance, run.vocabulary))
+        paths['zip'] = args.zip
+    log('outputs', paths)
+    return 1 if run.errors or run.pending else 0
+
+
+def split_command(args) -> int:
+    from utils.splitter import create_zip_advanced, run_split
+
+    token = CancelToken(args.budget_minutes * 60 or None)
+    install_signal_handlers(token)
+    log = ProgressLog(args.progress)
+
+    segments, stop_reason = run_split(
+        args.input, args.output, emit=log, cancel=token, include_metadata=not args.no_metadata,
+        interval_minutes=args.interval_minutes, silence_detection=not args.no_silence_detection,
+        min_silence_len=args.min_silence_len, silence_thresh_adjustment=args.silence_thresh,
+        fade_duration=args.fade, output_format=args.format, output_quality=args.quality,
+    )
+    if args.zip and segments:
+        with open(args.zip, 'wb') as f:
+            f.write(create_zip_advanced(segments, not args.no_metadata, stop_reason))
+        log('outputs', {'zip': args.zip})
+    return 1 if stop_reason or not segments else 0
+
+
+def enqueue_command(args) -> int:
+    from utils.batch import BatchOptions, extract_zip, find_audio_files
+    from utils.work_queue import WorkQueue, enqueue_batch, new_batch_id
+
+    work_queue = WorkQueue(args.queue)
+    if os.path.isdir(args.input):
+        base_dir = os.path.abspath(args.input)
+        audio_files = find_audio_files(base_dir)
+    else:
+        # Los audios del ZIP van junto a la cola, en el disco que ven todos los nodos
+        base_dir = os.path.join(work_queue.directory, 'lotes', new_batch_id())
+        audio_files, base_dir = extract_zip(args.input, base_dir)
+    options = BatchOptions(
+        keywords=args.keywords, streaming=args.streaming, cascade=args.cascade, profile=args.profile,
+        backend=args.backend, model_name=args.model, tolerance=args.tolerance, language=args.language,
+    )
+    log = ProgressLog(args.progress)
+    batch_id = enqueue_batch(work_queue, audio_files, base_dir, options, args.chunk_minutes, emit=log)
+    if args.progress == 'text':
+        print(batch_id)
+    return 0
+
+
+def worker_command(args) -> int:
+    from utils.work_queue import NodeOptions, WorkQueue, run_node
+
+    token = CancelToken(args.budget_minutes * 60 or None)
+    install_signal_handlers(token)
+    node = NodeOptions(workers=args.workers, watchdog=not args.no_watchdog, backend=args.backend,
+                       model_name=args.model, quantized=args.quantized, engine=args.engine,
+                       lease_seconds=args.lease_seconds)
+    run_node(WorkQueue(args.queue), node, emit=ProgressLog(args.progress), cancel=token, batch_id=args.batch,
+             exit_when_idle=args.exit_when_idle)
+    return 0
+
+
+def collect_command(args) -> int:
+    from utils.batch import create_download_zip, write_batch_outputs
+    from utils.work_queue import WorkQueue, collect_batch
+
+    work_queue = WorkQueue(args.queue)
+    batch = work_queue.batch(args.batch)
+    if batch is None:
+        print(f"Lote desconocido: {args.batch}", file=sys.stderr)
+        return 2
+    keywords, tolerance = batch['options']['keywords'], batch['options']['tolerance']
+    token = CancelToken(args.budget_minutes * 60 or None)
+    install_signal_handlers(token)
+    log = ProgressLog(args.progress)
+
+    run = collect_batch(work_queue, args.batch, args.output, emit=log, cancel=token, wait=not args.no_wait)
+    paths = write_batch_outputs(run, keywords, args.output, tolerance)
+    if args.zip:
+        with open(args.zip, 'wb') as f:
+            f.write(create_download_zip(run.results, keywords, run.pending, run.stop_reason, tolerance,
+                                        run.vocabulary))
+        paths['zip'] = args.zip
+    log('outputs', paths)
+    return 1 if run.errors or run.pending else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from utils import models
+    from utils.backends import DEFAULT_BACKEND
+    from utils.engines import DEFAULT_ENGINE, ENGINES
+    from utils.profiles import DEFAULT_PROFILE, PROFILES
+    from utils.work_queue import WORK_LEASE_SECONDS, WORK_QUEUE_DB
+
+    # Opciones comunes a ambos comandos
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--progress', choices=['text', 'json'], default='text',
+                        help="Eventos legibles en stderr o líneas JSON en stdout")
+    common.add_argument('--budget-minutes', type=float, default=0,
+                        help="Límite de tiempo; al agotarse se conserva lo terminado (0 = sin límite)")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    transcribe = commands.add_parser('transcribe', parents=[common],
+                                     help="Transcribir un ZIP o un directorio de audios")
+    transcribe.add_argument('input', help="ZIP o directorio (se recorren los subdirectorios)")
+    transcribe.add_argument('--keywords', nargs='+', required=True, help="Palabras clave a buscar")
+    transcribe.add_argument('--output', required=True, help="Directorio de TXT/SRT, reporte y resumen JSON")
+    transcribe.add_argument('--zip', help="Guardar además el ZIP de resultados de la página en esta ruta")
+    transcribe.add_argument('--workers', type=int, default=1, help="Archivos en paralelo (una copia del modelo cada uno)")
+    transcribe.add_argument('--no-watchdog', action='store_true',
+                            help="Transcribir en este proceso, sin tiempo límite por archivo")
+    transcribe.add_argument('--no-resume', action='store_true', help="Ignorar los puntos de control guardados")
+    transcribe.add_argument('--streaming', action='store_true', help="Decodificar por ventanas (archivos de horas)")
+    transcribe.add_argument('--cascade', action='store_true', help="Modo cascada de vigilancia de palabras clave")
+    transcribe.add_argument('--profile', choices=list(PROFILES), default=DEFAULT_PROFILE)
+    transcribe.add_argument('--backend', choices=['whisper', 'fake'], default=DEFAULT_BACKEND)
+    transcribe.add_argument('--model', default=None, help="Modelo Whisper (por defecto WHISPER_MODEL)")
+    transcribe.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE)
+    transcribe.add_argument('--quantized', action='store_true', default=models.DEFAULT_QUANTIZED,
+                            help="Inferencia cuantizada int8 en CPU")
+    transcribe.add_argument('--tolerance', type=int, choices=[0, 1, 2], default=0,
+                            help="Errores tolerados por palabra clave")
+    transcribe.add_argument('--language', default='es')
+    transcribe.set_defaults(func=transcribe_command)
+
+    split = commands.add_parser('split', parents=[common], help="Dividir un audio largo en segmentos")
+    split.add_argument('input', help="Archivo de audio")
+    split.add_argument('--output', required=True, help="Directorio de los segmentos")
+    split.add_argument('--zip', help="Guardar además los segmentos en este ZIP")
+    split.add_argument('--interval-minutes', type=int, default=2, help="Duración por segmento")
+    split.add_argument('--no-silence-detection', action='store_true', help="Cortar exactamente en cada intervalo")
+    split.add_argument('--min-silence-len', type=int, default=1000, help="Duración mínima de silencio (ms)")
+    split.add_argument('--silence-thresh', type=int, default=16, help="dB por debajo del promedio que cuentan como silencio")
+    split.add_argument('--fade', type=int, default=100, help="Fade in/out de cada segmento (ms)")
+    split.add_argument('--format', choices=['mp3', 'wav', 'm4a'], default='mp3')
+    split.add_argument('--quality', choices=['low', 'medium', 'high', 'very_high'], default='medium')
+    split.add_argument('--no-metadata', action='store_true', help="Sin SEGMENTOS_INFO.txt")
+    split.set_defaults(func=split_command)
+
+    # Cola compartida entre equipos
+    shared = argparse.ArgumentParser(add_help=False)
+    shared.add_argument('--queue', default=WORK_QUEUE_DB, help="Base de datos de la cola (en un disco compartido)")
+
+    enqueue = commands.add_parser('enqueue', parents=[common, shared],
+                                  help="Encolar un ZIP o un directorio para repartirlo entre nodos")
+    enqueue.add_argument('input', help="ZIP (se extrae junto a la cola) o directorio visible para todos los nodos")
+    enqueue.add_argument('--keywords', nargs='+', required=True, help="Palabras clave a buscar")
+    enqueue.add_argument('--chunk-minutes', type=int, default=0,
+                         help="Dividir los archivos más largos en fragmentos de estos minutos (0 = no dividir)")
+    enqueue.add_argument('--streaming', action='store_true', help="Decodificar por ventanas (archivos de horas)")
+    enqueue.add_argument('--cascade', action='store_true', help="Modo cascada de vigilancia de palabras clave")
+    enqueue.add_argument('--profile', choices=list(PROFILES), default=DEFAULT_PROFILE)
+    enqueue.add_argument('--backend', choices=['whisper', 'fake'], default=DEFAULT_BACKEND,
+                         help="Backend de la alineación por palabra al recoger")
+    enqueue.add_argument('--model', default=None, help="Modelo de la alineación por palabra al recoger")
+    enqueue.add_argument('--tolerance', type=int, choices=[0, 1, 2], default=0,
+                         help="Errores tolerados por palabra clave")
+    enqueue.add_argument('--language', default='es')
+    enqueue.set_defaults(func=enqueue_command)
+
+    worker = commands.add_parser('worker', parents=[common, shared], help="Procesar elementos de la cola")
+    worker.add_argument('--batch', help="Atender solo este lote")
+    worker.add_argument('--workers', type=int, default=1, help="Elementos en paralelo (una copia del modelo cada uno)")
+    worker.add_argument('--exit-when-idle', action='store_true',
+                        help="Terminar cuando no quede nada en cola ni en curso")
+    worker.add_argument('--lease-seconds', type=float, default=WORK_LEASE_SECONDS,
+                        help="Duración del arrendamiento; se renueva mientras se procesa")
+    worker.add_argument('--no-watchdog', action='store_true',
+                        help="Transcribir en este proceso, sin tiempo límite por elemento")
+    worker.add_argument('--backend', choices=['whisper', 'fake'], default=DEFAULT_BACKEND)
+    worker.add_argument('--model', default=None, help="Modelo Whisper (por defecto WHISPER_MODEL)")
+    worker.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE)
+    worker.add_argument('--quantized', action='store_true', default=models.DEFAULT_QUANTIZED,
+                        help="Inferencia cuantizada int8 en CPU")
+    worker.set_defaults(func=worker_command)
+
+    collect = commands.add_parser('collect', parents=[common, shared],
+                                  help="Esperar a un lote de la cola y generar sus resultados")
+    collect.add_argument('batch', help="Id del lote que imprimió enqueue")
+    collect.add_argument('--output', required=True, help="Directorio de TXT/SRT, reporte y resumen JSON")
+    collect.add_argument('--zip', help="Guardar además el ZIP de resultados de la página en esta ruta")
+    collect.add_argument('--no-wait', action='store_true', help="Recoger lo terminado sin esperar al resto")
+    collect.set_defaults(func=collect_command)
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,13 +4,25 @@ import warnings
 warnings.filterwarnings('ignore')
 
 import whisper
-from whisper.utils import get_writer
+from whisper.utils import get_writer, format_timestamp
 import tempfile
 import os
 import time
 import re
 from dataclasses import dataclass
-from typing import List, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from utils.streaming import transcribe_windowed
+from utils.word_timestamps import refine_keyword_hits
+from utils.snippets import extract_snippet, parse_timestamp
+from utils.transcript_index import TranscriptIndex
+from utils.keywords import FuzzyVocabulary, TokenIndex, mark_keywords
+from utils.segment_view import KEYWORD_MARK_CLASS, PAGE_SIZES, page_count, page_of, render_segment_page
+from utils.hashing import hash_file
+from utils.models import DEFAULT_MODEL, DEFAULT_QUANTIZED
+from utils.audio_cache import get_audio_cache
+from utils.backends import DEFAULT_BACKEND, create_backend
+from utils.profiles import DEFAULT_PROFILE, PROFILES
+from utils.engines import DEFAULT_ENGINE, ENGINES
 
 st.set_page_config(page_title='Speech To Text', page_icon=':studio_microphone:', layout="wide")
 
@@ -21,12 +33,49 @@ if 'srt_path' not in st.session_state:
     st.session_state.srt_path = None
 if 'keywords' not in st.session_state:
     st.session_state.keywords = []
+if 'keyword_hits' not in st.session_state:
+    st.session_state.keyword_hits = []
+if 'audio_path' not in st.session_state:
+    st.session_state.audio_path = None
+    st.session_state.audio_file_id = None
+    st.session_state.audio_name = None
+if 'token_index' not in st.session_state:
+    st.session_state.token_index = None
+
+with st.sidebar:
+    inferencia_cuantizada = st.checkbox(
+        '⚡ Inferencia cuantizada int8 (CPU)',
+        value=DEFAULT_QUANTIZED,
+        help="Cuantización dinámica int8 de las capas lineales: menos memoria y más velocidad en CPU"
+    )
+    motor_inferencia = st.selectbox(
+        '🧠 Motor del encoder',
+        ENGINES,
+        index=ENGINES.index(DEFAULT_ENGINE),
+        help="TorchScript/ONNX ejecutan un grafo exportado del encoder en CPU; si la exportación falla se usa PyTorch"
+    )
+    perfil_decodificacion = st.selectbox(
+        '🎚️ Perfil de decodificación',
+        list(PROFILES),
+        index=list(PROFILES).index(DEFAULT_PROFILE),
+        format_func=lambda name: f"{name} — {PROFILES[name].description}",
+        help="Controla beam search, re-decodificaciones por temperatura y umbrales de calidad"
+    )
+    tolerancia_coincidencia = st.select_slider(
+        "🔤 Tolerancia de coincidencia",
+        options=[0, 1, 2],
+        value=0,
+        format_func=lambda n: "exacta" if n == 0 else f"hasta {n} error{'es' if n > 1 else ''}",
+        help="Acepta variantes mal transcritas (\"estorsion\", \"drojas\"). Las palabras de 3 letras o menos "
+             "siempre coinciden exactas y se admite como máximo un error por cada 3 letras"
+    )
 
 @st.cache_resource
-def load_model():
-    return whisper.load_model('base')
+def load_backend(quantized: bool = False, engine: str = 'eager'):
+    # TRANSCRIPTION_BACKEND=fake permite probar la página sin pesos de Whisper
+    return create_backend(DEFAULT_BACKEND, quantized=quantized, engine=engine)
 
-model = load_model()
+backend = load_backend(inferencia_cuantizada, motor_inferencia)
 
 @dataclass
 class SRTSegment:
@@ -38,13 +87,52 @@ class SRTSegment:
 
 def upload_audio():
     file = st.file_uploader('Subir un audio', type=['.wav', '.mp3', '.wave'])
-    if file is not None:
+    if file is None:
+        return None
+    # Conservar el audio entre recargas para poder extraer fragmentos de los aciertos
+    path = st.session_state.audio_path
+    if st.session_state.audio_file_id != file.file_id or not path or not os.path.exists(path):
+        if path and os.path.exists(path):
+            os.remove(path)
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
             tmp_file.write(file.read())
-            return tmp_file.name
+        st.session_state.audio_path = tmp_file.name
+        st.session_state.audio_file_id = file.file_id
+        st.session_state.audio_name = file.name
+    return st.session_state.audio_path
+
+# Ventanas cortas para que el primer texto aparezca pronto; 120 s son cuatro
+# bloques de 30 s de Whisper y limitan el audio re-decodificado en cada borde
+LIVE_WINDOW_SECONDS = 120
 
-def get_transcribe(audio: str, language: str = 'es'):
-    return model.transcribe(audio=audio, language=language, verbose=True)
+def get_transcribe(audio: str, language: str = 'es', on_segment: Optional[Callable[[Dict], None]] = None,
+                   profile: str = DEFAULT_PROFILE):
+    # Las primeras ventanas salen directamente de ffmpeg para no esperar a la
+    # decodificación completa; la caché de PCM se llena en paralelo y la usa
+    # después el refinamiento por palabra
+    prefetch = get_audio_cache().prefetch_pcm(audio)
+    result = transcribe_windowed(backend, audio, language=language,
+                                 window_seconds=LIVE_WINDOW_SECONDS, on_segment=on_segment,
+                                 **PROFILES[profile].transcribe_options())
+    prefetch.join()
+    return result
+
+def index_transcript(result: Dict, audio_path: str, keywords: List[str], profile: str):
+    """Store the transcript in the persistent search index"""
+    transcript_index = TranscriptIndex()
+    run_id = transcript_index.start_run("audio", {
+        "model": DEFAULT_MODEL,
+        "backend": DEFAULT_BACKEND,
+        "profile": profile,
+        "engine": motor_inferencia,
+        "quantized": inferencia_cuantizada,
+        "keywords": keywords,
+    })
+    segments = result.get('segments', [])
+    transcript_index.add_transcript(
+        run_id, f"audio:{hash_file(audio_path)}", st.session_state.audio_name or os.path.basename(audio_path),
+        segments, duration=segments[-1]['end'] if segments else 0.0, language=result.get('language')
+    )
 
 def save_file(results, format='tsv'):
     writer = get_writer(format, './')
@@ -101,72 +189,106 @@ def parse_srt_file(srt_file_path: str) -> List[SRTSegment]:
     
     return segments
 
-def highlight_keywords_in_text(text: str, keywords: List[str]) -> Tuple[str, Set[str]]:
-    """Highlight keywords in text and return found terms"""
+KEYWORD_MARK = '<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">'
+
+def highlight_keywords_in_text(text: str, keywords: List[str],
+                               vocabulary: Optional[FuzzyVocabulary] = None) -> Tuple[str, Set[str]]:
+    """Highlight whole-word keywords (ignoring case and accents) and return found terms"""
     if not text or not keywords:
         return text, set()
-        
-    highlighted_text = text
-    found_terms = set()
-    
-    for keyword in keywords:
-        if keyword and keyword.strip():  # Verificar que el keyword no esté vacío
-            # Create a case-insensitive pattern that preserves original case
-            try:
-                pattern = re.compile(re.escape(keyword.strip()), re.IGNORECASE)
-                if pattern.search(text):
-                    found_terms.add(keyword.strip())
-                    # Reemplazar de manera más segura
-                    highlighted_text = pattern.sub(
-                        lambda m: f'<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">{m.group()}</mark>',
-                        highlighted_text
-                    )
-            except re.error:
-                # Si hay error en regex, continuar con el siguiente keyword
-                continue
-    
-    return highlighted_text, found_terms
+    highlighted_text, found_terms = mark_keywords(text, keywords, KEYWORD_MARK, '</mark>',
+                                                  tolerancia_coincidencia, vocabulary)
+    return highlighted_text, set(found_terms)
 
-def check_segment_for_keywords(segment: SRTSegment, keywords: List[str]) -> bool:
-    """Check if segment contains any keywords"""
-    if not segment or not segment.text or not keywords:
-        return False
-        
-    text_lower = segment.text.lower()
-    return any(keyword.lower().strip() in text_lower for keyword in keywords if keyword and keyword.strip())
+@st.fragment
+def snippet_player(source_path: str, start: float, end: float, key: str):
+    """Extract and play one hit on demand; only this fragment reruns"""
+    label = f"▶️ Escuchar {format_timestamp(start, always_include_hours=True)} → {format_timestamp(end, always_include_hours=True)}"
+    if st.button(label, key=key):
+        try:
+            st.audio(extract_snippet(source_path, start, end))
+        except Exception as e:
+            st.error(f"Error extrayendo el fragmento: {e}")
 
-def format_srt_segment_html(segment: SRTSegment, keywords: List[str]) -> str:
-    """Format a single SRT segment as HTML"""
-    try:
-        highlighted_text, _ = highlight_keywords_in_text(segment.text, keywords)
-        
-        # Style the time stamp based on whether it contains keywords
-        time_style = "color: #d32f2f; font-weight: bold;" if segment.contains_keywords else "color: #666;"
-        
-        return f"""
-        <div style="margin: 15px 0; padding: 10px; border-left: 3px solid {'#d32f2f' if segment.contains_keywords else '#ccc'}; background-color: {'#fff3e0' if segment.contains_keywords else '#f9f9f9'};">
-            <div style="font-size: 12px; {time_style} margin-bottom: 5px;">
-                <strong>{segment.index}</strong> | {segment.start_time} → {segment.end_time}
-            </div>
-            <div style="font-size: 14px; line-height: 1.4;">
-                {highlighted_text}
-            </div>
-        </div>
-        """
-    except Exception as e:
-        # Si hay error formateando, devolver versión básica
-        return f"""
-        <div style="margin: 15px 0; padding: 10px; border-left: 3px solid #ccc; background-color: #f9f9f9;">
-            <div style="font-size: 12px; color: #666; margin-bottom: 5px;">
-                <strong>{segment.index}</strong> | {segment.start_time} → {segment.end_time}
-            </div>
-            <div style="font-size: 14px; line-height: 1.4;">
-                {segment.text}
-            </div>
-        </div>
-        """
-
-def display_enhanced_srt(srt_file_path: str, keywords: List[str]):
+def format_viewer_time(seconds: float) -> str:
+    return format_timestamp(seconds, always_include_hours=True)
+
+def render_segment_viewer(segments: List[SRTSegment], keywords: List[str], keyword_hits: Optional[List[Dict]],
+                          audio_path: Optional[str], vocabulary: Optional[FuzzyVocabulary], key: str):
+    """Paginated segment viewer: one HTML block per page plus jump-to-hit navigation"""
+    page_key, target_key = f"{key}_page", f"{key}_target"
+    hit_positions = [position for position, segment in enumerate(segments) if segment.contains_keywords]
+    hits_by_segment: Dict[int, List[Dict]] = {}
+    for hit in keyword_hits or []:
+        hits_by_segment.setdefault(hit['segment'] + 1, []).append(hit)
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col2:
+        page_size = st.selectbox("Segmentos por página", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = page_count(len(segments), page_size)
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+
+    def go_to(position: int):
+        """Move the viewer to the page holding a segment and outline it"""
+        st.session_state[page_key] = page_of(position, page_size)
+        st.session_state[target_key] = segments[position].index
+
+    with col1:
+        page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+    start, stop = (page - 1) * page_size, min(page * page_size, len(segments))
+    with col3:
+        if hit_positions:
+            hit_labels = {
+                f"#{segments[p].index} · {segments[p].start_time} · {segments[p].text[:60]}": p
+                for p in hit_positions
+            }
+            st.selectbox(
+                "🎯 Ir al acierto",
+                list(hit_labels),
+                index=None,
+                placeholder=f"{len(hit_positions)} segmentos con aciertos",
+                key=f"{key}_jump",
+                on_change=lambda: go_to(hit_labels[st.session_state[f"{key}_jump"]])
+            )
+
+    if hit_positions:
+        previous_hits = [p for p in hit_positions if p < start]
+        next_hits = [p for p in hit_positions if p >= stop]
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("◀️ Acierto anterior", key=f"{key}_prev", disabled=not previous_hits,
+                      on_click=go_to, args=(previous_hits[-1] if previous_hits else 0,), use_container_width=True)
+        with col2:
+            st.button("Acierto siguiente ▶️", key=f"{key}_next", disabled=not next_hits,
+                      on_click=go_to, args=(next_hits[0] if next_hits else 0,), use_container_width=True)
+
+    # Solo se resaltan y envían los segmentos de la página actual
+    rows = []
+    for segment in segments[start:stop]:
+        text, _ = mark_keywords(segment.text, keywords, KEYWORD_MARK_CLASS, '</mark>',
+                                tolerancia_coincidencia, vocabulary)
+        rows.append({
+            'index': segment.index, 'start_time': segment.start_time, 'end_time': segment.end_time,
+            'text': text, 'hit': segment.contains_keywords, 'hits': hits_by_segment.get(segment.index),
+        })
+    st.markdown(render_segment_page(rows, format_viewer_time, st.session_state.get(target_key)),
+                unsafe_allow_html=True)
+    st.caption(f"Segmentos {start + 1}–{stop} de {len(segments)}")
+
+    if audio_path and os.path.exists(audio_path):
+        for segment in segments[start:stop]:
+            if not segment.contains_keywords:
+                continue
+            windows = [(h['start'], h['end']) for h in hits_by_segment.get(segment.index, [])] or [
+                (parse_timestamp(segment.start_time), parse_timestamp(segment.end_time))
+            ]
+            for n, (window_start, window_end) in enumerate(windows):
+                snippet_player(audio_path, window_start, window_end, key=f"snippet_{segment.index}_{n}")
+
+@st.fragment
+def display_enhanced_srt(srt_file_path: str, keywords: List[str], keyword_hits: Optional[List[Dict]] = None,
+                         audio_path: Optional[str] = None, token_index: Optional[TokenIndex] = None):
     """Display SRT file with enhanced formatting and keyword highlighting"""
     try:
         if not srt_file_path or not os.path.exists(srt_file_path):
@@ -179,19 +301,19 @@ def display_enhanced_srt(srt_file_path: str, keywords: List[str]):
             st.warning("No se encontraron segmentos en el archivo SRT")
             return
         
-        # Check which segments contain keywords
+        # Segmentos con palabras clave según el índice de tokens (id = número SRT - 1)
+        if token_index is None:
+            token_index = TokenIndex((segment.text for segment in segments),
+                                     ids=(segment.index - 1 for segment in segments))
+        keyword_ids = token_index.segments_with(keywords, tolerancia_coincidencia)
         segments_with_keywords = []
         segments_without_keywords = []
         
         for segment in segments:
-            try:
-                if check_segment_for_keywords(segment, keywords):
-                    segment.contains_keywords = True
-                    segments_with_keywords.append(segment)
-                else:
-                    segments_without_keywords.append(segment)
-            except Exception as e:
-                # Si hay error procesando un segmento, agregarlo sin keywords
+            if segment.index - 1 in keyword_ids:
+                segment.contains_keywords = True
+                segments_with_keywords.append(segment)
+            else:
                 segments_without_keywords.append(segment)
         
         # Display statistics
@@ -228,50 +350,25 @@ def display_enhanced_srt(srt_file_path: str, keywords: List[str]):
         
         # Display segments
         st.markdown("### Transcripción con marcas de tiempo")
-        
-        # Limitar número de segmentos mostrados para evitar problemas de rendimiento
-        max_segments = 50
-        if len(segments_to_display) > max_segments:
-            st.warning(f"Mostrando los primeros {max_segments} segmentos de {len(segments_to_display)} total.")
-            segments_to_display = segments_to_display[:max_segments]
-        
-        # Display segments one by one para mejor manejo de errores
-        for segment in segments_to_display:
-            try:
-                html_content = format_srt_segment_html(segment, keywords)
-                st.markdown(html_content, unsafe_allow_html=True)
-            except Exception as e:
-                # Si hay error con un segmento específico, mostrar versión simple
-                st.write(f"**{segment.index}** | {segment.start_time} → {segment.end_time}")
-                st.write(segment.text)
-                st.write("---")
+        render_segment_viewer(segments_to_display, keywords, keyword_hits, audio_path,
+                              token_index.fuzzy_vocabulary(), key="srt_view")
                 
     except Exception as e:
         st.error(f"Error procesando archivo SRT: {e}")
 
-def highlight_text_simple(text: str, keywords: List[str]) -> Tuple[str, Set[str]]:
-    """Simple highlighting for the main text display"""
-    if not text or not keywords:
-        return text, set()
-        
-    highlighted_text = text
-    found_terms = set()
-    
-    for keyword in keywords:
-        if keyword and keyword.strip() and keyword.lower() in text.lower():
-            found_terms.add(keyword)
-            # Use case-insensitive replacement
-            try:
-                highlighted_text = re.sub(
-                    re.escape(keyword.strip()), 
-                    f'<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">{keyword.strip()}</mark>', 
-                    highlighted_text, 
-                    flags=re.IGNORECASE
-                )
-            except re.error:
-                continue
-    
-    return highlighted_text, found_terms
+def format_live_segment_html(segment: Dict, keywords: List[str]) -> Tuple[str, Set[str]]:
+    """Format a freshly decoded Whisper segment for the live status view"""
+    highlighted_text, found_terms = highlight_keywords_in_text(segment.get('text', '').strip(), keywords)
+    start = format_timestamp(segment['start'], always_include_hours=True)
+    end = format_timestamp(segment['end'], always_include_hours=True)
+    marker = '🎯 ' if found_terms else ''
+    color = '#d32f2f' if found_terms else '#666'
+    html = f"""
+    <div style="margin: 4px 0; font-size: 14px; line-height: 1.4;">
+        <span style="font-size: 12px; color: {color};">{marker}{start} → {end}</span> {highlighted_text}
+    </div>
+    """
+    return html, found_terms
 
 if __name__ == "__main__":
     st.title('🎙️ Transcripción de Audio a Texto')
@@ -299,7 +396,21 @@ if __name__ == "__main__":
                 try:
                     with st.status('Ejecutando transcripción...', expanded=True) as status:
                         start_time = time.time()
-                        result = get_transcribe(audio=audio_transcribir)
+                        live_stats = {'segments': 0, 'hits': 0}
+
+                        def show_segment(segment: Dict):
+                            """Push each decoded segment into the status container"""
+                            html, found = format_live_segment_html(segment, opciones_elegidas)
+                            st.markdown(html, unsafe_allow_html=True)
+                            live_stats['segments'] += 1
+                            live_stats['hits'] += 1 if found else 0
+                            status.update(
+                                label=f"Ejecutando transcripción... {live_stats['segments']} segmentos, "
+                                      f"{live_stats['hits']} con palabras clave"
+                            )
+
+                        result = get_transcribe(audio=audio_transcribir, on_segment=show_segment,
+                                                profile=perfil_decodificacion)
                         end_time = time.time()
                         status.update(
                             label=f'✅ Transcripción completada en {end_time - start_time:.2f} segundos.', 
@@ -318,8 +429,25 @@ if __name__ == "__main__":
                     st.session_state.srt_path = srt_path
                     st.session_state.transcription_complete = True
                     
+                    try:
+                        index_transcript(result, audio_transcribir, opciones_elegidas, perfil_decodificacion)
+                    except Exception as e:
+                        st.warning(f"No se pudo guardar la transcripción en el índice de búsqueda: {e}")
+                    
+                    # Índice de tokens normalizados: se reutiliza al cambiar las palabras clave
+                    st.session_state.token_index = TokenIndex.from_segments(result.get('segments', []))
+                    
                     # Highlight keywords in main text
-                    highlighted_text, found_terms = highlight_text_simple(texto, opciones_elegidas)
+                    highlighted_text, found_terms = highlight_keywords_in_text(
+                        texto, opciones_elegidas, st.session_state.token_index.fuzzy_vocabulary()
+                    )
+                    
+                    # Marcas por palabra solo en los segmentos con aciertos
+                    st.session_state.keyword_hits = refine_keyword_hits(
+                        backend, get_audio_cache().get_pcm(audio_transcribir),
+                        result.get('segments', []), opciones_elegidas,
+                        token_index=st.session_state.token_index, tolerance=tolerancia_coincidencia
+                    ) if found_terms else []
 
                     if found_terms:
                         st.success(f"🎯 Encontradas las palabras: **{', '.join(found_terms)}**")
@@ -341,19 +469,14 @@ if __name__ == "__main__":
                 except Exception as e:
                     st.error(f"Error durante la transcripción: {e}")
                     st.write("Por favor, intenta de nuevo o verifica que el archivo de audio sea válido.")
-                finally:
-                    # Clean up
-                    try:
-                        if audio_transcribir and os.path.exists(audio_transcribir):
-                            os.remove(audio_transcribir)
-                    except:
-                        pass
 
     # Mostrar análisis SRT solo si la transcripción está completa
     if st.session_state.transcription_complete and st.session_state.srt_path:
         with st.expander("📋 Ver transcripción con marcas de tiempo", expanded=False):
             if st.session_state.keywords:
-                display_enhanced_srt(st.session_state.srt_path, st.session_state.keywords)
+                display_enhanced_srt(st.session_state.srt_path, st.session_state.keywords,
+                                     st.session_state.keyword_hits, st.session_state.audio_path,
+                                     st.session_state.token_index)
             else:
                 st.warning("No hay palabras clave seleccionadas para el análisis.")
 
@@ -11,7 +11,24 @@ import re
 import shutil
 from typing import List, Dict, Tuple
 from dataclasses import dataclass
-import io
+import numpy as np
+import pandas as pd
+import altair as alt
+from utils.cascade import CASCADE_FAST_MODEL
+from utils.snippets import extract_snippet, parse_timestamp
+from utils.keywords import FuzzyVocabulary, TokenIndex, mark_keywords
+from utils.timeline import TIMELINE_BIN_SECONDS, batch_timeline, fit_bin_seconds, keyword_timeline
+from utils.segment_view import KEYWORD_MARK_CLASS, PAGE_SIZES, page_count, page_of, render_segment_page
+from utils import models
+from utils.backends import DEFAULT_BACKEND, create_backend
+from utils.profiles import DEFAULT_PROFILE, PROFILES
+from utils.engines import DEFAULT_ENGINE, ENGINES
+from utils.checkpoints import CheckpointStore
+from utils.cancellation import CancelToken
+from utils.batch import (KEYWORD_MARK, BatchOptions, BatchRun, TranscriptionResult, create_download_zip,
+                         extract_zip, find_duplicate_audio, format_clock, format_timestamp, run_batch,
+                         validate_audio_file)
+from utils.hashing import hash_bytes
 
 warnings.filterwarnings('ignore')
 st.set_page_config(page_title='Speech To Text - Batch ZIP', page_icon=':studio_microphone:', layout="wide")
@@ -21,17 +38,18 @@ if 'processing_results' not in st.session_state:
     st.session_state.processing_results = []
 if 'current_temp_dir' not in st.session_state:
     st.session_state.current_temp_dir = None
-
-@dataclass
-class TranscriptionResult:
-    filename: str
-    filepath: str
-    transcription: str
-    duration: float
-    processing_time: float
-    found_keywords: List[str]
-    word_count: int
-    srt_path: str = None
+if 'archive_hash' not in st.session_state:
+    st.session_state.archive_hash = None
+if 'zip_file_id' not in st.session_state:
+    st.session_state.zip_file_id = None
+    st.session_state.zip_file_hash = None
+if 'token_indexes' not in st.session_state:
+    st.session_state.token_indexes = {}
+    st.session_state.fuzzy_vocabulary = FuzzyVocabulary()
+if 'zip_contents' not in st.session_state:
+    st.session_state.zip_contents = None
+if 'batch_summary' not in st.session_state:
+    st.session_state.batch_summary = None
 
 @dataclass
 class SRTSegment:
@@ -41,84 +59,53 @@ class SRTSegment:
     text: str
     contains_keywords: bool = False
     
+with st.sidebar:
+    quantized_inference = st.checkbox(
+        "⚡ Inferencia cuantizada int8 (CPU)",
+        value=models.DEFAULT_QUANTIZED,
+        help="Cuantización dinámica int8 de las capas lineales: menos memoria y más velocidad en CPU"
+    )
+    inference_engine = st.selectbox(
+        "🧠 Motor del encoder",
+        ENGINES,
+        index=ENGINES.index(DEFAULT_ENGINE),
+        help="TorchScript/ONNX ejecutan un grafo exportado del encoder en CPU; si la exportación falla se usa PyTorch"
+    )
+    decode_profile = st.selectbox(
+        "🎚️ Perfil de decodificación",
+        list(PROFILES),
+        index=list(PROFILES).index(DEFAULT_PROFILE),
+        format_func=lambda name: f"{name} — {PROFILES[name].description}",
+        help="Controla beam search, re-decodificaciones por temperatura y umbrales de calidad"
+    )
+    match_tolerance = st.select_slider(
+        "🔤 Tolerancia de coincidencia",
+        options=[0, 1, 2],
+        value=0,
+        format_func=lambda n: "exacta" if n == 0 else f"hasta {n} error{'es' if n > 1 else ''}",
+        help="Acepta variantes mal transcritas (\"estorsion\", \"drojas\"). Las palabras de 3 letras o menos "
+             "siempre coinciden exactas y se admite como máximo un error por cada 3 letras"
+    )
+
 @st.cache_resource
-def load_whisper_model():
-    """Load Whisper model with caching"""
+def load_backend(quantized: bool = False, engine: str = 'eager', model_name: str = None, replica: int = 0):
+    """
+    Load the transcription backend (Whisper unless TRANSCRIPTION_BACKEND=fake) with caching.
+    Each `replica` is a separate copy for a parallel worker.
+    """
     try:
-        return whisper.load_model('base')
+        return create_backend(DEFAULT_BACKEND, model_name=model_name, quantized=quantized, engine=engine)
     except Exception as e:
         st.error(f"Error cargando modelo Whisper: {e}")
         return None
 
-model = load_whisper_model()
-
-def natural_sort_key(filename: str) -> tuple:
-    """
-    Genera una clave de ordenamiento natural para archivos con números
-    Ejemplos:
-    - audio_seg_1.mp3 -> (audio_seg_, 1, .mp3)
-    - audio_seg_10.mp3 -> (audio_seg_, 10, .mp3)
-    - segment_01.wav -> (segment_, 1, .wav)
-    """
-    import re
-    
-    # Dividir el nombre en partes texto-número-texto
-    parts = re.split(r'(\d+)', filename.lower())
-    
-    # Convertir números a enteros para ordenamiento correcto
-    result = []
-    for part in parts:
-        if part.isdigit():
-            result.append(int(part))
-        else:
-            result.append(part)
-    
-    return tuple(result)
-
-def sort_audio_files(audio_files: List[str]) -> List[str]:
-    """
-    Ordena archivos de audio de manera inteligente
-    Prioriza ordenamiento numérico sobre alfabético
-    """
-    # Obtener solo los nombres de archivo para ordenar
-    files_with_names = [(os.path.basename(f), f) for f in audio_files]
-    
-    # Ordenar usando la clave natural
-    sorted_files = sorted(files_with_names, key=lambda x: natural_sort_key(x[0]))
-    
-    # Devolver solo las rutas completas
-    return [full_path for _, full_path in sorted_files]
+# Cargar el modelo al abrir la página: el lote lo reutiliza desde la caché
+load_backend(quantized_inference, inference_engine)
 
 def get_audio_files_from_zip(zip_file) -> Tuple[List[str], str]:
     """Extract and validate audio files from ZIP"""
     try:
-        # Crear directorio temporal
-        temp_dir = tempfile.mkdtemp()
-        zip_path = os.path.join(temp_dir, "uploaded.zip")
-        
-        # Guardar archivo ZIP
-        with open(zip_path, "wb") as f:
-            f.write(zip_file.read())
-        
-        # Extraer ZIP
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            zf.extractall(temp_dir)
-        
-        # Buscar archivos de audio (incluyendo en subdirectorios)
-        audio_extensions = ('.wav', '.mp3', '.wave', '.m4a', '.flac', '.aac')
-        audio_files = []
-        
-        for root, dirs, files in os.walk(temp_dir):
-            for file in files:
-                if file.lower().endswith(audio_extensions):
-                    full_path = os.path.join(root, file)
-                    audio_files.append(full_path)
-        
-        # Ordenar archivos de manera inteligente
-        audio_files = sort_audio_files(audio_files)
-        
-        return audio_files, temp_dir
-        
+        return extract_zip(zip_file)
     except zipfile.BadZipFile:
         st.error("El archivo no es un ZIP válido")
         return [], None
@@ -126,138 +113,11 @@ def get_audio_files_from_zip(zip_file) -> Tuple[List[str], str]:
         st.error(f"Error procesando ZIP: {e}")
         return [], None
 
-def validate_audio_file(filepath: str) -> bool:
-    """Validate if audio file can be processed"""
-    try:
-        # Verificar que el archivo existe y tiene tamaño > 0
-        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
-            return False
-        
-        # Verificar extensión
-        valid_extensions = ('.wav', '.mp3', '.wave', '.m4a', '.flac', '.aac')
-        return filepath.lower().endswith(valid_extensions)
-    except:
-        return False
-
-def get_transcribe_safe(audio_path: str, language: str = 'es') -> Dict:
-    """Safe transcription with error handling"""
-    try:
-        if model is None:
-            return {"error": "Modelo Whisper no disponible"}
-        
-        start_time = time.time()
-        result = model.transcribe(audio=audio_path, language=language, verbose=False)
-        processing_time = time.time() - start_time
-        
-        return {
-            "text": result.get("text", ""),
-            "segments": result.get("segments", []),
-            "processing_time": processing_time,
-            "error": None
-        }
-    except Exception as e:
-        return {"error": f"Error transcribiendo: {str(e)}"}
-
-def find_keywords_in_text(text: str, keywords: List[str]) -> List[str]:
-    """Find which keywords are present in text"""
-    found = []
-    text_lower = text.lower()
-    for keyword in keywords:
-        if keyword and keyword.lower().strip() in text_lower:
-            found.append(keyword)
-    return found
-
-def highlight_keywords(text: str, keywords: List[str]) -> str:
-    """Highlight keywords in text"""
-    highlighted = text
-    for keyword in keywords:
-        if keyword and keyword.strip():
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            highlighted = pattern.sub(
-                lambda m: f'<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">{m.group()}</mark>',
-                highlighted
-            )
+def highlight_keywords(text: str, keywords: List[str], vocabulary: FuzzyVocabulary = None) -> str:
+    """Highlight whole-word keywords, ignoring case and accents"""
+    highlighted, _ = mark_keywords(text, keywords, KEYWORD_MARK, '</mark>', match_tolerance, vocabulary)
     return highlighted
 
-def save_individual_files(result: Dict, filename: str, output_dir: str) -> Dict[str, str]:
-    """Save transcription files for individual audio"""
-    base_name = os.path.splitext(filename)[0]
-    saved_files = {}
-    
-    try:
-        # Guardar TXT
-        txt_path = os.path.join(output_dir, f"{base_name}.txt")
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(result.get('text', ''))
-        saved_files['txt'] = txt_path
-        
-        # Guardar SRT si hay segmentos
-        if result.get('segments'):
-            srt_path = os.path.join(output_dir, f"{base_name}.srt")
-            srt_content = []
-            for i, segment in enumerate(result['segments'], 1):
-                start = format_timestamp(segment['start'])
-                end = format_timestamp(segment['end'])
-                text = segment['text'].strip()
-                srt_content.extend([str(i), f"{start} --> {end}", text, ""])
-            
-            with open(srt_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(srt_content))
-            saved_files['srt'] = srt_path
-        
-    except Exception as e:
-        st.warning(f"Error guardando archivos para {filename}: {e}")
-    
-    return saved_files
-
-def format_timestamp(seconds):
-    """Convert seconds to SRT timestamp format"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-def create_summary_report(results: List[TranscriptionResult], keywords: List[str]) -> str:
-    """Create summary report of all transcriptions"""
-    total_files = len(results)
-    successful = len([r for r in results if r.transcription])
-    total_duration = sum(r.duration for r in results)
-    total_processing = sum(r.processing_time for r in results)
-    total_words = sum(r.word_count for r in results)
-    
-    files_with_keywords = len([r for r in results if r.found_keywords])
-    
-    report = f"""# 📊 Reporte de Transcripción Masiva
-
-## 📈 Estadísticas Generales
-- **Total de archivos procesados:** {total_files}
-- **Transcripciones exitosas:** {successful}
-- **Duración total de audio:** {total_duration:.1f} segundos ({total_duration/60:.1f} minutos)
-- **Tiempo total de procesamiento:** {total_processing:.1f} segundos
-- **Total de palabras transcritas:** {total_words:,}
-- **Archivos con palabras clave:** {files_with_keywords}
-
-## 🔍 Palabras Clave Buscadas
-{', '.join(keywords) if keywords else 'Ninguna'}
-
-## 📄 Detalle por Archivo
-"""
-    
-    for result in results:
-        status = "✅" if result.transcription else "❌"
-        keywords_found = ", ".join(result.found_keywords) if result.found_keywords else "Ninguna"
-        
-        report += f"""
-### {status} {result.filename}
-- **Duración:** {result.duration:.1f}s
-- **Tiempo de procesamiento:** {result.processing_time:.1f}s
-- **Palabras:** {result.word_count}
-- **Palabras clave encontradas:** {keywords_found}
-"""
-    
-    return report
-
 def opciones():
     """Keyword selection interface"""
     keywords = st_tags(
@@ -270,6 +130,13 @@ def opciones():
     )
     return keywords
 
+def reset_batch_results():
+    """Forget the results of the last batch (table, indexes and download)"""
+    st.session_state.processing_results = []
+    st.session_state.token_indexes = {}
+    st.session_state.fuzzy_vocabulary = FuzzyVocabulary()
+    st.session_state.batch_summary = None
+
 def cleanup_temp_directory():
     """Clean up temporary directory"""
     if st.session_state.current_temp_dir and os.path.exists(st.session_state.current_temp_dir):
@@ -316,46 +183,92 @@ def parse_srt_file(srt_file_path: str) -> List[SRTSegment]:
     
     return segments
 
-def check_segment_for_keywords(segment: SRTSegment, keywords: List[str]) -> bool:
-    """Check if segment contains any keywords"""
-    if not segment or not segment.text or not keywords:
-        return False
-        
-    text_lower = segment.text.lower()
-    return any(keyword.lower().strip() in text_lower for keyword in keywords if keyword and keyword.strip())
+@st.fragment
+def snippet_player(source_path: str, start: float, end: float, key: str):
+    """Extract and play one hit on demand; only this fragment reruns"""
+    if st.button(f"▶️ Escuchar {format_timestamp(start)} → {format_timestamp(end)}", key=key):
+        try:
+            st.audio(extract_snippet(source_path, start, end))
+        except Exception as e:
+            st.error(f"Error extrayendo el fragmento: {e}")
 
-def format_srt_segment_html(segment: SRTSegment, keywords: List[str]) -> str:
-    """Format a single SRT segment as HTML"""
-    try:
-        highlighted_text, _ = highlight_keywords_in_text(segment.text, keywords)
-        
-        # Style the time stamp based on whether it contains keywords
-        time_style = "color: #d32f2f; font-weight: bold;" if segment.contains_keywords else "color: #666;"
-        
-        return f"""
-        <div style="margin: 15px 0; padding: 10px; border-left: 3px solid {'#d32f2f' if segment.contains_keywords else '#ccc'}; background-color: {'#fff3e0' if segment.contains_keywords else '#f9f9f9'};">
-            <div style="font-size: 12px; {time_style} margin-bottom: 5px;">
-                <strong>{segment.index}</strong> | {segment.start_time} → {segment.end_time}
-            </div>
-            <div style="font-size: 14px; line-height: 1.4;">
-                {highlighted_text}
-            </div>
-        </div>
-        """
-    except Exception as e:
-        # Si hay error formateando, devolver versión básica
-        return f"""
-        <div style="margin: 15px 0; padding: 10px; border-left: 3px solid #ccc; background-color: #f9f9f9;">
-            <div style="font-size: 12px; color: #666; margin-bottom: 5px;">
-                <strong>{segment.index}</strong> | {segment.start_time} → {segment.end_time}
-            </div>
-            <div style="font-size: 14px; line-height: 1.4;">
-                {segment.text}
-            </div>
-        </div>
-        """
-
-def display_enhanced_srt_for_file(srt_file_path: str, keywords: List[str], filename: str):
+def render_segment_viewer(segments: List[SRTSegment], keywords: List[str], keyword_hits: List[Dict],
+                          audio_path: str, vocabulary: FuzzyVocabulary, key: str):
+    """Paginated segment viewer: one HTML block per page plus jump-to-hit navigation"""
+    page_key, target_key = f"{key}_page", f"{key}_target"
+    hit_positions = [position for position, segment in enumerate(segments) if segment.contains_keywords]
+    hits_by_segment: Dict[int, List[Dict]] = {}
+    for hit in keyword_hits or []:
+        hits_by_segment.setdefault(hit['segment'] + 1, []).append(hit)
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col2:
+        page_size = st.selectbox("Segmentos por página", PAGE_SIZES, index=0, key=f"{key}_size")
+    pages = page_count(len(segments), page_size)
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+
+    def go_to(position: int):
+        """Move the viewer to the page holding a segment and outline it"""
+        st.session_state[page_key] = page_of(position, page_size)
+        st.session_state[target_key] = segments[position].index
+
+    with col1:
+        page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+    start, stop = (page - 1) * page_size, min(page * page_size, len(segments))
+    with col3:
+        if hit_positions:
+            hit_labels = {
+                f"#{segments[p].index} · {segments[p].start_time} · {segments[p].text[:60]}": p
+                for p in hit_positions
+            }
+            st.selectbox(
+                "🎯 Ir al acierto",
+                list(hit_labels),
+                index=None,
+                placeholder=f"{len(hit_positions)} segmentos con aciertos",
+                key=f"{key}_jump",
+                on_change=lambda: go_to(hit_labels[st.session_state[f"{key}_jump"]])
+            )
+
+    if hit_positions:
+        previous_hits = [p for p in hit_positions if p < start]
+        next_hits = [p for p in hit_positions if p >= stop]
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("◀️ Acierto anterior", key=f"{key}_prev", disabled=not previous_hits,
+                      on_click=go_to, args=(previous_hits[-1] if previous_hits else 0,), use_container_width=True)
+        with col2:
+            st.button("Acierto siguiente ▶️", key=f"{key}_next", disabled=not next_hits,
+                      on_click=go_to, args=(next_hits[0] if next_hits else 0,), use_container_width=True)
+
+    # Solo se resaltan y envían los segmentos de la página actual
+    rows = []
+    for segment in segments[start:stop]:
+        text, _ = mark_keywords(segment.text, keywords, KEYWORD_MARK_CLASS, '</mark>', match_tolerance, vocabulary)
+        rows.append({
+            'index': segment.index, 'start_time': segment.start_time, 'end_time': segment.end_time,
+            'text': text, 'hit': segment.contains_keywords, 'hits': hits_by_segment.get(segment.index),
+        })
+    st.markdown(render_segment_page(rows, format_timestamp, st.session_state.get(target_key)),
+                unsafe_allow_html=True)
+    st.caption(f"Segmentos {start + 1}–{stop} de {len(segments)}")
+
+    # Reproducir solo el fragmento del acierto, extraído bajo demanda
+    if audio_path and os.path.exists(audio_path):
+        for segment in segments[start:stop]:
+            if not segment.contains_keywords:
+                continue
+            windows = [(h['start'], h['end']) for h in hits_by_segment.get(segment.index, [])] or [
+                (parse_timestamp(segment.start_time), parse_timestamp(segment.end_time))
+            ]
+            for n, (window_start, window_end) in enumerate(windows):
+                snippet_player(audio_path, window_start, window_end, key=f"{key}_snippet_{segment.index}_{n}")
+
+@st.fragment
+def display_enhanced_srt_for_file(srt_file_path: str, keywords: List[str], filename: str,
+                                  keyword_hits: List[Dict] = None, audio_path: str = None,
+                                  token_index: TokenIndex = None, vocabulary: FuzzyVocabulary = None):
     """Display SRT file with enhanced formatting and keyword highlighting - Solo segmentos relevantes"""
     try:
         if not srt_file_path or not os.path.exists(srt_file_path):
@@ -368,16 +281,18 @@ def display_enhanced_srt_for_file(srt_file_path: str, keywords: List[str], filen
             st.warning(f"No se encontraron segmentos en el archivo SRT de {filename}")
             return
         
-        # Check which segments contain keywords
+        # Segmentos con palabras clave según el índice de tokens (id = número SRT - 1)
+        if token_index is None:
+            token_index = TokenIndex((segment.text for segment in segments),
+                                     ids=(segment.index - 1 for segment in segments))
+        vocabulary = vocabulary or token_index.fuzzy_vocabulary()
+        keyword_ids = token_index.segments_with(keywords, match_tolerance, vocabulary)
         segments_with_keywords = []
         
         for segment in segments:
-            try:
-                if check_segment_for_keywords(segment, keywords):
-                    segment.contains_keywords = True
-                    segments_with_keywords.append(segment)
-            except Exception as e:
-                continue
+            if segment.index - 1 in keyword_ids:
+                segment.contains_keywords = True
+                segments_with_keywords.append(segment)
         
         # Display statistics
         total_segments = len(segments)
@@ -392,111 +307,205 @@ def display_enhanced_srt_for_file(srt_file_path: str, keywords: List[str], filen
         with col3:
             st.metric("Porcentaje", f"{(keyword_segments/total_segments*100):.1f}%" if total_segments > 0 else "0%")
         
-        # Determinar qué mostrar - SOLO segmentos con keywords, o todos si no hay keywords
+        # Segmentos con palabras clave, o la transcripción completa si no hay aciertos
         if keyword_segments > 0:
             segments_to_display = segments_with_keywords
             st.markdown("#### 🎯 Segmentos con palabras clave")
-            #st.info(f"Mostrando solo los {keyword_segments} segmentos que contienen las palabras clave buscadas.")
         else:
-            # Si no hay keywords, mostrar solo los primeros segmentos como muestra
-            segments_to_display = segments[:10]  # Solo 10 como muestra
-            st.markdown("#### 📋 Muestra de segmentos (sin palabras clave)")
-            st.info(f"No se encontraron palabras clave. Mostrando los primeros 10 segmentos de {total_segments} total.")
-        
-        if not segments_to_display:
-            st.info("No hay segmentos para mostrar.")
-            return
+            segments_to_display = segments
+            st.markdown("#### 📋 Segmentos (sin palabras clave)")
         
-        # Limitar segmentos para mejor rendimiento
-        max_segments = 20
-        if len(segments_to_display) > max_segments:
-            st.warning(f"Mostrando los primeros {max_segments} segmentos relevantes de {len(segments_to_display)} encontrados.")
-            segments_to_display = segments_to_display[:max_segments]
-        
-        # Mostrar segmentos de forma simple y estable
-        for segment in segments_to_display:
-            try:
-                # Resaltar texto
-                highlighted_text, _ = highlight_keywords_in_text(segment.text, keywords)
-                
-                # Mostrar con formato simple
-                st.markdown(f"""
-                <div style="padding: 12px; margin: 10px 0; border-left: 4px solid #d32f2f; background-color: #fff3e0; border-radius: 4px;">
-                    <div style="font-size: 12px; color: #666; margin-bottom: 8px; font-weight: bold;">
-                        🎯 Segmento #{segment.index} | ⏱️ {segment.start_time} → {segment.end_time}
-                    </div>
-                    <div style="font-size: 14px; line-height: 1.5;">
-                        {highlighted_text}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-            except Exception as e:
-                # Fallback super simple
-                st.write(f"**🎯 #{segment.index}** | ⏱️ {segment.start_time} → {segment.end_time}")
-                st.write(segment.text)
-                st.divider()
+        render_segment_viewer(segments_to_display, keywords, keyword_hits, audio_path, vocabulary,
+                              key=f"srt_view_{filename}")
                 
     except Exception as e:
         st.error(f"Error procesando marcas de tiempo para {filename}")
         st.info("Los archivos se procesaron correctamente. Puedes usar los archivos SRT descargados.")
 
-def highlight_keywords_in_text(text: str, keywords: List[str]) -> Tuple[str, List[str]]:
-    """Highlight keywords in text and return found terms"""
-    if not text or not keywords:
-        return text, []
-        
-    highlighted_text = text
-    found_terms = []
-    
-    for keyword in keywords:
-        if keyword and keyword.strip():  # Verificar que el keyword no esté vacío
-            # Create a case-insensitive pattern that preserves original case
-            try:
-                pattern = re.compile(re.escape(keyword.strip()), re.IGNORECASE)
-                if pattern.search(text):
-                    found_terms.append(keyword.strip())
-                    # Reemplazar de manera más segura
-                    highlighted_text = pattern.sub(
-                        lambda m: f'<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">{m.group()}</mark>',
-                        highlighted_text
-                    )
-            except re.error:
-                # Si hay error en regex, continuar con el siguiente keyword
-                continue
-    
-    return highlighted_text, found_terms
+def timeline_chart(counts: np.ndarray, keywords: List[str], bin_seconds: float,
+                   bin_labels: List[str] = None) -> alt.Chart:
+    """Heatmap of keyword hits per time bin (only non-empty cells are drawn)"""
+    rows, columns = np.nonzero(counts)
+    data = pd.DataFrame({
+        "Palabra clave": np.asarray(keywords, dtype=object)[rows],
+        "Inicio (min)": columns * bin_seconds / 60,
+        "Fin (min)": (columns + 1) * bin_seconds / 60,
+        "Aciertos": counts[rows, columns],
+    })
+    tooltip = ["Palabra clave", "Inicio (min)", "Aciertos"]
+    if bin_labels is not None:
+        data["Archivo"] = np.asarray(bin_labels, dtype=object)[columns]
+        tooltip.append("Archivo")
+    return alt.Chart(data).mark_rect().encode(
+        x=alt.X("Inicio (min):Q", title="Tiempo (min)", scale=alt.Scale(domain=[0, counts.shape[1] * bin_seconds / 60])),
+        x2="Fin (min):Q",
+        y=alt.Y("Palabra clave:N", sort=keywords, title=None),
+        color=alt.Color("Aciertos:Q", scale=alt.Scale(scheme="orangered")),
+        tooltip=tooltip
+    )
 
-def create_download_zip(results: List[TranscriptionResult], keywords: List[str]) -> bytes:
-    """Create ZIP file with all transcription results"""
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # Agregar reporte resumen
-        report = create_summary_report(results, keywords)
-        zip_file.writestr("REPORTE_TRANSCRIPCION.md", report.encode('utf-8'))
-        
-        # Agregar archivos individuales
-        for result in results:
-            if result.transcription:
-                base_name = os.path.splitext(result.filename)[0]
-                
-                # Archivo TXT
-                zip_file.writestr(f"transcripciones/{base_name}.txt", result.transcription.encode('utf-8'))
-                
-                # Archivo SRT con marcas de tiempo
-                if result.srt_path and os.path.exists(result.srt_path):
-                    with open(result.srt_path, 'r', encoding='utf-8') as srt_file:
-                        srt_content = srt_file.read()
-                    zip_file.writestr(f"transcripciones_srt/{base_name}.srt", srt_content.encode('utf-8'))
-                
-                # Archivo con keywords resaltadas
-                highlighted = highlight_keywords(result.transcription, keywords)
-                zip_file.writestr(f"resaltados/{base_name}_resaltado.html", 
-                                f"<html><body><pre>{highlighted}</pre></body></html>".encode('utf-8'))
-    
-    zip_buffer.seek(0)
-    return zip_buffer.read()
+def display_timeline(results: List[TranscriptionResult], keywords: List[str]):
+    """Keyword heatmap over the whole batch, with the files laid end to end in order"""
+    st.markdown("### 🗺️ Palabras clave en el tiempo")
+    requested = st.select_slider(
+        "Intervalo",
+        options=[10, 30, 60, 300, 600],
+        value=TIMELINE_BIN_SECONDS,
+        format_func=lambda s: f"{s} s" if s < 60 else f"{s // 60} min",
+        key="timeline_bin"
+    )
+    total_duration = sum(r.duration for r in results)
+    bin_seconds = fit_bin_seconds(total_duration, requested)
+    counts, offsets = batch_timeline([(r.keyword_hits, r.duration) for r in results], keywords, bin_seconds)
+    if not counts.any():
+        st.info("No hay aciertos para dibujar")
+        return
+
+    # Archivo en el que empieza cada intervalo
+    starts = np.arange(counts.shape[1]) * bin_seconds
+    bin_files = [results[i].filename for i in np.searchsorted(offsets, starts, side="right") - 1]
+    st.altair_chart(timeline_chart(counts, keywords, bin_seconds, bin_files), use_container_width=True)
+    if bin_seconds != requested:
+        st.caption(f"Intervalo ampliado a {bin_seconds} s para {format_clock(total_duration)} de audio")
+
+def results_table(results: List[TranscriptionResult]) -> pd.DataFrame:
+    """One row per processed file, indexed by its position in `results`"""
+    rows = []
+    for result in results:
+        counts = result.keyword_counts or {keyword: 1 for keyword in result.found_keywords}
+        rows.append({
+            "Archivo": result.filename,
+            "Duración (s)": round(result.duration, 1),
+            "Aciertos": sum(counts.values()),
+            "Palabras clave": ", ".join(result.found_keywords),
+            "RTF": round(result.processing_time / result.duration, 3) if result.duration else None,
+            "Palabras": result.word_count,
+            "Duplicado de": result.duplicate_of or "",
+        })
+    return pd.DataFrame(rows, index=range(len(results)))
+
+def display_file_detail(result: TranscriptionResult, keywords: List[str]):
+    """Text and timestamps of a single file of the batch"""
+    st.markdown(f"### {'🎯' if result.found_keywords else '📄'} {result.filename}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Duración", format_clock(result.duration))
+    with col2:
+        st.metric("Aciertos", sum((result.keyword_counts or {}).values()))
+    with col3:
+        st.metric("RTF", f"{result.processing_time / result.duration:.2f}" if result.duration else "-")
+    with col4:
+        st.metric("Palabras", result.word_count)
+
+    if result.found_keywords:
+        st.success(f"Palabras encontradas: **{', '.join(result.found_keywords)}**")
+    else:
+        st.write("No se encontraron palabras clave")
+
+    tab1, tab2, tab3 = st.tabs(["📝 Texto resaltado", "⏱️ Marcas de tiempo", "🗺️ Mapa de calor"])
+
+    with tab1:
+        highlighted_text = highlight_keywords(result.transcription, keywords, st.session_state.fuzzy_vocabulary)
+        st.markdown(highlighted_text, unsafe_allow_html=True)
+
+    with tab2:
+        if result.srt_path:
+            display_enhanced_srt_for_file(result.srt_path, keywords, result.filename, result.keyword_hits,
+                                          result.filepath, st.session_state.token_indexes.get(result.filepath),
+                                          st.session_state.fuzzy_vocabulary)
+        else:
+            st.info("No hay archivo SRT disponible")
+
+    with tab3:
+        bin_seconds = fit_bin_seconds(result.duration, st.session_state.get("timeline_bin", TIMELINE_BIN_SECONDS))
+        counts = keyword_timeline(result.keyword_hits, keywords, result.duration, bin_seconds)
+        if counts.any():
+            st.altair_chart(timeline_chart(counts, keywords, bin_seconds), use_container_width=True)
+        else:
+            st.info("No hay aciertos para dibujar")
+
+def display_batch_results(results: List[TranscriptionResult]):
+    """
+    Resumen del lote: métricas, descarga y una tabla ordenable de archivos.
+    Solo se dibuja el detalle del archivo seleccionado, así el coste de cada
+    recarga no depende del tamaño del lote.
+    """
+    summary = st.session_state.batch_summary or {}
+    keywords = summary.get("keywords", [])
+
+    st.markdown("---")
+    st.markdown("## 📊 Resumen del Procesamiento")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Archivos procesados", len(results))
+    with col2:
+        st.metric("Con palabras clave", len([r for r in results if r.found_keywords]))
+    with col3:
+        st.metric("Total palabras", sum(r.word_count for r in results))
+    with col4:
+        st.metric("Tiempo total", f"{summary.get('total_time', 0):.1f}s")
+
+    if summary.get("zip_data"):
+        st.download_button(
+            label="📥 Descargar todos los resultados (ZIP)",
+            data=summary["zip_data"],
+            file_name=f"transcripciones_{int(summary.get('finished_at', time.time()))}.zip",
+            mime="application/zip"
+        )
+
+    if summary.get("stop_reason"):
+        st.warning(
+            f"⏹️ Lote detenido ({summary['stop_reason']}): {len(summary['pending'])} archivos sin procesar. "
+            "El reporte y el ZIP incluyen lo terminado; vuelve a procesar el mismo ZIP para continuar "
+            "desde los puntos de control."
+        )
+
+    if summary.get("errors"):
+        with st.expander(f"❌ {len(summary['errors'])} archivos con errores"):
+            st.dataframe(pd.DataFrame(summary["errors"], columns=["Archivo", "Error"]),
+                         hide_index=True, use_container_width=True)
+
+    if keywords:
+        display_timeline(results, keywords)
+
+    st.markdown("### 📋 Resultados por archivo")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        only_hits = st.checkbox("Solo archivos con palabras clave", key="results_only_hits")
+    with col2:
+        name_filter = st.text_input("Filtrar por nombre", key="results_name_filter",
+                                    placeholder="audio_seg_1...")
+
+    table = results_table(results)
+    if only_hits:
+        table = table[table["Aciertos"] > 0]
+    if name_filter:
+        table = table[table["Archivo"].str.contains(name_filter, case=False, regex=False)]
+
+    event = st.dataframe(
+        table,
+        key="results_table",
+        on_select="rerun",
+        selection_mode="single-row",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Duración (s)": st.column_config.NumberColumn(format="%.1f"),
+            "RTF": st.column_config.NumberColumn(
+                format="%.2f", help="Tiempo de procesamiento / duración del audio"
+            ),
+        }
+    )
+
+    # Las posiciones seleccionadas se refieren a la tabla filtrada, aunque se ordene en el navegador
+    selected = [row for row in event.selection.rows if row < len(table)]
+    if selected:
+        display_file_detail(results[table.index[selected[0]]], keywords)
+    else:
+        st.caption(f"{len(table)} de {len(results)} archivos · selecciona una fila para ver su "
+                   "transcripción y sus marcas de tiempo")
 
 # Interfaz principal
 def main():
@@ -522,8 +531,13 @@ def main():
         
         if st.button("🗑️ Limpiar archivos temporales"):
             cleanup_temp_directory()
-            st.session_state.processing_results = []
+            st.session_state.zip_contents = None
+            reset_batch_results()
             st.success("Archivos limpiados")
+        
+        if st.session_state.archive_hash and st.button("♻️ Olvidar progreso guardado"):
+            CheckpointStore(st.session_state.archive_hash).clear()
+            st.success("Progreso del ZIP actual eliminado")
     
     # Upload ZIP file
     zip_file = st.file_uploader(
@@ -533,9 +547,35 @@ def main():
     )
     
     if zip_file is not None:
-        with st.spinner("Analizando archivo ZIP..."):
-            audio_files, temp_dir = get_audio_files_from_zip(zip_file)
-            st.session_state.current_temp_dir = temp_dir
+        # Hash del ZIP una sola vez por subida: clics en la tabla o cambios de página no lo recalculan
+        if st.session_state.zip_file_id != zip_file.file_id:
+            st.session_state.zip_file_hash = hash_bytes(zip_file.getvalue())
+            st.session_state.zip_file_id = zip_file.file_id
+        archive_hash = st.session_state.zip_file_hash
+        # Extraer, validar y buscar duplicados una sola vez por ZIP, no en cada recarga
+        contents = st.session_state.zip_contents
+        if (not contents or archive_hash != st.session_state.archive_hash
+                or not os.path.isdir(st.session_state.current_temp_dir or "")):
+            with st.spinner("Analizando archivo ZIP..."):
+                cleanup_temp_directory()
+                reset_batch_results()
+                audio_files, temp_dir = get_audio_files_from_zip(zip_file)
+                # Filtrar archivos válidos manteniendo el orden
+                valid_files = [f for f in audio_files if validate_audio_file(f)]
+                contents = {
+                    "audio_files": audio_files,
+                    "valid_files": valid_files,
+                    # Detectar audios repetidos para transcribir cada contenido una sola vez
+                    "duplicates": find_duplicate_audio(valid_files),
+                }
+                st.session_state.current_temp_dir = temp_dir
+                st.session_state.archive_hash = archive_hash
+                st.session_state.zip_contents = contents
+        
+        audio_files = contents["audio_files"]
+        valid_files = contents["valid_files"]
+        duplicates = contents["duplicates"]
+        temp_dir = st.session_state.current_temp_dir
         
         if not audio_files:
             st.error("❌ No se encontraron archivos de audio válidos en el ZIP")
@@ -545,15 +585,15 @@ def main():
         
         # Mostrar lista de archivos encontrados (ahora ordenados)
         with st.expander("📋 Archivos encontrados (en orden de procesamiento)", expanded=False):
-            for i, audio_file in enumerate(audio_files, 1):
-                filename = os.path.basename(audio_file)
-                file_size = os.path.getsize(audio_file) / (1024 * 1024)  # MB
-                is_valid = validate_audio_file(audio_file)
-                status = "✅" if is_valid else "❌"
-                st.write(f"**{i}.** {status} **{filename}** ({file_size:.2f} MB)")
-        
-        # Filtrar archivos válidos manteniendo el orden
-        valid_files = [f for f in audio_files if validate_audio_file(f)]
+            valid = set(valid_files)
+            st.dataframe(
+                pd.DataFrame({
+                    "Archivo": [os.path.relpath(f, temp_dir) for f in audio_files],
+                    "Tamaño (MB)": [round(os.path.getsize(f) / (1024 * 1024), 2) for f in audio_files],
+                    "Válido": ["✅" if f in valid else "❌" for f in audio_files],
+                }, index=range(1, len(audio_files) + 1)),
+                use_container_width=True
+            )
         
         if not valid_files:
             st.error("❌ No hay archivos de audio válidos para procesar")
@@ -566,10 +606,42 @@ def main():
             keywords = opciones()
             if keywords:
                 st.info(f"🔍 Buscando: **{', '.join(keywords)}**")
+            
+            streaming = st.checkbox(
+                "📡 Modo streaming (archivos de varias horas)",
+                value=False,
+                help="Decodifica cada audio por ventanas de 5 minutos para limitar el uso de memoria"
+            )
+            cascade = st.checkbox(
+                "🪜 Modo cascada (vigilancia de palabras clave)",
+                value=False,
+                help=f"Transcribe todo con el modelo '{CASCADE_FAST_MODEL}' y solo vuelve a transcribir "
+                     "con el modelo principal las ventanas con posibles palabras clave"
+            )
+            workers = st.number_input(
+                "🧵 Archivos en paralelo",
+                min_value=1, max_value=8, value=1,
+                help="Cada trabajador carga su propia copia del modelo; con más de uno, "
+                     "los archivos más largos se transcriben primero"
+            )
+            budget_minutes = st.number_input(
+                "⏱️ Límite de tiempo (minutos, 0 = sin límite)",
+                min_value=0, max_value=24 * 60, value=0,
+                help="Al agotarse, el lote se detiene al terminar el archivo en curso y conserva lo procesado"
+            )
+            use_watchdog = st.checkbox(
+                "🐕 Vigilancia por archivo",
+                value=True,
+                help="Transcribe en procesos aparte con un tiempo límite según la duración de cada archivo: "
+                     "si un archivo corrupto se cuelga, se aborta, se marca como error y el lote continúa. "
+                     "Cada proceso carga su propia copia del modelo"
+            )
         
         with col2:
             st.metric("Archivos válidos", len(valid_files))
             st.metric("Archivos inválidos", len(audio_files) - len(valid_files))
+            if duplicates:
+                st.metric("Duplicados", len(duplicates))
         
         # Procesamiento
         if st.button('🚀 Procesar todos los archivos', type="primary"):
@@ -577,118 +649,104 @@ def main():
                 st.warning("⚠️ Agrega al menos una palabra clave para continuar")
                 return
             
-            results = []
-            output_dir = tempfile.mkdtemp()
+            reset_batch_results()
+            # Los resultados viven en la sesión desde el primer archivo: sobreviven a una interrupción
+            run = BatchRun(results=st.session_state.processing_results,
+                           vocabulary=st.session_state.fuzzy_vocabulary,
+                           token_indexes=st.session_state.token_indexes)
+            options = BatchOptions(
+                keywords=keywords, workers=workers, watchdog=use_watchdog, streaming=streaming, cascade=cascade,
+                profile=decode_profile, quantized=quantized_inference, engine=inference_engine,
+                tolerance=match_tolerance,
+            )
+            
+            # Puntos de control por archivo para poder reanudar el lote
+            checkpoint = CheckpointStore(st.session_state.archive_hash)
+            if checkpoint.count():
+                st.info(f"♻️ Reanudando lote: {checkpoint.count()} archivos ya procesados se omitirán")
             
             # Progress bars
             overall_progress = st.progress(0)
             status_text = st.empty()
+            # Un único indicador en vivo: los resultados se ven en la tabla al terminar
+            live_summary = st.empty()
+            status_text.text("⏳ Leyendo duraciones...")
+            counts = {"resumed": 0}
+            cascade_stats = {"windows": 0, "refined_seconds": 0.0, "audio_seconds": 0.0}
             
-            # Contenedor para resultados
-            results_container = st.container()
+            token = CancelToken(budget_minutes * 60 or None)
+            st.button("⏹️ Detener procesamiento", key="stop_batch",
+                      help="Termina el archivo en curso y conserva lo procesado, con su reporte y ZIP")
             
-            start_total = time.time()
+            def show_progress(event: str, data: Dict):
+                """Render run_batch events; each file arrives after its checkpoint is saved"""
+                if event == "start":
+                    counts["resumed"] = data["resumed"]
+                    status_text.text(f"🎵 Transcribiendo {data['to_transcribe']} archivos "
+                                     f"({format_clock(data['audio_seconds'])} de audio)...")
+                    return
+                if event != "file":
+                    return
+                if data.get("warning"):
+                    st.warning(data["warning"])
+                for stat in cascade_stats:
+                    cascade_stats[stat] += (data.get("cascade") or {}).get(stat, 0)
+                eta = data["eta_seconds"]
+                overall_progress.progress(data["fraction"])
+                status_text.text(
+                    f"🎵 {data['done_files']}/{data['total_files']} archivos · "
+                    f"{format_clock(data['done_seconds'])} de {format_clock(data['total_seconds'])} de audio"
+                    + (f" · RTF {data['rtf']:.2f} · quedan ~{format_clock(eta)}" if eta is not None else "")
+                )
+                with_keywords = len([r for r in run.results if r.found_keywords])
+                live_summary.caption(
+                    f"🎯 {with_keywords} de {len(run.results)} archivos con palabras clave"
+                    + (f" · ❌ {len(run.errors)} con errores" if run.errors else "")
+                )
             
-            for i, audio_file in enumerate(valid_files):
-                filename = os.path.basename(audio_file)
-                
-                # Actualizar progreso
-                progress = (i + 1) / len(valid_files)
-                overall_progress.progress(progress)
-                status_text.text(f"🎵 Procesando archivo {i+1}/{len(valid_files)}: {filename}")
-                
-                # Transcribir archivo
-                transcription_result = get_transcribe_safe(audio_file)
-                
-                if transcription_result.get("error"):
-                    st.error(f"❌ Error en archivo {i+1} ({filename}): {transcription_result['error']}")
-                    continue
-                
-                # Procesar resultados
-                text = transcription_result.get("text", "")
-                found_keywords = find_keywords_in_text(text, keywords)
-                word_count = len(text.split()) if text else 0
-                
-                # Guardar archivos individuales
-                saved_files = save_individual_files(transcription_result, filename, output_dir)
-                
-                # Crear objeto resultado
-                result = TranscriptionResult(
-                    filename=filename,
-                    filepath=audio_file,
-                    transcription=text,
-                    duration=len(transcription_result.get("segments", [])) * 1.0,  # Aproximado
-                    processing_time=transcription_result.get("processing_time", 0),
-                    found_keywords=found_keywords,
-                    word_count=word_count,
-                    srt_path=saved_files.get('srt')
+            try:
+                run_batch(
+                    audio_files, temp_dir, options, tempfile.mkdtemp(), emit=show_progress, cancel=token,
+                    archive_hash=st.session_state.archive_hash, index_metadata={"zip": zip_file.name}, run=run,
+                    load_model=lambda model_name, replica: load_backend(quantized_inference, inference_engine,
+                                                                        model_name, replica)
                 )
-                
-                results.append(result)
-                
-                # Mostrar resultado inmediato
-                with results_container:
-                    with st.expander(f"{'🎯' if found_keywords else '📄'} {filename}", expanded=bool(found_keywords)):
-                        if found_keywords:
-                            st.success(f"Palabras encontradas: **{', '.join(found_keywords)}**")
-                            
-                            # Usar tabs en lugar de expanders anidados
-                            tab1, tab2 = st.tabs(["📝 Texto resaltado", "⏱️ Marcas de tiempo"])
-                            
-                            with tab1:
-                                highlighted_text = highlight_keywords(text, keywords)
-                                st.markdown(highlighted_text, unsafe_allow_html=True)
-                            
-                            with tab2:
-                                if saved_files.get('srt'):
-                                    display_enhanced_srt_for_file(saved_files['srt'], keywords, filename)
-                                else:
-                                    st.info("No hay archivo SRT disponible")
-                        else:
-                            st.write("No se encontraron palabras clave")
-                            
-                            # Usar tabs también para archivos sin keywords
-                            tab1, tab2 = st.tabs(["📝 Texto completo", "⏱️ Marcas de tiempo"])
-                            
-                            with tab1:
-                                st.write(text[:300] + "..." if len(text) > 300 else text)
-                            
-                            with tab2:
-                                if saved_files.get('srt'):
-                                    display_enhanced_srt_for_file(saved_files['srt'], keywords, filename)
-                                else:
-                                    st.info("No hay archivo SRT disponible")
+            finally:
+                # Botón "Detener" o cualquier recarga interrumpen el script en la siguiente llamada a
+                # Streamlit: run_batch cierra el lote con lo ya terminado y aquí se guarda su resumen.
+                # El ZIP de descarga se genera una vez y se reutiliza en cada recarga
+                st.session_state.batch_summary = {
+                    "keywords": keywords,
+                    "total_time": run.elapsed,
+                    "errors": run.errors,
+                    "pending": run.pending,
+                    "stop_reason": run.stop_reason,
+                    "finished_at": time.time(),
+                    "zip_data": create_download_zip(run.results, keywords, run.pending, run.stop_reason,
+                                                    match_tolerance, run.vocabulary) if run.results else None,
+                }
             
             # Finalizar procesamiento
-            total_time = time.time() - start_total
-            st.session_state.processing_results = results
-            
-            overall_progress.progress(1.0)
-            status_text.text(f"✅ Procesamiento completado en {total_time:.2f} segundos")
-            
-            # Mostrar resumen
-            st.markdown("---")
-            st.markdown("## 📊 Resumen del Procesamiento")
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Archivos procesados", len(results))
-            with col2:
-                st.metric("Con palabras clave", len([r for r in results if r.found_keywords]))
-            with col3:
-                st.metric("Total palabras", sum(r.word_count for r in results))
-            with col4:
-                st.metric("Tiempo total", f"{total_time:.1f}s")
-            
-            # Botón de descarga
-            if results:
-                zip_data = create_download_zip(results, keywords)
-                st.download_button(
-                    label="📥 Descargar todos los resultados (ZIP)",
-                    data=zip_data,
-                    file_name=f"transcripciones_{int(time.time())}.zip",
-                    mime="application/zip"
+            if run.stop_reason:
+                status_text.text(f"⏹️ Procesamiento detenido ({run.stop_reason}) tras {run.elapsed:.2f} segundos")
+            else:
+                overall_progress.progress(1.0)
+                status_text.text(f"✅ Procesamiento completado en {run.elapsed:.2f} segundos")
+            saved_by_duplicates = len([r for r in run.results if r.duplicate_of])
+            if saved_by_duplicates:
+                st.info(f"🧬 {saved_by_duplicates} transcripciones ahorradas por archivos duplicados")
+            if counts["resumed"]:
+                st.info(f"♻️ {counts['resumed']} archivos recuperados de puntos de control sin volver a transcribir")
+            if cascade and cascade_stats["audio_seconds"]:
+                refined_share = cascade_stats["refined_seconds"] / cascade_stats["audio_seconds"]
+                st.info(
+                    f"🪜 Cascada: {cascade_stats['windows']} ventanas candidatas, "
+                    f"{refined_share:.1%} del audio re-transcrito con el modelo principal"
                 )
+            
+        
+        if st.session_state.processing_results:
+            display_batch_results(st.session_state.processing_results)
     
     else:
         st.info('📁 Sube un archivo ZIP con audios para comenzar')
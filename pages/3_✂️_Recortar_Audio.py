@@ -1,13 +1,12 @@
 import streamlit as st
-from pydub import AudioSegment, silence
 import os
-import zipfile
 import tempfile
 import shutil
 import time
-from typing import List, Tuple, Dict
-from dataclasses import dataclass
-import io
+from utils.workspace import AudioWorkspace
+from utils.cancellation import CancelToken
+from utils.splitter import (calculate_estimated_segments, create_zip_advanced, divide_audio_advanced,
+                            format_duration, get_audio_info)
 
 st.set_page_config(
     page_title="Recortar Audios Extensos", 
@@ -23,206 +22,40 @@ if 'segments_info' not in st.session_state:
     st.session_state.segments_info = []
 if 'temp_dir' not in st.session_state:
     st.session_state.temp_dir = None
+if 'workspace' not in st.session_state:
+    st.session_state.workspace = None
+if 'workspace_key' not in st.session_state:
+    st.session_state.workspace_key = None
+if 'split_stop_reason' not in st.session_state:
+    st.session_state.split_stop_reason = None
 
-@dataclass
-class SegmentInfo:
-    filename: str
-    filepath: str
-    duration_seconds: float
-    start_time: float
-    end_time: float
-    file_size_mb: float
-
-def get_audio_info(file_path: str) -> Dict:
-    """Obtener información básica del archivo de audio"""
-    try:
-        audio = AudioSegment.from_file(file_path)
-        duration_seconds = len(audio) / 1000
-        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-        
-        return {
-            'duration_seconds': duration_seconds,
-            'duration_formatted': format_duration(duration_seconds),
-            'file_size_mb': file_size_mb,
-            'sample_rate': audio.frame_rate,
-            'channels': audio.channels,
-            'format': audio.sample_width * 8,  # bits per sample
-            'success': True
-        }
-    except Exception as e:
-        return {'success': False, 'error': str(e)}
-
-def format_duration(seconds: float) -> str:
-    """Formatear duración en formato legible"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    
-    if hours > 0:
-        return f"{hours}h {minutes}m {secs}s"
-    elif minutes > 0:
-        return f"{minutes}m {secs}s"
-    else:
-        return f"{secs}s"
-
-def calculate_estimated_segments(duration_seconds: float, interval_minutes: int) -> int:
-    """Calcular número estimado de segmentos"""
-    interval_seconds = interval_minutes * 60
-    return int(duration_seconds / interval_seconds) + (1 if duration_seconds % interval_seconds > 0 else 0)
-
-def divide_audio_advanced(
-    file_path: str, 
-    interval_minutes: int = 2,
-    silence_detection: bool = True,
-    min_silence_len: int = 1000,
-    silence_thresh_adjustment: int = 16,
-    fade_duration: int = 100,
-    output_format: str = "mp3",
-    output_quality: str = "medium"
-) -> Tuple[List[SegmentInfo], str]:
-    """
-    Función avanzada para dividir audio con múltiples opciones
-    """
-    try:
-        # Crear directorio temporal único
-        temp_dir = tempfile.mkdtemp(prefix="audio_segments_")
-        
-        # Cargar el archivo de audio
-        audio = AudioSegment.from_file(file_path)
-        
-        # Configurar calidad de salida
-        bitrate_map = {
-            "low": "64k",
-            "medium": "128k", 
-            "high": "192k",
-            "very_high": "320k"
-        }
-        export_bitrate = bitrate_map.get(output_quality, "128k")
-        
-        # Convertir minutos a milisegundos
-        interval_ms = interval_minutes * 60 * 1000
-        
-        # Configurar umbral de silencio
-        silence_thresh = audio.dBFS - silence_thresh_adjustment
-        
-        # Variables para segmentación
-        start = 0
-        segment_count = 1
-        segments_info = []
-        
-        total_duration = len(audio)
-        
-        while start < total_duration:
-            end = min(start + interval_ms, total_duration)
-            segment = audio[start:end]
-            
-            # Detectar silencios si está habilitado
-            if silence_detection and end < total_duration:
-                try:
-                    silent_ranges = silence.detect_silence(
-                        segment, 
-                        min_silence_len=min_silence_len, 
-                        silence_thresh=silence_thresh
-                    )
-                    
-                    # Ajustar el corte al último silencio si existe
-                    if silent_ranges:
-                        # Buscar silencio cerca del final del segmento
-                        for silence_start, silence_end in reversed(silent_ranges):
-                            if silence_start >= (len(segment) - 30 * 1000):  # Últimos 30 segundos
-                                end = start + silence_start
-                                segment = audio[start:end]
-                                break
-                except Exception:
-                    # Si falla la detección de silencio, continuar sin ella
-                    pass
-            
-            # Aplicar fade in/out si está configurado
-            if fade_duration > 0:
-                segment = segment.fade_in(fade_duration).fade_out(fade_duration)
-            
-            # Generar nombre del archivo
-            segment_filename = f"audio_seg_{segment_count:03d}.{output_format}"
-            segment_filepath = os.path.join(temp_dir, segment_filename)
-            
-            # Exportar segmento
-            segment.export(
-                segment_filepath, 
-                format=output_format,
-                bitrate=export_bitrate
-            )
-            
-            # Crear información del segmento
-            segment_info = SegmentInfo(
-                filename=segment_filename,
-                filepath=segment_filepath,
-                duration_seconds=len(segment) / 1000,
-                start_time=start / 1000,
-                end_time=end / 1000,
-                file_size_mb=os.path.getsize(segment_filepath) / (1024 * 1024)
-            )
-            
-            segments_info.append(segment_info)
-            
-            # Actualizar contadores
-            start = end
-            segment_count += 1
-            
-            # Yield progress para el progress bar
-            progress = min(start / total_duration, 1.0)
-            yield progress, segments_info
-        
-        yield 1.0, segments_info  # Completado
-        
-    except Exception as e:
-        raise Exception(f"Error procesando audio: {str(e)}")
-
-def create_zip_advanced(segments: List[SegmentInfo], include_metadata: bool = True) -> bytes:
-    """Crear ZIP con los segmentos y metadata opcional"""
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Agregar archivos de audio
-        for segment in segments:
-            if os.path.exists(segment.filepath):
-                zipf.write(segment.filepath, segment.filename)
-        
-        # Agregar metadata si está habilitado
-        if include_metadata:
-            metadata_content = create_metadata_file(segments)
-            zipf.writestr("SEGMENTOS_INFO.txt", metadata_content)
+def get_workspace(uploaded_file) -> AudioWorkspace:
+    """Decodificar el archivo subido una sola vez por sesión y reutilizarlo"""
+    # Identificar la subida sin leerla: hashear horas de audio en cada recarga es caro
+    key = (uploaded_file.file_id, uploaded_file.name, uploaded_file.size)
+    if st.session_state.workspace is not None and st.session_state.workspace_key == key:
+        return st.session_state.workspace
     
-    zip_buffer.seek(0)
-    return zip_buffer.read()
-
-def create_metadata_file(segments: List[SegmentInfo]) -> str:
-    """Crear archivo de metadata con información de los segmentos"""
-    content = "📊 INFORMACIÓN DE SEGMENTOS DE AUDIO\n"
-    content += "=" * 50 + "\n\n"
-    
-    total_duration = sum(seg.duration_seconds for seg in segments)
-    total_size = sum(seg.file_size_mb for seg in segments)
-    
-    content += f"📈 RESUMEN GENERAL:\n"
-    content += f"• Total de segmentos: {len(segments)}\n"
-    content += f"• Duración total: {format_duration(total_duration)}\n"
-    content += f"• Tamaño total: {total_size:.2f} MB\n"
-    content += f"• Duración promedio por segmento: {format_duration(total_duration/len(segments))}\n\n"
+    # Archivo distinto: liberar el espacio de trabajo anterior
+    if st.session_state.workspace is not None:
+        st.session_state.workspace.close()
+        st.session_state.workspace = None
     
-    content += "📋 DETALLE POR SEGMENTO:\n"
-    content += "-" * 50 + "\n"
+    workspace_dir = tempfile.mkdtemp(prefix="audio_workspace_")
+    source_path = os.path.join(workspace_dir, os.path.basename(uploaded_file.name))
+    with open(source_path, "wb") as f:
+        f.write(uploaded_file.getvalue())
     
-    for i, segment in enumerate(segments, 1):
-        content += f"{i:2d}. {segment.filename}\n"
-        content += f"    ⏱️  Duración: {format_duration(segment.duration_seconds)}\n"
-        content += f"    📏 Tiempo: {format_duration(segment.start_time)} → {format_duration(segment.end_time)}\n"
-        content += f"    💾 Tamaño: {segment.file_size_mb:.2f} MB\n"
-        content += "\n"
-    
-    return content
+    st.session_state.workspace = AudioWorkspace(source_path, workspace_dir)
+    st.session_state.workspace_key = key
+    return st.session_state.workspace
 
 def cleanup_temp_files():
     """Limpiar archivos temporales"""
+    if st.session_state.workspace is not None:
+        st.session_state.workspace.close()
+        st.session_state.workspace = None
+        st.session_state.workspace_key = None
     if st.session_state.temp_dir and os.path.exists(st.session_state.temp_dir):
         try:
             shutil.rmtree(st.session_state.temp_dir)
@@ -308,6 +141,12 @@ def main():
         
         include_metadata = st.checkbox("Incluir archivo de información", value=True)
         
+        budget_minutes = st.number_input(
+            "⏱️ Límite de tiempo (minutos, 0 = sin límite)",
+            min_value=0, max_value=24 * 60, value=0,
+            help="Al agotarse, la división se detiene tras el segmento en curso y conserva los ya creados"
+        )
+        
         # Botón de limpieza
         if st.button("🗑️ Limpiar archivos temporales"):
             if cleanup_temp_files():
@@ -323,17 +162,19 @@ def main():
     )
     
     if uploaded_file is not None:
-        # Guardar archivo temporal
-        temp_file_path = f"temp_{uploaded_file.name}"
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Decodificar una sola vez por sesión en un PCM memory-mapped
+        try:
+            with st.spinner("Decodificando audio..."):
+                workspace = get_workspace(uploaded_file)
+        except Exception as e:
+            st.error(f"❌ Error al cargar el archivo: {e}")
+            return
         
         # Obtener información del archivo
-        audio_info = get_audio_info(temp_file_path)
+        audio_info = get_audio_info(workspace)
         
         if not audio_info['success']:
             st.error(f"❌ Error al cargar el archivo: {audio_info['error']}")
-            os.remove(temp_file_path)
             return
         
         # Mostrar información del archivo
@@ -367,38 +208,53 @@ def main():
                     st.markdown("### 🔄 Procesando Audio...")
                     progress_bar = st.progress(0)
                     status_text = st.empty()
+                    st.button("⏹️ Detener", key="stop_split",
+                              help="Termina el segmento en curso y conserva los segmentos ya creados")
                     
                     # Procesar audio
                     start_time = time.time()
                     segments_info = []
+                    token = CancelToken(budget_minutes * 60 or None)
+                    st.session_state.split_stop_reason = None
                     
                     processor = divide_audio_advanced(
-                        temp_file_path,
+                        workspace,
                         interval_minutes=interval,
                         silence_detection=silence_detection,
                         min_silence_len=min_silence_len,
                         silence_thresh_adjustment=silence_thresh_adj,
                         #fade_duration=fade_duration,
                         output_format=output_format,
-                        output_quality=output_quality
+                        output_quality=output_quality,
+                        cancel=token
                     )
                     
                     # Actualizar progreso
-                    for progress, current_segments in processor:
-                        progress_bar.progress(progress)
-                        status_text.text(f"Procesando segmento {len(current_segments)}/{estimated_segments}...")
-                        segments_info = current_segments
+                    completed = False
+                    try:
+                        for progress, current_segments in processor:
+                            segments_info = current_segments
+                            progress_bar.progress(progress)
+                            status_text.text(f"Procesando segmento {len(current_segments)}/{estimated_segments}...")
+                        completed = True
+                    finally:
+                        # "Detener" o una recarga interrumpen el script: se guardan los segmentos ya exportados
+                        if not completed:
+                            token.cancel()
+                        finished = bool(segments_info) and segments_info[-1].end_time * 1000 >= len(workspace)
+                        st.session_state.split_stop_reason = None if finished else token.reason
+                        st.session_state.segments_info = segments_info
+                        st.session_state.processing_complete = bool(segments_info)
+                        st.session_state.temp_dir = os.path.dirname(segments_info[0].filepath) if segments_info else None
                     
                     processing_time = time.time() - start_time
                     
-                    # Guardar información en session state
-                    st.session_state.segments_info = segments_info
-                    st.session_state.processing_complete = True
-                    st.session_state.temp_dir = os.path.dirname(segments_info[0].filepath) if segments_info else None
-                    
                     # Completar progreso
-                    progress_bar.progress(1.0)
-                    status_text.text(f"✅ Completado en {processing_time:.2f} segundos")
+                    if st.session_state.split_stop_reason:
+                        status_text.text(f"⏹️ Detenido ({st.session_state.split_stop_reason}) tras {processing_time:.2f} segundos")
+                    else:
+                        progress_bar.progress(1.0)
+                        status_text.text(f"✅ Completado en {processing_time:.2f} segundos")
                 
                 # Mostrar resultados
                 with info_container:
@@ -418,10 +274,6 @@ def main():
             
             except Exception as e:
                 st.error(f"❌ Error durante el procesamiento: {str(e)}")
-            finally:
-                # Limpiar archivo temporal original
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
     
     # Mostrar resultados si hay procesamiento completado
     if st.session_state.processing_complete and st.session_state.segments_info:
@@ -429,13 +281,19 @@ def main():
         st.markdown("### 📦 Resultados")
         
         segments_info = st.session_state.segments_info
+        stop_reason = st.session_state.split_stop_reason
+        if stop_reason:
+            st.warning(
+                f"⏹️ División detenida ({stop_reason}): {len(segments_info)} segmentos hasta "
+                f"{format_duration(segments_info[-1].end_time)}. El ZIP incluye los segmentos creados."
+            )
         
         # Botón de descarga
         col1, col2 = st.columns([3, 1])
         
         with col1:
             try:
-                zip_data = create_zip_advanced(segments_info, include_metadata)
+                zip_data = create_zip_advanced(segments_info, include_metadata, stop_reason)
                 
                 st.download_button(
                     label="📥 Descargar Todos los Segmentos (ZIP)",
@@ -0,0 +1,90 @@
+import streamlit as st
+import time
+import sqlite3
+from datetime import datetime
+from typing import Dict
+from whisper.utils import format_timestamp
+from utils.transcript_index import SEARCH_MODES, TranscriptIndex
+
+st.set_page_config(page_title='Buscar Transcripciones', page_icon='🔍', layout="wide")
+
+MARK_START = '<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">'
+MARK_END = '</mark>'
+
+@st.cache_resource
+def get_index() -> TranscriptIndex:
+    """Open (and create if needed) the shared transcript index"""
+    return TranscriptIndex()
+
+def format_result_html(row: Dict) -> str:
+    """Format one matching segment with its file, timestamps and snippet"""
+    start = format_timestamp(row['start'], always_include_hours=True)
+    end = format_timestamp(row['end'], always_include_hours=True)
+    run_date = datetime.fromtimestamp(row['created_at']).strftime('%Y-%m-%d %H:%M')
+    return f"""
+    <div style="padding: 12px; margin: 10px 0; border-left: 4px solid #d32f2f; background-color: #fff3e0; border-radius: 4px;">
+        <div style="font-size: 12px; color: #666; margin-bottom: 8px; font-weight: bold;">
+            📄 {row['filename']} | 🎯 Segmento #{row['position'] + 1} | ⏱️ {start} → {end} | 🗓️ {run_date} ({row['source']})
+        </div>
+        <div style="font-size: 14px; line-height: 1.5;">
+            {row['snippet']}
+        </div>
+    </div>
+    """
+
+if __name__ == "__main__":
+    st.title('🔍 Buscar en Transcripciones')
+    st.markdown("---")
+
+    index = get_index()
+    stats = index.stats()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Ejecuciones", stats['runs'])
+    with col2:
+        st.metric("Archivos indexados", stats['files'])
+    with col3:
+        st.metric("Segmentos", stats['segments'])
+
+    if not stats['segments']:
+        st.info('📭 Aún no hay transcripciones indexadas. Transcribe audios en las otras páginas para comenzar.')
+
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        query = st.text_input("Buscar:", placeholder="extorsión, \"necesito ayuda\"...")
+    with col2:
+        mode = st.selectbox(
+            "Modo",
+            SEARCH_MODES,
+            format_func={'palabras': 'Todas las palabras', 'frase': 'Frase exacta', 'avanzada': 'Sintaxis FTS5'}.get,
+            help="La búsqueda no distingue mayúsculas ni tildes"
+        )
+    with col3:
+        limit = st.number_input("Máx. resultados", min_value=10, max_value=1000, value=100, step=10)
+
+    if query:
+        try:
+            start_time = time.perf_counter()
+            results = index.search(query, mode=mode, limit=int(limit), mark_start=MARK_START, mark_end=MARK_END)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+        except sqlite3.OperationalError as e:
+            st.error(f"Consulta no válida: {e}")
+            results, elapsed_ms = None, 0
+
+        if results is not None:
+            files = len({row['file_key'] for row in results})
+            st.caption(f"{len(results)} segmentos en {files} archivos · {elapsed_ms:.1f} ms")
+
+            if not results:
+                st.warning("❌ No se encontraron coincidencias")
+            for row in results:
+                st.markdown(format_result_html(row), unsafe_allow_html=True)
+
+    with st.expander("📖 Ayuda de búsqueda"):
+        st.write("""
+        • **Todas las palabras:** segmentos que contienen cada palabra, en cualquier orden
+        • **Frase exacta:** las palabras juntas y en el mismo orden
+        • **Sintaxis FTS5:** operadores `OR`, `NOT`, prefijos (`extors*`) y `NEAR(a b, 5)`
+        • Mayúsculas y tildes se ignoran: `extorsion` encuentra "Extorsión"
+        """)
@@ -0,0 +1,43 @@
+import os
+import shutil
+import sys
+import tempfile
+import wave
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Las pruebas importan `utils` desde la raíz del repositorio, igual que las páginas
+sys.path.insert(0, ROOT)
+
+# Cachés, puntos de control, índices y colas de las pruebas en un directorio propio.
+# Se fija antes de importar `utils`: sus rutas se leen del entorno al importarse
+TEST_TEMP_DIR = tempfile.mkdtemp(prefix='isteraudio_tests_')
+os.environ['TEMP_DIR'] = TEST_TEMP_DIR
+os.environ['FAKE_BACKEND_SPEED'] = '0'
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_TEMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def make_wav(tmp_path):
+    """Write a mono 16 kHz WAV of noise; the seed makes its content (and fake transcript) unique"""
+    if shutil.which('ffmpeg') is None:
+        pytest.skip("requiere ffmpeg")
+
+    def make(name: str, seconds: float, seed: int = 0, directory: str = None) -> str:
+        path = os.path.join(directory or str(tmp_path), name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        samples = np.random.default_rng(seed).integers(-3000, 3000, int(seconds * 16000), dtype=np.int16)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(samples.tobytes())
+        return path
+
+    return make
@@ -0,0 +1,60 @@
+import os
+
+from utils.batch import BatchOptions, run_batch
+from utils.cancellation import CancelToken
+
+FIRST_KEYWORDS = ['robo', 'drogas']
+SECOND_KEYWORDS = ['emergencia', 'auxilio', 'extorsión']
+
+
+def make_batch(make_wav, tmp_path):
+    base_dir = str(tmp_path / 'lote')
+    files = [make_wav(f'audio_{i}.wav', 40 + 10 * i, seed=i, directory=base_dir) for i in range(3)]
+    return base_dir, files
+
+
+def run(files, base_dir, keywords, output_dir, archive_hash=None, tolerance=0, **kwargs):
+    events = []
+    options = BatchOptions(keywords=keywords, backend='fake', watchdog=False, tolerance=tolerance)
+    batch = run_batch(files, base_dir, options, output_dir, emit=lambda event, data: events.append((event, data)),
+                      archive_hash=archive_hash, index_source=None, **kwargs)
+    return batch, [data for event, data in events if event == 'file']
+
+
+def hits_by_file(batch):
+    return {r.filename: sorted((hit['keyword'], hit['segment']) for hit in r.keyword_hits) for r in batch.results}
+
+
+def test_resume_with_other_keywords_recomputes_hits(make_wav, tmp_path):
+    base_dir, files = make_batch(make_wav, tmp_path)
+    first, _ = run(files, base_dir, FIRST_KEYWORDS, str(tmp_path / 'a'), archive_hash='cambio-palabras')
+    assert {hit['keyword'] for r in first.results for hit in r.keyword_hits} <= set(FIRST_KEYWORDS)
+
+    resumed, file_events = run(files, base_dir, SECOND_KEYWORDS, str(tmp_path / 'b'),
+                               archive_hash='cambio-palabras', tolerance=1)
+    fresh, _ = run(files, base_dir, SECOND_KEYWORDS, str(tmp_path / 'c'), tolerance=1)
+
+    assert all(event['resumed'] for event in file_events)
+    assert hits_by_file(resumed) == hits_by_file(fresh)
+    assert any(hits_by_file(resumed).values())
+    assert [r.keyword_counts for r in resumed.results] == [r.keyword_counts for r in fresh.results]
+
+
+def test_cancelled_batch_resumes_only_pending_files(make_wav, tmp_path):
+    base_dir, files = make_batch(make_wav, tmp_path)
+    token = CancelToken()
+
+    def stop_after_first(event, data):
+        if event == 'file':
+            token.cancel()
+
+    options = BatchOptions(keywords=FIRST_KEYWORDS, backend='fake', watchdog=False)
+    stopped = run_batch(files, base_dir, options, str(tmp_path / 'a'), emit=stop_after_first, cancel=token,
+                        archive_hash='cancelado', index_source=None)
+    assert len(stopped.results) == 1
+    assert stopped.stop_reason and len(stopped.pending) == 2
+
+    finished, file_events = run(files, base_dir, FIRST_KEYWORDS, str(tmp_path / 'b'), archive_hash='cancelado')
+    assert not finished.pending and finished.stop_reason is None
+    assert sorted(e['file'] for e in file_events if e['resumed']) == [r.filename for r in stopped.results]
+    assert sorted(r.filename for r in finished.results) == sorted(os.path.basename(f) for f in files)
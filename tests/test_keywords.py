@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+
+from utils.backends import FAKE_KEYWORDS, FAKE_VOCABULARY, FakeBackend
+from utils.keywords import (BKTree, FuzzyVocabulary, TokenIndex, allowed_distance, edit_distance,
+                            mark_keywords, normalize_text, tokenize)
+
+
+def test_normalization_ignores_case_and_accents():
+    assert normalize_text("EXTORSIÓN Señal") == "extorsion senal"
+    assert tokenize("¡Auxilio, Extorsión!") == ["auxilio", "extorsion"]
+
+
+def test_edit_distance_stops_early_past_the_limit():
+    assert edit_distance("drogas", "drojas") == 1
+    assert edit_distance("estorsion", "extorsion") == 1
+    assert edit_distance("robo", "emergencia", max_distance=2) == 3
+
+
+def test_allowed_distance_scales_with_term_length():
+    assert allowed_distance("robo", 2) == 1
+    assert allowed_distance("sol", 2) == 0           # 3 letras o menos: siempre exacta
+    assert allowed_distance("extorsion", 2) == 2
+    assert allowed_distance("extorsion", 1) == 1      # la tolerancia pedida es el tope
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(7)
+    words = {''.join(rng.choice('abcde') for _ in range(rng.randint(2, 7))) for _ in range(400)}
+    tree = BKTree(words)
+    assert tree.size == len(words)
+    for query in ['abc', 'edcba', 'aaaa', 'bd']:
+        for max_distance in (0, 1, 2):
+            expected = {w for w in words if edit_distance(query, w) <= max_distance}
+            assert {w for w, _ in tree.search(query, max_distance)} == expected
+
+
+def test_fuzzy_vocabulary_updates_cached_variants():
+    vocabulary = FuzzyVocabulary(["extorsion", "robo"])
+    assert vocabulary.variants("extorsion", 1) == {"extorsion"}
+    # Una palabra nueva del siguiente archivo se añade a las variantes ya consultadas
+    vocabulary.update(["estorsion"])
+    assert vocabulary.variants("extorsion", 1) == {"extorsion", "estorsion"}
+
+
+def test_token_index_counts_whole_words_and_phrases():
+    index = TokenIndex(["Reportar un robo, otro ROBO", "robotica y robos", "llamen a emergencias médicas"])
+    assert index.occurrences("robo") == {0: 2}
+    assert index.count("Emergencias Médicas") == 1
+    assert index.keyword_counts(["robo", "drogas", "  "]) == {"robo": 2}
+
+
+def test_token_index_fuzzy_matches_misspellings():
+    index = TokenIndex(["hay drojas en el sector", "una estorsion grave"])
+    assert index.count("drogas") == 0
+    assert index.occurrences("drogas", tolerance=1) == {0: 1}
+    assert index.occurrences("extorsión", tolerance=1) == {1: 1}
+    # Palabras cortas nunca coinciden aproximadas
+    assert TokenIndex(["el sol"]).count("sal", tolerance=2) == 0
+
+
+def test_mark_keywords_wraps_original_text():
+    text, found = mark_keywords("Un Robo y una extorsión", ["robo", "extorsion", "drogas"])
+    assert text == "Un <mark>Robo</mark> y una <mark>extorsión</mark>"
+    assert found == ["robo", "extorsion"]
+
+
+def test_counts_on_fake_transcripts_match_a_plain_scan():
+    result = FakeBackend(speed=0, keyword_rate=0.3).transcribe(np.zeros(16000 * 120, dtype=np.float32))
+    index = TokenIndex.from_segments(result['segments'])
+    tokens = [token for segment in result['segments'] for token in tokenize(segment['text'])]
+    for keyword in FAKE_KEYWORDS + FAKE_VOCABULARY[:5]:
+        assert index.count(keyword) == tokens.count(normalize_text(keyword))
@@ -0,0 +1,50 @@
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from utils.backends import FakeBackend
+from utils.streaming import SAMPLE_RATE, transcribe_windowed
+
+WINDOW_SECONDS = 60
+
+
+class RecordingBackend(FakeBackend):
+    """Fake backend that records the length of every buffer it receives"""
+
+    def __init__(self, speech_seconds: float = None, **options):
+        super().__init__(speed=0, **options)
+        self.speech_seconds = speech_seconds
+        self.buffer_lengths: List[int] = []
+
+    def transcribe(self, audio, language: str = 'es', **options) -> Dict:
+        self.buffer_lengths.append(len(audio))
+        result = super().transcribe(audio, language, **options)
+        if self.speech_seconds is not None:
+            # Habla solo al principio del buffer y silencio hasta el borde
+            result['segments'] = [s for s in result['segments'] if s['end'] <= self.speech_seconds]
+        return result
+
+
+@pytest.mark.parametrize('backend', [
+    RecordingBackend(),                                        # el último segmento siempre toca el borde
+    RecordingBackend(speech_seconds=10),                       # habla seguida de silencio largo
+    RecordingBackend(segment_seconds=WINDOW_SECONDS * 0.9),    # segmentos casi tan largos como la ventana
+], ids=['edge', 'silence', 'long-segments'])
+def test_buffer_never_exceeds_two_windows(backend):
+    audio = np.zeros(SAMPLE_RATE * WINDOW_SECONDS * 10, dtype=np.float32)
+    transcribe_windowed(backend, audio, window_seconds=WINDOW_SECONDS)
+    assert len(backend.buffer_lengths) >= 10
+    assert max(backend.buffer_lengths) <= 2 * WINDOW_SECONDS * SAMPLE_RATE
+
+
+def test_segments_are_global_and_ordered():
+    audio = np.zeros(SAMPLE_RATE * (WINDOW_SECONDS * 3 + 7), dtype=np.float32)
+    result = transcribe_windowed(RecordingBackend(), audio, window_seconds=WINDOW_SECONDS)
+    segments = result['segments']
+    assert [s['id'] for s in segments] == list(range(len(segments)))
+    assert segments[0]['start'] == 0
+    assert segments[-1]['end'] == pytest.approx(len(audio) / SAMPLE_RATE)
+    # Sin huecos ni solapes: cada segmento empieza donde terminó el anterior
+    for previous, segment in zip(segments, segments[1:]):
+        assert segment['start'] == pytest.approx(previous['end'])
@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from utils.work_queue import DONE, FAILED, LEASED, QUEUED, WORK_MAX_ATTEMPTS, WorkQueue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEASE = 0.2
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    return WorkQueue(str(tmp_path / 'cola.sqlite'))
+
+
+def add_batch(work_queue, durations=(10.0, 30.0, 20.0)):
+    items = [{'key': f'audio_{i}.wav', 'parent': f'audio_{i}.wav', 'path': f'/lote/audio_{i}.wav', 'duration': d}
+             for i, d in enumerate(durations)]
+    return work_queue.create_batch('/lote', {'options': {}}, items)
+
+
+def states(work_queue, batch_id):
+    progress = work_queue.progress(batch_id)
+    return {state: progress[state] for state in (QUEUED, LEASED, DONE, FAILED)}
+
+
+def test_claims_longest_first_and_never_twice(work_queue):
+    batch_id = add_batch(work_queue)
+    claimed = [work_queue.claim('nodo-a', 60) for _ in range(3)]
+    assert [item.duration for item in claimed] == [30.0, 20.0, 10.0]
+    assert work_queue.claim('nodo-b', 60) is None
+    assert states(work_queue, batch_id)[LEASED] == 3
+
+
+def test_expired_lease_is_requeued_and_old_owner_is_fenced(work_queue):
+    batch_id = add_batch(work_queue, durations=(10.0,))
+    stale = work_queue.claim('nodo-a', LEASE)
+    time.sleep(LEASE * 2)
+
+    fresh = work_queue.claim('nodo-b', 60)
+    assert fresh.id == stale.id and fresh.attempts == 2
+    # El nodo que se recupera tarde ya no puede renovar ni entregar
+    assert not work_queue.renew(stale)
+    assert not work_queue.complete(stale, {'text': 'viejo', 'error': None})
+    assert work_queue.complete(fresh, {'text': 'nuevo', 'error': None})
+    assert [result['text'] for _, result in work_queue.results(batch_id)] == ['nuevo']
+
+
+def test_renewed_lease_is_not_stolen(work_queue):
+    add_batch(work_queue, durations=(10.0,))
+    item = work_queue.claim('nodo-a', LEASE)
+    for _ in range(3):
+        time.sleep(LEASE / 2)
+        assert work_queue.renew(item, LEASE)
+    assert work_queue.claim('nodo-b', 60) is None
+
+
+def test_item_fails_after_max_attempts(work_queue):
+    batch_id = add_batch(work_queue, durations=(10.0,))
+    for attempt in range(1, WORK_MAX_ATTEMPTS + 1):
+        item = work_queue.claim(f'nodo-{attempt}', LEASE)
+        assert item.attempts == attempt
+        time.sleep(LEASE * 2)
+    assert work_queue.claim('nodo-final', 60) is None
+    assert states(work_queue, batch_id) == {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 1}
+    assert 'intentos' in work_queue.results(batch_id)[0][1]['error']
+    assert not work_queue.has_open_items(batch_id)
+
+
+def test_release_requeues_until_the_last_attempt(work_queue):
+    batch_id = add_batch(work_queue, durations=(10.0,))
+    for _ in range(WORK_MAX_ATTEMPTS - 1):
+        assert work_queue.release(work_queue.claim('nodo-a', 60), 'modelo no disponible')
+        assert states(work_queue, batch_id)[QUEUED] == 1
+    assert work_queue.release(work_queue.claim('nodo-a', 60), 'modelo no disponible')
+    assert work_queue.results(batch_id)[0][1] == {'error': 'modelo no disponible'}
+
+
+def cli(*args, env=None):
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'cli.py'), *args], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def test_two_worker_processes_share_a_batch(make_wav, tmp_path):
+    inputs = str(tmp_path / 'entrada')
+    for i, seconds in enumerate((30, 45, 60, 75)):
+        make_wav(f'audio_{i}.wav', seconds, seed=i, directory=inputs)
+    make_wav('copia_0.wav', 30, seed=0, directory=inputs)
+    queue_db = str(tmp_path / 'cola' / 'cola.sqlite')
+    # Unos segundos por elemento para que ambos nodos lleguen a reclamar trabajo
+    env = dict(os.environ, FAKE_BACKEND_SPEED='30')
+
+    batch_id = cli('enqueue', inputs, '--keywords', 'robo', 'auxilio', '--backend', 'fake',
+                   '--queue', queue_db, env=env).stdout.strip()
+    workers = [
+        subprocess.Popen([sys.executable, os.path.join(ROOT, 'cli.py'), 'worker', '--backend', 'fake',
+                          '--exit-when-idle', '--queue', queue_db, '--progress', 'json'],
+                         cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(2)
+    ]
+    delivered = []
+    for worker in workers:
+        output, _ = worker.communicate(timeout=300)
+        assert worker.returncode == 0
+        events = [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+        delivered += [e['item'] for e in events if e['event'] == 'item' and e['status'] == 'ok']
+    # Cada audio distinto se transcribe una sola vez entre los dos nodos; el duplicado espera al original
+    assert sorted(delivered) == [f'audio_{i}.wav' for i in range(4)]
+
+    output_dir = str(tmp_path / 'salida')
+    cli('collect', batch_id, '--queue', queue_db, '--output', output_dir, '--no-wait', env=env)
+    with open(os.path.join(output_dir, 'resultados.json'), encoding='utf-8') as f:
+        summary = json.load(f)
+    assert sorted(r['filename'] for r in summary['results']) == ['audio_0.wav', 'audio_1.wav', 'audio_2.wav',
+                                                                  'audio_3.wav', 'copia_0.wav']
+    assert not summary['pending'] and not summary['errors']
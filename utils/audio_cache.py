@@ -0,0 +1,153 @@
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Optional
+
+import numpy as np
+
+from utils.hashing import hash_file
+from utils.streaming import SAMPLE_RATE, ffmpeg_pcm_command
+
+# Configuración de la caché en disco (configurable por entorno)
+AUDIO_CACHE_DIR = os.environ.get(
+    'AUDIO_CACHE_DIR',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_audio_cache')
+)
+AUDIO_CACHE_MAX_MB = int(os.environ.get('AUDIO_CACHE_MAX_MB', '2048'))
+
+# Bloque de conversión int16 -> float32 (1 minuto de audio)
+COPY_BLOCK_SAMPLES = SAMPLE_RATE * 60
+
+
+class AudioCache:
+    """
+    Caché en disco de PCM decodificado a 16 kHz, guardado como `.npy`
+    indexado por hash de contenido.
+
+    Las lecturas devuelven arrays memory-mapped de solo lectura (sin copia) y
+    el tamaño total se limita con expulsión LRU según la fecha de último acceso.
+    """
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_mb: int = AUDIO_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{key}.{kind}.npy")
+
+    def _load(self, key: str, kind: str) -> Optional[np.ndarray]:
+        path = self._path(key, kind)
+        if not os.path.exists(path):
+            return None
+        try:
+            array = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            # Entrada corrupta (p. ej. escritura interrumpida): se descarta
+            os.remove(path)
+            return None
+        os.utime(path)  # marcar como usado recientemente para el LRU
+        return array
+
+    def _decode_to_npy(self, audio_path: str, target: str) -> None:
+        """Decode with ffmpeg to a float32 .npy without holding it in memory"""
+        fd, raw_path = tempfile.mkstemp(dir=self.directory, suffix='.pcm')
+        os.close(fd)
+        # Nombre único: dos procesos pueden decodificar el mismo audio a la vez
+        fd, tmp_target = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            subprocess.run(ffmpeg_pcm_command(audio_path, SAMPLE_RATE, raw_path),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+            if os.path.getsize(raw_path) < 2:
+                raise RuntimeError(f"Failed to load audio: ffmpeg produced no samples for {audio_path}")
+            raw = np.memmap(raw_path, dtype=np.int16, mode='r')
+            out = np.lib.format.open_memmap(tmp_target, mode='w+', dtype=np.float32, shape=raw.shape)
+            for start in range(0, len(raw), COPY_BLOCK_SAMPLES):
+                block = raw[start:start + COPY_BLOCK_SAMPLES]
+                out[start:start + len(block)] = block.astype(np.float32) / 32768.0
+            out.flush()
+            del out, raw
+            os.replace(tmp_target, target)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='ignore')}") from e
+        finally:
+            for path in (raw_path, tmp_target):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def get_pcm(self, audio_path: str, key: Optional[str] = None) -> np.ndarray:
+        """Return the decoded 16 kHz mono PCM of a file, decoding only on a miss"""
+        key = key or hash_file(audio_path)
+        cached = self._load(key, 'pcm')
+        if cached is not None:
+            return cached
+
+        self._decode_to_npy(audio_path, self._path(key, 'pcm'))
+        self.evict(keep=self._path(key, 'pcm'))
+        return self._load(key, 'pcm')
+
+    def prefetch_pcm(self, audio_path: str) -> threading.Thread:
+        """
+        Llena la caché de PCM en un hilo aparte mientras otra ruta consume el
+        audio. Los errores se ignoran: el siguiente `get_pcm` los vuelve a lanzar.
+        """
+        def fill():
+            try:
+                self.get_pcm(audio_path)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=fill, name='audio-cache-prefetch', daemon=True)
+        thread.start()
+        return thread
+
+    def size_bytes(self) -> int:
+        """Total size of the cached arrays"""
+        return sum(
+            os.path.getsize(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory) if name.endswith('.npy')
+        )
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used entries until the cache fits its size cap"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Expulsada por otro trabajador mientras se listaba
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+    def clear(self) -> None:
+        """Delete every cached array"""
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                os.remove(os.path.join(self.directory, name))
+
+
+_default_cache: Optional[AudioCache] = None
+
+
+def get_audio_cache() -> AudioCache:
+    """Shared cache instance used by the pages"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AudioCache()
+    return _default_cache
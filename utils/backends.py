@@ -0,0 +1,168 @@
+import hashlib
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from utils.streaming import SAMPLE_RATE
+
+# Backend por defecto (configurable por entorno): "whisper" o "fake"
+DEFAULT_BACKEND = os.environ.get('TRANSCRIPTION_BACKEND', 'whisper')
+FAKE_BACKEND_SPEED = float(os.environ.get('FAKE_BACKEND_SPEED', '50'))
+
+# Vocabulario de los textos sintéticos del backend falso
+FAKE_VOCABULARY = [
+    'buenas', 'tardes', 'necesito', 'ayuda', 'por', 'favor', 'la', 'dirección', 'es',
+    'calle', 'principal', 'hay', 'una', 'persona', 'herida', 'en', 'el', 'sector',
+    'norte', 'llamo', 'para', 'reportar', 'un', 'problema', 'vecinos', 'patrullero',
+]
+FAKE_KEYWORDS = ['emergencia', 'robo', 'drogas', 'extorsión', 'auxilio']
+
+
+class TranscriptionBackend(ABC):
+    """
+    Interfaz común de transcripción. `transcribe` devuelve un diccionario con la
+    misma forma que `whisper.transcribe` ("text", "segments", "language").
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = 'es', **options) -> Dict:
+        """Transcribe a file path or a 16 kHz float32 array"""
+
+    def align_words(self, audio: np.ndarray, text: str, language: str = 'es') -> List[Dict]:
+        """
+        Marcas por palabra ("word", "start", "end") de un fragmento corto, relativas
+        a su inicio. Por defecto se vuelve a transcribir con `word_timestamps=True`.
+        """
+        result = self.transcribe(audio, language=language, word_timestamps=True, verbose=None)
+        return [word for segment in result.get('segments', []) for word in segment.get('words', [])]
+
+
+class WhisperBackend(TranscriptionBackend):
+    """Backend backed by a loaded Whisper model"""
+
+    name = 'whisper'
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = 'es', **options) -> Dict:
+        return self.model.transcribe(audio, language=language, **options)
+
+    def align_words(self, audio: np.ndarray, text: str, language: str = 'es') -> List[Dict]:
+        """Forced alignment of known text with the cross-attention DTW, without decoding"""
+        from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, log_mel_spectrogram, pad_or_trim
+        from whisper.timing import find_alignment, merge_punctuations
+        from whisper.tokenizer import get_tokenizer
+
+        model = self.model
+        tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                  language=language, task='transcribe')
+        text_tokens = tokenizer.encode(' ' + text.strip())
+        if not text_tokens:
+            return []
+
+        audio = np.asarray(audio[:N_SAMPLES], dtype=np.float32)
+        mel = pad_or_trim(log_mel_spectrogram(audio, model.dims.n_mels), N_FRAMES).to(model.device)
+        timings = find_alignment(model, tokenizer, text_tokens, mel, len(audio) // HOP_LENGTH)
+        merge_punctuations(timings, '"\'“¿([{-', '"\'.。,，!！?？:：”)]}、')
+        return [
+            {'word': t.word, 'start': float(t.start), 'end': float(t.end), 'probability': float(t.probability)}
+            for t in timings if t.word
+        ]
+
+
+class FakeBackend(TranscriptionBackend):
+    """
+    Backend determinista que genera segmentos sintéticos sin pesos de modelo.
+
+    La misma entrada produce siempre el mismo texto, y la llamada tarda
+    `duración / speed` segundos (speed=0 devuelve al instante), de modo que la
+    orquestación por lotes, la caché y la interfaz pueden medirse sin Whisper.
+    """
+
+    name = 'fake'
+
+    def __init__(self, speed: float = FAKE_BACKEND_SPEED, segment_seconds: float = 5.0,
+                 keyword_rate: float = 0.1, words_per_segment: int = 10):
+        self.speed = speed
+        self.segment_seconds = segment_seconds
+        self.keyword_rate = keyword_rate
+        self.words_per_segment = words_per_segment
+
+    def _duration_and_seed(self, audio: Union[str, np.ndarray]):
+        if isinstance(audio, str):
+            from utils.hashing import hash_file
+            from utils.probe import probe_duration
+
+            return probe_duration(audio), hash_file(audio)
+
+        samples = np.asarray(audio, dtype=np.float32)
+        digest = hashlib.sha256(samples[:SAMPLE_RATE].tobytes() + str(len(samples)).encode()).hexdigest()
+        return len(samples) / SAMPLE_RATE, digest
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = 'es', **options) -> Dict:
+        duration, digest = self._duration_and_seed(audio)
+        rng = random.Random(digest)
+
+        segments: List[Dict] = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.segment_seconds, duration)
+            words = []
+            for _ in range(self.words_per_segment):
+                vocabulary = FAKE_KEYWORDS if rng.random() < self.keyword_rate else FAKE_VOCABULARY
+                words.append(rng.choice(vocabulary))
+            segments.append({
+                'id': len(segments),
+                'seek': int(start * 100),
+                'start': start,
+                'end': end,
+                'text': ' ' + ' '.join(words) + '.',
+                'tokens': [],
+                'temperature': 0.0,
+                'avg_logprob': -0.3,
+                'compression_ratio': 1.2,
+                'no_speech_prob': 0.01,
+            })
+            start = end
+
+        if self.speed > 0:
+            time.sleep(duration / self.speed)
+
+        return {
+            'text': ''.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': language,
+        }
+
+    def align_words(self, audio: np.ndarray, text: str, language: str = 'es') -> List[Dict]:
+        """Spread the words evenly over the clip"""
+        words = text.split()
+        step = len(audio) / SAMPLE_RATE / max(len(words), 1)
+        return [
+            {'word': ' ' + word, 'start': i * step, 'end': (i + 1) * step, 'probability': 1.0}
+            for i, word in enumerate(words)
+        ]
+
+
+def create_backend(name: str = DEFAULT_BACKEND, model_name: Optional[str] = None,
+                   quantized: Optional[bool] = None, engine: Optional[str] = None,
+                   speed: float = FAKE_BACKEND_SPEED) -> TranscriptionBackend:
+    """
+    Build a backend by name. Whisper options left as None use the defaults of
+    the shared model loader; `speed` only applies to the fake backend.
+    """
+    if name == 'fake':
+        return FakeBackend(speed=speed)
+    if name == 'whisper':
+        from utils import models
+
+        options = {'name': model_name, 'quantized': quantized, 'engine': engine}
+        return WhisperBackend(models.load_whisper_model(**{k: v for k, v in options.items() if v is not None}))
+    raise ValueError(f"Backend de transcripción desconocido: {name}")
@@ -0,0 +1,653 @@
+import io
+import itertools
+import os
+import queue
+import re
+import tempfile
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from utils.audio_cache import get_audio_cache
+from utils.backends import DEFAULT_BACKEND
+from utils.cancellation import CancelToken
+from utils.cascade import CASCADE_FAST_MODEL, cascade_transcribe
+from utils.checkpoints import CheckpointStore
+from utils.engines import DEFAULT_ENGINE
+from utils.hashing import group_by_content
+from utils.keywords import FuzzyVocabulary, TokenIndex, mark_keywords
+from utils.profiles import DEFAULT_PROFILE, PROFILES
+from utils.scheduling import BatchProgress, load_rtf, longest_first, probe_durations, record_rtf, run_parallel
+from utils.streaming import SAMPLE_RATE, transcribe_windowed
+from utils.timeline import timeline_csv
+from utils.watchdog import TranscriptionWorker, watchdog_timeout
+from utils.word_timestamps import refine_keyword_hits
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.wave', '.m4a', '.flac', '.aac')
+KEYWORD_MARK = '<mark style="background-color: #ffeb3b; color: #d32f2f; font-weight: bold;">'
+
+
+@dataclass
+class TranscriptionResult:
+    filename: str
+    filepath: str
+    transcription: str
+    duration: float
+    processing_time: float
+    found_keywords: List[str]
+    word_count: int
+    srt_path: str = None
+    duplicate_of: str = None
+    keyword_hits: List[Dict] = None
+    keyword_counts: Dict[str, int] = None
+
+
+@dataclass
+class FileOutcome:
+    """One finished file of a batch: a result, or an error for it and its duplicates"""
+    audio_file: str
+    transcription: Dict
+    result: Optional[TranscriptionResult] = None
+    token_index: Optional[TokenIndex] = None
+    error: Optional[str] = None
+    warning: Optional[str] = None
+    original: Optional[str] = None
+
+
+def natural_sort_key(filename: str) -> tuple:
+    """
+    Genera una clave de ordenamiento natural para archivos con números
+    Ejemplos:
+    - audio_seg_1.mp3 -> (audio_seg_, 1, .mp3)
+    - audio_seg_10.mp3 -> (audio_seg_, 10, .mp3)
+    - segment_01.wav -> (segment_, 1, .wav)
+    """
+    # Dividir el nombre en partes texto-número-texto
+    parts = re.split(r'(\d+)', filename.lower())
+
+    # Convertir números a enteros para ordenamiento correcto
+    return tuple(int(part) if part.isdigit() else part for part in parts)
+
+
+def sort_audio_files(audio_files: List[str]) -> List[str]:
+    """
+    Ordena archivos de audio de manera inteligente
+    Prioriza ordenamiento numérico sobre alfabético
+    """
+    return sorted(audio_files, key=lambda path: natural_sort_key(os.path.basename(path)))
+
+
+def find_audio_files(directory: str) -> List[str]:
+    """Audio files under `directory` (subdirectories included), in natural order"""
+    audio_files = []
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if file.lower().endswith(AUDIO_EXTENSIONS):
+                audio_files.append(os.path.join(root, file))
+    return sort_audio_files(audio_files)
+
+
+def extract_zip(source: Union[str, BinaryIO], temp_dir: Optional[str] = None) -> Tuple[List[str], str]:
+    """
+    Extrae un ZIP (ruta o archivo abierto) en un directorio temporal y devuelve
+    sus audios en orden natural. Lanza zipfile.BadZipFile si no es un ZIP.
+    """
+    temp_dir = temp_dir or tempfile.mkdtemp()
+    with zipfile.ZipFile(source, 'r') as zf:
+        zf.extractall(temp_dir)
+    return find_audio_files(temp_dir), temp_dir
+
+
+def validate_audio_file(filepath: str) -> bool:
+    """Validate if audio file can be processed"""
+    try:
+        # Verificar que el archivo existe y tiene tamaño > 0
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            return False
+        return filepath.lower().endswith(AUDIO_EXTENSIONS)
+    except OSError:
+        return False
+
+
+def find_duplicate_audio(audio_files: List[str]) -> Dict[str, str]:
+    """Map every duplicated file to the first file with identical content"""
+    duplicates = {}
+    for paths in group_by_content(audio_files).values():
+        for duplicate in paths[1:]:
+            duplicates[duplicate] = paths[0]
+    return duplicates
+
+
+def plan_batch(valid_files: List[str], duplicates: Dict[str, str], checkpoint: Optional[CheckpointStore],
+               base_dir: str) -> Tuple[List[Tuple[str, Dict]], List[str], Dict[str, List[str]]]:
+    """
+    Plan del lote: transcripciones recuperadas de los puntos de control, archivos
+    por transcribir y, por cada original, los duplicados que esperan su resultado.
+    """
+    recovered = []
+    to_transcribe = []
+    pending_duplicates: Dict[str, List[str]] = {}
+    for audio_file in valid_files:
+        original = duplicates.get(audio_file)
+        stored = checkpoint.load(os.path.relpath(audio_file, base_dir)) if checkpoint else None
+        if original:
+            pending_duplicates.setdefault(original, []).append(audio_file)
+        elif stored:
+            # Sin marcas por palabra: dependen de las palabras clave y la tolerancia
+            # de esta ejecución, que pueden no ser las del lote interrumpido
+            recovered.append((audio_file, {
+                "text": stored["result"]["transcription"],
+                "segments": stored["segments"],
+                "processing_time": stored["result"]["processing_time"],
+                "duration": stored["result"]["duration"],
+                "resumed": True,
+                "error": None
+            }))
+        else:
+            to_transcribe.append(audio_file)
+    return recovered, to_transcribe, pending_duplicates
+
+
+def transcribe_file(backend, audio_path: str, language: str = 'es', streaming: bool = False,
+                    profile: str = DEFAULT_PROFILE, cascade_keywords: Optional[List[str]] = None,
+                    fast_backend=None) -> Dict:
+    """
+    Transcribe one batch file with the page options. Errors are returned in
+    "error" instead of raised, so one bad file never stops a batch.
+    """
+    try:
+        if backend is None:
+            return {"error": "Modelo Whisper no disponible"}
+
+        start_time = time.time()
+        # PCM decodificado desde la caché en disco (memory-mapped, sin copia)
+        audio_data = get_audio_cache().get_pcm(audio_path)
+        options = PROFILES[profile].transcribe_options()
+        if cascade_keywords:
+            # Pase rápido completo y re-transcripción precisa solo cerca de candidatos
+            if fast_backend is None:
+                return {"error": "Modelo rápido de la cascada no disponible"}
+            result = cascade_transcribe(fast_backend, backend, audio_data, cascade_keywords,
+                                        language=language, **options)
+        elif streaming:
+            # Procesar por ventanas para acotar la memoria en archivos largos
+            result = transcribe_windowed(backend, audio_data, language=language, **options)
+        else:
+            result = backend.transcribe(audio_data, language=language, verbose=False, **options)
+        processing_time = time.time() - start_time
+
+        return {
+            "text": result.get("text", ""),
+            "segments": result.get("segments", []),
+            "processing_time": processing_time,
+            "duration": len(audio_data) / SAMPLE_RATE,
+            "cascade": result.get("cascade"),
+            "error": None
+        }
+    except Exception as e:
+        return {"error": f"Error transcribiendo: {str(e)}"}
+
+
+def transcribe_with_replica(audio_path: str, replicas: queue.Queue, timeout: Optional[Callable] = None,
+                            **options) -> Dict:
+    """
+    Transcribe one file with a free replica from the queue: a (backend, fast
+    backend) pair, or a TranscriptionWorker limited to `timeout(audio_path)`.
+    """
+    replica = replicas.get()
+    try:
+        if isinstance(replica, TranscriptionWorker):
+            return replica.transcribe(audio_path, timeout(audio_path), **options)
+        transcriber, fast_transcriber = replica
+        return transcribe_file(transcriber, audio_path, fast_backend=fast_transcriber, **options)
+    finally:
+        replicas.put(replica)
+
+
+def format_timestamp(seconds):
+    """Convert seconds to SRT timestamp format"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millis = int((seconds % 1) * 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def format_clock(seconds: float) -> str:
+    """H:MM:SS-style duration without milliseconds"""
+    return format_timestamp(seconds).split(',')[0]
+
+
+def save_individual_files(result: Dict, filename: str, output_dir: str) -> Dict[str, str]:
+    """Save the TXT (and SRT, if there are segments) of one file; raises OSError"""
+    base_name = os.path.splitext(filename)[0]
+    saved_files = {}
+
+    # Guardar TXT
+    txt_path = os.path.join(output_dir, f"{base_name}.txt")
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write(result.get('text', ''))
+    saved_files['txt'] = txt_path
+
+    # Guardar SRT si hay segmentos
+    if result.get('segments'):
+        srt_path = os.path.join(output_dir, f"{base_name}.srt")
+        srt_content = []
+        for i, segment in enumerate(result['segments'], 1):
+            start = format_timestamp(segment['start'])
+            end = format_timestamp(segment['end'])
+            text = segment['text'].strip()
+            srt_content.extend([str(i), f"{start} --> {end}", text, ""])
+
+        with open(srt_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(srt_content))
+        saved_files['srt'] = srt_path
+
+    return saved_files
+
+
+def analyze_transcription(audio_file: str, transcription: Dict, keywords: List[str], output_dir: str,
+                          aligner=None, tolerance: int = 0, vocabulary: Optional[FuzzyVocabulary] = None,
+                          original: Optional[str] = None, base_dir: Optional[str] = None) -> FileOutcome:
+    """
+    Palabras clave, marcas por palabra (con `aligner`, solo en los segmentos con
+    aciertos), TXT/SRT en `output_dir` y el resultado de un archivo transcrito.
+    """
+    filename = os.path.basename(audio_file)
+    segments = transcription.get("segments", [])
+    text = transcription.get("text", "")
+    word_count = len(text.split()) if text else 0
+
+    # Índice de tokens del archivo: aciertos y conteos por consulta directa
+    token_index = TokenIndex.from_segments(segments)
+    # Vocabulario compartido del lote: las variantes aproximadas se resuelven una vez
+    if vocabulary is not None:
+        vocabulary.update(token_index.vocabulary)
+    keyword_counts = token_index.keyword_counts(keywords, tolerance, vocabulary)
+    found_keywords = list(keyword_counts)
+
+    # Alinear por palabra solo los segmentos con aciertos
+    if found_keywords and transcription.get("keyword_hits") is None and aligner is not None:
+        transcription["keyword_hits"] = refine_keyword_hits(
+            aligner, get_audio_cache().get_pcm(audio_file), segments, keywords,
+            token_index=token_index, tolerance=tolerance, vocabulary=vocabulary
+        )
+
+    warning = None
+    try:
+        saved_files = save_individual_files(transcription, filename, output_dir)
+    except OSError as e:
+        saved_files = {}
+        warning = f"Error guardando archivos para {filename}: {e}"
+
+    result = TranscriptionResult(
+        filename=filename,
+        filepath=audio_file,
+        transcription=text,
+        duration=transcription.get("duration", 0.0),
+        processing_time=transcription.get("processing_time", 0),
+        found_keywords=found_keywords,
+        keyword_counts=keyword_counts,
+        word_count=word_count,
+        srt_path=saved_files.get('srt'),
+        keyword_hits=transcription.get("keyword_hits") or [],
+        duplicate_of=os.path.relpath(original, base_dir or os.path.dirname(original)) if original else None
+    )
+    return FileOutcome(audio_file, transcription, result=result, token_index=token_index,
+                       warning=warning, original=original)
+
+
+def process_transcriptions(finished: Iterable[Tuple[str, Dict]], keywords: List[str], output_dir: str,
+                           pending_duplicates: Dict[str, List[str]], aligner=None, tolerance: int = 0,
+                           vocabulary: Optional[FuzzyVocabulary] = None,
+                           base_dir: Optional[str] = None) -> Iterator[List[FileOutcome]]:
+    """
+    Analiza cada transcripción terminada y, a continuación, sus duplicados
+    (mismo contenido: mismo resultado sin volver a transcribir, o mismo fallo).
+    Produce una lista de resultados por cada archivo transcrito.
+    """
+    for finished_file, finished_result in finished:
+        outcomes = []
+        ready = [(finished_file, finished_result, None)]
+        while ready:
+            audio_file, transcription, original = ready.pop(0)
+            copies = pending_duplicates.pop(audio_file, [])
+            if transcription.get("error"):
+                outcomes.append(FileOutcome(audio_file, transcription, error=transcription["error"],
+                                            original=original))
+                outcomes.extend(FileOutcome(copy, transcription, error=transcription["error"], original=audio_file)
+                                for copy in copies)
+                continue
+            outcomes.append(analyze_transcription(audio_file, transcription, keywords, output_dir, aligner,
+                                                  tolerance, vocabulary, original, base_dir))
+            # Las copias heredan también las marcas por palabra ya alineadas
+            ready.extend(
+                (copy, dict(transcription, processing_time=0, resumed=False), audio_file)
+                for copy in copies
+            )
+        yield outcomes
+
+
+def highlight_keywords(text: str, keywords: List[str], tolerance: int = 0,
+                       vocabulary: Optional[FuzzyVocabulary] = None) -> str:
+    """Highlight whole-word keywords, ignoring case and accents"""
+    highlighted, _ = mark_keywords(text, keywords, KEYWORD_MARK, '</mark>', tolerance, vocabulary)
+    return highlighted
+
+
+def create_summary_report(results: List[TranscriptionResult], keywords: List[str],
+                          pending: List[str] = None, stop_reason: str = None) -> str:
+    """Create summary report of all transcriptions (listing the files left out by a stop)"""
+    total_files = len(results)
+    successful = len([r for r in results if r.transcription])
+    total_duration = sum(r.duration for r in results)
+    total_processing = sum(r.processing_time for r in results)
+    total_words = sum(r.word_count for r in results)
+
+    files_with_keywords = len([r for r in results if r.found_keywords])
+    duplicated_files = len([r for r in results if r.duplicate_of])
+
+    report = f"""# 📊 Reporte de Transcripción Masiva
+
+## 📈 Estadísticas Generales
+- **Total de archivos procesados:** {total_files}
+- **Transcripciones exitosas:** {successful}
+- **Duración total de audio:** {total_duration:.1f} segundos ({total_duration/60:.1f} minutos)
+- **Tiempo total de procesamiento:** {total_processing:.1f} segundos
+- **Total de palabras transcritas:** {total_words:,}
+- **Archivos con palabras clave:** {files_with_keywords}
+- **Transcripciones ahorradas por duplicados:** {duplicated_files}
+
+## 🔍 Palabras Clave Buscadas
+{', '.join(keywords) if keywords else 'Ninguna'}
+"""
+    if stop_reason:
+        report += f"""
+## ⏹️ Procesamiento Detenido
+- **Motivo:** {stop_reason}
+- **Archivos sin procesar:** {len(pending or [])}
+"""
+        for path in pending or []:
+            report += f"  - {path}\n"
+
+    report += """
+## 📄 Detalle por Archivo
+"""
+
+    for result in results:
+        status = "✅" if result.transcription else "❌"
+        keywords_found = ", ".join(
+            f"{keyword} ({(result.keyword_counts or {}).get(keyword, 1)})" for keyword in result.found_keywords
+        ) if result.found_keywords else "Ninguna"
+
+        report += f"""
+### {status} {result.filename}
+- **Duración:** {result.duration:.1f}s
+- **Tiempo de procesamiento:** {result.processing_time:.1f}s
+- **Palabras:** {result.word_count}
+- **Palabras clave encontradas:** {keywords_found}
+"""
+        if result.duplicate_of:
+            report += f"- **Duplicado de:** {result.duplicate_of}\n"
+        if result.keyword_hits:
+            report += "- **Marcas de palabras clave:**\n"
+            for hit in result.keyword_hits:
+                report += f"  - {hit['text']}: {format_timestamp(hit['start'])} → {format_timestamp(hit['end'])}\n"
+
+    return report
+
+
+def create_download_zip(results: List[TranscriptionResult], keywords: List[str],
+                        pending: List[str] = None, stop_reason: str = None, tolerance: int = 0,
+                        vocabulary: Optional[FuzzyVocabulary] = None) -> bytes:
+    """Create ZIP file with all transcription results"""
+    zip_buffer = io.BytesIO()
+
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        # Agregar reporte resumen
+        report = create_summary_report(results, keywords, pending, stop_reason)
+        zip_file.writestr("REPORTE_TRANSCRIPCION.md", report.encode('utf-8'))
+
+        # Agregar archivos individuales
+        for result in results:
+            if result.transcription:
+                base_name = os.path.splitext(result.filename)[0]
+
+                # Archivo TXT
+                zip_file.writestr(f"transcripciones/{base_name}.txt", result.transcription.encode('utf-8'))
+
+                # Archivo SRT con marcas de tiempo
+                if result.srt_path and os.path.exists(result.srt_path):
+                    with open(result.srt_path, 'r', encoding='utf-8') as srt_file:
+                        srt_content = srt_file.read()
+                    zip_file.writestr(f"transcripciones_srt/{base_name}.srt", srt_content.encode('utf-8'))
+
+                # Archivo con keywords resaltadas
+                highlighted = highlight_keywords(result.transcription, keywords, tolerance, vocabulary)
+                zip_file.writestr(f"resaltados/{base_name}_resaltado.html",
+                                  f"<html><body><pre>{highlighted}</pre></body></html>".encode('utf-8'))
+
+        # Aciertos por palabra clave en intervalos fijos, archivo por archivo y en orden
+        timeline = timeline_csv([(r.filename, r.keyword_hits, r.duration) for r in results], keywords)
+        zip_file.writestr("mapa_calor_palabras_clave.csv", timeline.encode('utf-8'))
+
+    zip_buffer.seek(0)
+    return zip_buffer.read()
+
+
+@dataclass
+class BatchOptions:
+    """Opciones de un lote sin interfaz (CLI, API): las mismas que ofrece la página"""
+    keywords: List[str]
+    workers: int = 1
+    watchdog: bool = True
+    streaming: bool = False
+    cascade: bool = False
+    profile: str = DEFAULT_PROFILE
+    backend: str = DEFAULT_BACKEND
+    model_name: Optional[str] = None
+    quantized: Optional[bool] = None
+    engine: Optional[str] = None
+    tolerance: int = 0
+    language: str = 'es'
+
+
+@dataclass
+class BatchRun:
+    """Resultado de un lote: lo terminado, los fallos y lo que quedó pendiente"""
+    results: List[TranscriptionResult] = field(default_factory=list)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+    pending: List[str] = field(default_factory=list)
+    invalid: List[str] = field(default_factory=list)
+    stop_reason: Optional[str] = None
+    elapsed: float = 0.0
+    vocabulary: FuzzyVocabulary = field(default_factory=FuzzyVocabulary)
+    token_indexes: Dict[str, TokenIndex] = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        """JSON-serializable view for logs and APIs"""
+        return {
+            "results": [asdict(result) for result in self.results],
+            "errors": [{"file": path, "error": error} for path, error in self.errors],
+            "pending": self.pending,
+            "invalid": self.invalid,
+            "stop_reason": self.stop_reason,
+            "elapsed": self.elapsed,
+        }
+
+
+def batch_mode(options: BatchOptions) -> str:
+    """Transcription mode name used in the RTF history key"""
+    return "cascada" if options.cascade else "streaming" if options.streaming else "completo"
+
+
+def run_batch(audio_files: List[str], base_dir: str, options: BatchOptions, output_dir: str,
+              emit: Optional[Callable[[str, Dict], None]] = None, cancel: Optional[CancelToken] = None,
+              archive_hash: Optional[str] = None, index_source: Optional[str] = 'lote',
+              index_metadata: Optional[Dict] = None, run: Optional[BatchRun] = None,
+              load_model: Optional[Callable[[Optional[str], int], object]] = None) -> BatchRun:
+    """
+    Lote completo (página, CLI, API): validación, duplicados, puntos de control
+    (con `archive_hash`), orden LPT, trabajadores en paralelo con vigilancia,
+    palabras clave, TXT/SRT en `output_dir` e indexado para la búsqueda.
+
+    `emit(evento, datos)` recibe "start", "file" (cada archivo terminado, con el
+    progreso en segundos de audio) y "done". `cancel` detiene el lote entre
+    archivos; lo terminado se conserva y lo demás queda en `pending`.
+
+    Con `run`, los resultados se acumulan en ese BatchRun a medida que terminan,
+    y sus campos quedan completos aunque una excepción interrumpa el lote.
+    `load_model(model_name, réplica)` sustituye a `create_backend` (la página
+    usa sus modelos en caché); la réplica 0 es la del alineador.
+    """
+    from utils import models
+    from utils.backends import create_backend
+    from utils.transcript_index import TranscriptIndex
+
+    emit = emit or (lambda event, data: None)
+    cancel = cancel or CancelToken()
+    run = run if run is not None else BatchRun()
+    start_total = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+
+    valid_files = [f for f in audio_files if validate_audio_file(f)]
+    valid = set(valid_files)
+    run.invalid = [os.path.relpath(f, base_dir) for f in audio_files if f not in valid]
+    duplicates = find_duplicate_audio(valid_files)
+    checkpoint = CheckpointStore(archive_hash) if archive_hash else None
+    positions = {path: i for i, path in enumerate(valid_files)}
+    recovered, to_transcribe, pending_duplicates = plan_batch(valid_files, duplicates, checkpoint, base_dir)
+
+    # Duraciones leídas de la cabecera: progreso en segundos de audio y orden LPT
+    durations = probe_durations(to_transcribe)
+    if options.workers > 1:
+        to_transcribe = longest_first(to_transcribe, durations)
+    # Misma clave que la página: ambos comparten el historial de RTF
+    quantized = models.DEFAULT_QUANTIZED if options.quantized is None else options.quantized
+    rtf_key = (f"{options.backend}:{options.model_name or models.DEFAULT_MODEL}:{options.profile}:"
+               f"{options.engine or DEFAULT_ENGINE}:{int(quantized)}:{batch_mode(options)}:{options.workers}")
+    progress = BatchProgress(sum(durations.values()), len(to_transcribe), options.workers, load_rtf(rtf_key))
+    emit("start", {
+        "files": len(audio_files), "valid": len(valid_files), "invalid": len(run.invalid),
+        "duplicates": len(duplicates), "resumed": len(recovered), "to_transcribe": len(to_transcribe),
+        "audio_seconds": progress.total_seconds, "workers": options.workers,
+    })
+
+    # Modelo en este proceso: alineación por palabra y, sin vigilancia y con un solo trabajador, la transcripción
+    backend_options = {"quantized": options.quantized, "engine": options.engine}
+    load_model = load_model or (lambda model_name, replica: create_backend(
+        options.backend, model_name=model_name, **backend_options))
+    aligner = load_model(options.model_name, 0)
+    replicas = queue.Queue()
+    watchdogs: List[TranscriptionWorker] = []
+    for worker in range(options.workers):
+        if options.watchdog:
+            watchdogs.append(TranscriptionWorker(options.backend, model_name=options.model_name,
+                                                 fast_model=CASCADE_FAST_MODEL, **backend_options))
+            replicas.put(watchdogs[-1])
+        else:
+            # Con varios trabajadores ninguno comparte el modelo del alineador: los hooks de
+            # alineación y la caché kv del decodificador viven en el propio modelo
+            replica = worker + 1 if options.workers > 1 else 0
+            transcriber = load_model(options.model_name, replica) if replica else aligner
+            fast_transcriber = load_model(CASCADE_FAST_MODEL, replica) if options.cascade else None
+            replicas.put((transcriber, fast_transcriber))
+
+    transcript_index = TranscriptIndex() if index_source else None
+    run_id = transcript_index.start_run(index_source, {
+        "backend": options.backend, "model": options.model_name or models.DEFAULT_MODEL,
+        "profile": options.profile, "engine": options.engine, "quantized": options.quantized,
+        "cascade": options.cascade, "keywords": options.keywords, **(index_metadata or {}),
+    }) if transcript_index else None
+
+    transcriptions = run_parallel(
+        lambda path: transcribe_with_replica(
+            path, replicas, timeout=lambda p: watchdog_timeout(durations.get(p, 0.0), progress.rtf),
+            language=options.language, streaming=options.streaming, profile=options.profile,
+            cascade_keywords=options.keywords if options.cascade else None),
+        # Frontera entre archivos: tras la cancelación o el límite de tiempo no empieza ningún
+        # archivo nuevo, y los que estaban en curso terminan y se conservan
+        to_transcribe, options.workers, cancel
+    )
+    finished_paths = set()
+    completed = False
+    try:
+        outcomes = process_transcriptions(
+            itertools.chain(recovered, transcriptions), options.keywords, output_dir, pending_duplicates,
+            aligner=aligner, tolerance=options.tolerance, vocabulary=run.vocabulary, base_dir=base_dir
+        )
+        for file_outcomes in outcomes:
+            finished = file_outcomes[0]
+            for outcome in file_outcomes:
+                key = os.path.relpath(outcome.audio_file, base_dir)
+                finished_paths.add(outcome.audio_file)
+                event = {"file": key, "resumed": bool(outcome.transcription.get("resumed")),
+                         "duplicate_of": os.path.relpath(outcome.original, base_dir) if outcome.original else None}
+                if outcome.error:
+                    run.errors.append((key, outcome.error))
+                    event.update(status="error", error=outcome.error)
+                else:
+                    result = outcome.result
+                    run.results.append(result)
+                    run.token_indexes[outcome.audio_file] = outcome.token_index
+                    warning = outcome.warning
+                    segments = [{"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+                                for seg in outcome.transcription.get("segments", [])]
+                    if checkpoint and not outcome.transcription.get("resumed"):
+                        checkpoint.save(key, dict(asdict(result), keyword_hits=[]), segments)
+                    if transcript_index:
+                        try:
+                            transcript_index.add_transcript(
+                                run_id, f"{archive_hash or base_dir}:{key}", result.filename, segments,
+                                duration=segments[-1]["end"] if segments else 0.0, language=options.language
+                            )
+                        except Exception as e:
+                            # Sin índice el archivo sigue transcrito: solo se avisa
+                            warning = f"No se pudo indexar {result.filename} para la búsqueda: {e}"
+                    event.update(status="ok", duration=result.duration, processing_time=result.processing_time,
+                                 keywords=result.keyword_counts or {}, warning=warning,
+                                 cascade=None if outcome.original else outcome.transcription.get("cascade"))
+                if outcome is finished and not finished.transcription.get("resumed"):
+                    progress.complete(durations.get(finished.audio_file, 0.0),
+                                      None if finished.error else finished.transcription.get("processing_time"))
+                event.update(done_files=progress.done_files, total_files=progress.total_files,
+                             done_seconds=progress.done_seconds, total_seconds=progress.total_seconds,
+                             fraction=progress.fraction, rtf=progress.rtf, eta_seconds=progress.eta_seconds())
+                emit("file", event)
+        completed = True
+    finally:
+        if not completed:
+            cancel.cancel()
+        for watchdog in watchdogs:
+            watchdog.close()
+        transcriptions.close()
+
+        run.results.sort(key=lambda r: positions[r.filepath])
+        if progress.timed_seconds:
+            record_rtf(rtf_key, progress.busy_seconds / progress.timed_seconds)
+        run.pending = [os.path.relpath(f, base_dir) for f in valid_files if f not in finished_paths]
+        run.stop_reason = cancel.reason if run.pending else None
+        run.elapsed = time.time() - start_total
+
+    emit("done", {"results": len(run.results), "errors": len(run.errors), "pending": run.pending,
+                  "stop_reason": run.stop_reason, "elapsed": run.elapsed})
+    return run
+
+
+def write_batch_outputs(run: BatchRun, keywords: List[str], output_dir: str, tolerance: int = 0) -> Dict[str, str]:
+    """Reporte, mapa de calor y resumen JSON junto a los TXT/SRT del lote"""
+    import json
+
+    paths = {
+        "report": os.path.join(output_dir, "REPORTE_TRANSCRIPCION.md"),
+        "timeline": os.path.join(output_dir, "mapa_calor_palabras_clave.csv"),
+        "summary": os.path.join(output_dir, "resultados.json"),
+    }
+    with open(paths["report"], 'w', encoding='utf-8') as f:
+        f.write(create_summary_report(run.results, keywords, run.pending, run.stop_reason))
+    with open(paths["timeline"], 'w', encoding='utf-8', newline='') as f:
+        f.write(timeline_csv([(r.filename, r.keyword_hits, r.duration) for r in run.results], keywords))
+    with open(paths["summary"], 'w', encoding='utf-8') as f:
+        json.dump(dict(run.summary(), keywords=keywords), f, ensure_ascii=False, indent=2)
+    return paths
@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import Optional
+
+# Motivos de parada
+STOP_CANCELLED = 'cancelado'
+STOP_BUDGET = 'límite de tiempo agotado'
+
+
+class CancelToken:
+    """
+    Señal de parada cooperativa para trabajos largos: cancelación explícita o
+    presupuesto de tiempo de reloj.
+
+    El trabajo la consulta en cada frontera (archivo, segmento) y se detiene
+    ahí, de modo que todo lo terminado hasta ese momento se conserva. Es segura
+    entre hilos.
+    """
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + budget_seconds if budget_seconds else None
+
+    def cancel(self, reason: str = STOP_CANCELLED) -> None:
+        """Request a stop; the first reason wins"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancelled or past the deadline"""
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(STOP_BUDGET)
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the budget, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to `timeout` seconds, waking early on cancellation or at the deadline"""
+        remaining = self.remaining()
+        self._event.wait(timeout if remaining is None else min(timeout, remaining))
+        return self.cancelled
@@ -0,0 +1,106 @@
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils.keywords import clean_keywords, tokenize
+from utils.streaming import SAMPLE_RATE, shift_segment
+
+# Parámetros por defecto de la cascada
+CANDIDATE_SIMILARITY = 0.75
+WINDOW_PADDING_SECONDS = 2.0
+CASCADE_FAST_MODEL = 'tiny'
+
+
+def keyword_similarity(text: str, keyword: str) -> float:
+    """Best similarity between `keyword` and any run of as many words in `text`"""
+    words = tokenize(text)
+    terms = tokenize(keyword)
+    target = ' '.join(terms)
+    size = max(len(terms), 1)
+    best = 0.0
+    for i in range(max(len(words) - size + 1, 1)):
+        candidate = ' '.join(words[i:i + size])
+        best = max(best, SequenceMatcher(None, candidate, target).ratio())
+        if best == 1.0:
+            break
+    return best
+
+
+def find_candidate_segments(segments: List[Dict], keywords: List[str],
+                            threshold: float = CANDIDATE_SIMILARITY) -> List[int]:
+    """Indices of segments whose text is close to any keyword"""
+    keywords = clean_keywords(keywords)
+    return [
+        i for i, segment in enumerate(segments)
+        if any(keyword_similarity(segment.get('text', ''), k) >= threshold for k in keywords)
+    ]
+
+
+def merge_windows(segments: List[Dict], indices: List[int], padding: float,
+                  duration: float) -> List[Tuple[float, float]]:
+    """
+    Padded time windows around candidate segments, widened to the edges of any
+    segment they cut and merged when they overlap
+    """
+    windows: List[List[float]] = []
+    for i in indices:
+        start = max(segments[i]['start'] - padding, 0.0)
+        end = min(segments[i]['end'] + padding, duration)
+        # Ningún segmento del primer pase queda a medias: o entra entero o queda fuera
+        for segment in segments:
+            if segment['start'] < end and segment['end'] > start:
+                start = min(start, segment['start'])
+                end = max(end, segment['end'])
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    return [(start, end) for start, end in windows]
+
+
+def cascade_transcribe(fast_backend, accurate_backend, audio: np.ndarray, keywords: List[str],
+                       language: str = 'es', threshold: float = CANDIDATE_SIMILARITY,
+                       padding: float = WINDOW_PADDING_SECONDS, **options) -> Dict:
+    """
+    Transcripción en cascada para vigilancia de palabras clave.
+
+    Un modelo rápido transcribe todo el audio; solo las ventanas alrededor de
+    segmentos parecidos a alguna palabra clave se vuelven a transcribir con el
+    modelo preciso, y sus segmentos reemplazan a los del primer pase.
+    """
+    options.pop('verbose', None)
+    duration = len(audio) / SAMPLE_RATE
+    first_pass = fast_backend.transcribe(audio, language=language, verbose=None, **options)
+    segments = first_pass.get('segments', [])
+
+    windows = merge_windows(segments, find_candidate_segments(segments, keywords, threshold),
+                            padding, duration)
+
+    refined: List[Dict] = []
+    for start, end in windows:
+        clip = np.asarray(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], dtype=np.float32)
+        result = accurate_backend.transcribe(clip, language=language, verbose=None, **options)
+        for segment in result.get('segments', []):
+            shifted = shift_segment(segment, start, 0)
+            shifted['refined'] = True
+            refined.append(shifted)
+
+    def inside_window(segment: Dict) -> bool:
+        return any(segment['start'] < end and segment['end'] > start for start, end in windows)
+
+    merged = [segment for segment in segments if not inside_window(segment)] + refined
+    merged.sort(key=lambda segment: segment['start'])
+    for i, segment in enumerate(merged):
+        segment['id'] = i
+
+    return {
+        'text': ''.join(segment.get('text', '') for segment in merged),
+        'segments': merged,
+        'language': language,
+        'cascade': {
+            'windows': len(windows),
+            'refined_seconds': sum(end - start for start, end in windows),
+            'audio_seconds': duration,
+        },
+    }
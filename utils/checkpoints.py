@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+# Directorio raíz de los puntos de control (configurable por entorno)
+CHECKPOINT_DIR = os.environ.get(
+    'CHECKPOINT_DIR',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_checkpoints')
+)
+
+
+class CheckpointStore:
+    """
+    Almacén en disco de los resultados ya completados de un lote.
+
+    Cada archivo se guarda en su propio JSON dentro de un directorio por hash
+    del ZIP, de modo que reenviar el mismo archivo retoma donde quedó.
+    """
+
+    def __init__(self, archive_hash: str, root: str = CHECKPOINT_DIR):
+        self.archive_hash = archive_hash
+        self.directory = os.path.join(root, archive_hash)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def save(self, key: str, result: Dict, segments: List[Dict]) -> None:
+        """Persist one file's result atomically as soon as it completes"""
+        record = {"key": key, "result": result, "segments": segments}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, key: str) -> Optional[Dict]:
+        """Return the stored record for `key`, or None if it is not done"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Un checkpoint corrupto equivale a no tenerlo
+            return None
+
+    def count(self) -> int:
+        """Number of completed files stored for this archive"""
+        return len([name for name in os.listdir(self.directory) if name.endswith('.json')])
+
+    def clear(self) -> None:
+        """Forget every checkpoint of this archive"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
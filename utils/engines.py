@@ -0,0 +1,113 @@
+import inspect
+import logging
+import os
+import tempfile
+import torch
+import whisper
+from torch import nn
+
+logger = logging.getLogger(__name__)
+
+# Motores disponibles: PyTorch eager (por defecto) o un grafo exportado del encoder
+ENGINES = ('eager', 'torchscript', 'onnx')
+DEFAULT_ENGINE = os.environ.get('WHISPER_ENGINE', 'eager')
+DEFAULT_THREADS = int(os.environ.get('WHISPER_THREADS', '0')) or (os.cpu_count() or 1)
+ENGINE_DIR = os.environ.get(
+    'ENGINE_DIR',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_engines')
+)
+
+
+def _example_mel(model: whisper.model.Whisper) -> torch.Tensor:
+    """Input shape the encoder always receives: one 30 s window of log-mel frames"""
+    return torch.zeros(1, model.dims.n_mels, whisper.audio.N_FRAMES)
+
+
+def export_encoder(model: whisper.model.Whisper, path: str, engine: str = 'torchscript') -> str:
+    """Export the audio encoder of `model` to a TorchScript or ONNX file"""
+    encoder = model.encoder.eval()
+    example = _example_mel(model)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    with torch.no_grad():
+        if engine == 'torchscript':
+            traced = torch.jit.trace(encoder, example)
+            traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+            torch.jit.save(traced, path)
+        elif engine == 'onnx':
+            export_options = {}
+            # Las versiones recientes de torch usan por defecto el exportador dynamo
+            if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+                export_options['dynamo'] = False
+            torch.onnx.export(
+                encoder, (example,), path,
+                input_names=['mel'], output_names=['audio_features'],
+                dynamic_axes={'mel': {0: 'batch'}, 'audio_features': {0: 'batch'}},
+                opset_version=17,
+                **export_options
+            )
+        else:
+            raise ValueError(f"Motor desconocido: {engine}")
+    return path
+
+
+class ExportedEncoder(nn.Module):
+    """Drop-in replacement for `model.encoder` that runs an exported graph on CPU"""
+
+    def __init__(self, path: str, engine: str, threads: int = DEFAULT_THREADS):
+        super().__init__()
+        self.engine = engine
+        if engine == 'torchscript':
+            # TorchScript ejecuta en el pool intra-op global de torch
+            torch.set_num_threads(threads)
+            self.module = torch.jit.load(path, map_location='cpu')
+            self.session = None
+        else:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+            self.module = None
+
+    def forward(self, mel: torch.Tensor) -> torch.Tensor:
+        if self.module is not None:
+            return self.module(mel.float()).to(mel.dtype)
+        features = self.session.run(None, {'mel': mel.float().cpu().numpy()})[0]
+        return torch.from_numpy(features).to(mel.dtype)
+
+
+def engine_path(model_name: str, engine: str, quantized: bool = False) -> str:
+    """Location of the exported graph for a model/engine combination"""
+    base = os.path.splitext(os.path.basename(model_name))[0]
+    suffix = '-int8' if quantized else ''
+    extension = 'pt' if engine == 'torchscript' else 'onnx'
+    return os.path.join(ENGINE_DIR, f"{base}{suffix}-encoder-torch{torch.__version__}.{extension}")
+
+
+def apply_engine(model: whisper.model.Whisper, model_name: str, engine: str = DEFAULT_ENGINE,
+                 threads: int = DEFAULT_THREADS, quantized: bool = False) -> whisper.model.Whisper:
+    """
+    Run the encoder of `model` through an exported graph, exporting it once.
+    If export or loading fails, the model is returned unchanged (eager).
+    `threads` only applies to the exported graph; eager keeps torch's default.
+    """
+    if engine == 'eager':
+        return model
+
+    path = engine_path(model_name, engine, quantized)
+    try:
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp"
+            export_encoder(model, tmp_path, engine)
+            os.replace(tmp_path, path)
+        model.encoder = ExportedEncoder(path, engine, threads)
+    except Exception as e:
+        logger.warning("No se pudo usar el motor %s (%s); se usa PyTorch eager", engine, e)
+    return model
+
+
+def active_engine(model: whisper.model.Whisper) -> str:
+    """Engine actually running the encoder ('eager' after a fallback)"""
+    return model.encoder.engine if isinstance(model.encoder, ExportedEncoder) else 'eager'
@@ -0,0 +1,37 @@
+import hashlib
+import os
+from typing import Dict, List
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of an in-memory buffer"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """SHA-256 hex digest of a file, read in chunks to keep memory flat"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def group_by_content(paths: List[str]) -> Dict[str, List[str]]:
+    """
+    Agrupar archivos con contenido idéntico, preservando el orden de entrada.
+    Solo se calcula el hash de los archivos que comparten tamaño con otro.
+    """
+    by_size: Dict[int, List[str]] = {}
+    for path in paths:
+        by_size.setdefault(os.path.getsize(path), []).append(path)
+
+    groups: Dict[str, List[str]] = {}
+    for path in paths:
+        same_size = by_size[os.path.getsize(path)]
+        # Un tamaño único no puede tener duplicados: se usa la ruta como clave
+        key = hash_file(path) if len(same_size) > 1 else f"unique:{path}"
+        groups.setdefault(key, []).append(path)
+    return groups
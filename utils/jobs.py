@@ -0,0 +1,303 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from utils.cancellation import CancelToken
+
+# Directorio de trabajos de la API (configurable por entorno)
+JOBS_DIR = os.environ.get(
+    'JOBS_DIR',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_jobs')
+)
+UPLOAD_CHUNK = 1024 * 1024
+# Tiempo que se conservan los trabajos terminados y sus archivos (0 = para siempre)
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', '24'))
+# Cada cuánto revisan los ejecutores inactivos si hay trabajos caducados
+REAP_INTERVAL_SECONDS = 60.0
+
+# Estados de un trabajo
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+STOPPED = 'stopped'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, STOPPED, FAILED, CANCELLED)
+
+
+class ClientLimitError(Exception):
+    """The client already has its maximum of queued or running jobs"""
+
+
+@dataclass
+class Job:
+    """Un trabajo de transcripción o división enviado por un cliente"""
+    id: str
+    kind: str
+    client: str
+    params: Dict
+    directory: str
+    input_path: str
+    state: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict] = field(default_factory=list)
+    result: Optional[Dict] = None
+    archive_path: Optional[str] = None
+    error: Optional[str] = None
+    stop_reason: Optional[str] = None
+    token: Optional[CancelToken] = None
+
+    @property
+    def output_dir(self) -> str:
+        return os.path.join(self.directory, 'salida')
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def info(self) -> Dict:
+        """Public JSON view: state, timing and the latest progress event"""
+        progress = next((event for event in reversed(self.events) if 'fraction' in event), None)
+        return {
+            'id': self.id, 'kind': self.kind, 'state': self.state, 'params': self.params,
+            'created_at': self.created_at, 'started_at': self.started_at, 'finished_at': self.finished_at,
+            'progress': progress, 'error': self.error, 'stop_reason': self.stop_reason,
+            'has_archive': bool(self.archive_path),
+        }
+
+
+class JobManager:
+    """
+    Cola de trabajos en memoria con un número fijo de ejecutores.
+
+    Cada cliente puede tener como mucho `max_per_client` trabajos en cola o en
+    curso; el resto se rechaza con ClientLimitError. Los eventos de progreso se
+    acumulan en el trabajo y `wait_events` los entrega a medida que llegan.
+    Los trabajos terminados se borran, con sus archivos, `retention_hours`
+    después de terminar. Los modelos cargados se conservan entre trabajos: cada
+    trabajo toma prestados los que necesita (los modelos no son seguros entre
+    hilos) y los devuelve al terminar, así que solo se cargan más cuando hay
+    más trabajos o trabajadores simultáneos que modelos libres.
+    """
+
+    def __init__(self, runners: int = 1, max_per_client: int = 2, directory: str = JOBS_DIR,
+                 retention_hours: float = JOB_RETENTION_HOURS):
+        self.max_per_client = max_per_client
+        self.retention_seconds = retention_hours * 3600
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._jobs: Dict[str, Job] = {}
+        # Modelos libres por (backend, modelo, cuantizado, motor)
+        self._models: Dict[Tuple, List[object]] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._changed = threading.Condition()
+        self._runners = [threading.Thread(target=self._run_forever, daemon=True) for _ in range(runners)]
+        for runner in self._runners:
+            runner.start()
+
+    def active_jobs(self, client: str) -> int:
+        with self._changed:
+            return len([job for job in self._jobs.values() if job.client == client and not job.finished])
+
+    def submit(self, kind: str, client: str, params: Dict, filename: str, stream: BinaryIO,
+               length: Optional[int] = None) -> Job:
+        """Save the upload (in chunks) and queue the job"""
+        if kind not in ('transcribe', 'split'):
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        self.reap_expired()
+        job_id = uuid.uuid4().hex[:12]
+        directory = os.path.join(self.directory, job_id)
+        job = Job(job_id, kind, client, params, directory,
+                  os.path.join(directory, os.path.basename(filename) or 'entrada'))
+        with self._changed:
+            if self.active_jobs(client) >= self.max_per_client:
+                raise ClientLimitError(f"Máximo de {self.max_per_client} trabajos activos por cliente")
+            # Reservar el cupo antes de recibir el archivo
+            self._jobs[job_id] = job
+        try:
+            os.makedirs(job.output_dir, exist_ok=True)
+            with open(job.input_path, 'wb') as f:
+                remaining = length
+                while remaining is None or remaining > 0:
+                    chunk = stream.read(UPLOAD_CHUNK if remaining is None else min(UPLOAD_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    if remaining is not None:
+                        remaining -= len(chunk)
+            if remaining:
+                raise ValueError("Subida incompleta")
+        except Exception:
+            with self._changed:
+                self._jobs.pop(job_id, None)
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str, client: Optional[str] = None) -> Optional[Job]:
+        """A job by id; with `client`, only if it belongs to that client"""
+        job = self._jobs.get(job_id)
+        if job is None or (client is not None and job.client != client):
+            return None
+        return job
+
+    def list(self, client: Optional[str] = None) -> List[Job]:
+        with self._changed:
+            return [job for job in self._jobs.values() if client is None or job.client == client]
+
+    def cancel(self, job: Job) -> None:
+        """Queued jobs never start; running ones stop at the next file or segment"""
+        with self._changed:
+            if job.state == QUEUED:
+                self._finish(job, CANCELLED)
+            elif job.state == RUNNING and job.token is not None:
+                job.token.cancel()
+
+    def delete(self, job: Job) -> bool:
+        """Forget a finished job and its files; running jobs must be cancelled first"""
+        with self._changed:
+            if not job.finished:
+                return False
+            self._jobs.pop(job.id, None)
+        shutil.rmtree(job.directory, ignore_errors=True)
+        return True
+
+    def reap_expired(self) -> int:
+        """Delete finished jobs older than the retention period; returns how many"""
+        if not self.retention_seconds:
+            return 0
+        limit = time.time() - self.retention_seconds
+        with self._changed:
+            expired = [job for job in self._jobs.values() if job.finished and job.finished_at < limit]
+        return len([job for job in expired if self.delete(job)])
+
+    def wait_events(self, job: Job, start: int, timeout: float = 15.0) -> Tuple[List[Dict], bool]:
+        """Events after position `start`, waiting up to `timeout` for new ones"""
+        with self._changed:
+            self._changed.wait_for(lambda: len(job.events) > start or job.finished, timeout)
+            return job.events[start:], job.finished
+
+    def shutdown(self) -> None:
+        """Stop running jobs at their next boundary"""
+        for job in self.list():
+            self.cancel(job)
+
+    def _emit(self, job: Job, event: str, data: Dict) -> None:
+        with self._changed:
+            job.events.append(dict(data, event=event, time=time.time()))
+            self._changed.notify_all()
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished_at = time.time()
+        self._changed.notify_all()
+
+    def _run_forever(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=REAP_INTERVAL_SECONDS)
+            except queue.Empty:
+                self.reap_expired()
+                continue
+            with self._changed:
+                if job.state != QUEUED:
+                    continue
+                job.state = RUNNING
+                job.started_at = time.time()
+                job.token = CancelToken(float(job.params.get('budget_minutes') or 0) * 60 or None)
+                self._changed.notify_all()
+            try:
+                runner = self._run_transcribe if job.kind == 'transcribe' else self._run_split
+                runner(job)
+                state = STOPPED if job.stop_reason else DONE
+            except Exception as e:
+                job.error = str(e)
+                state = FAILED
+            with self._changed:
+                self._finish(job, state)
+
+    def _borrow_model(self, key: Tuple) -> object:
+        """An idle model for `key`, loading a new one only when none is free"""
+        from utils.backends import create_backend
+
+        with self._changed:
+            idle = self._models.get(key)
+            if idle:
+                return idle.pop()
+        backend, model_name, quantized, engine = key
+        return create_backend(backend, model_name=model_name, quantized=quantized, engine=engine)
+
+    def _return_models(self, borrowed: List[Tuple[Tuple, object]]) -> None:
+        with self._changed:
+            for key, model in borrowed:
+                self._models.setdefault(key, []).append(model)
+
+    def _run_transcribe(self, job: Job) -> None:
+        from utils.batch import (AUDIO_EXTENSIONS, BatchOptions, create_download_zip, extract_zip, run_batch,
+                                 write_batch_outputs)
+        from utils.hashing import hash_file
+        from utils.profiles import DEFAULT_PROFILE
+
+        if job.input_path.lower().endswith('.zip'):
+            audio_files, base_dir = extract_zip(job.input_path, os.path.join(job.directory, 'audios'))
+        elif job.input_path.lower().endswith(AUDIO_EXTENSIONS):
+            audio_files, base_dir = [job.input_path], job.directory
+        else:
+            raise ValueError("Se esperaba un ZIP o un archivo de audio")
+        params = job.params
+        options = BatchOptions(
+            keywords=params['keywords'], workers=params.get('workers', 1), watchdog=params.get('watchdog', True),
+            streaming=params.get('streaming', False), cascade=params.get('cascade', False),
+            profile=params.get('profile') or DEFAULT_PROFILE, tolerance=params.get('tolerance', 0),
+        )
+        borrowed: List[Tuple[Tuple, object]] = []
+
+        def load_model(model_name: Optional[str], replica: int) -> object:
+            key = (options.backend, model_name, options.quantized, options.engine)
+            model = self._borrow_model(key)
+            borrowed.append((key, model))
+            return model
+
+        try:
+            run = run_batch(audio_files, base_dir, options, job.output_dir,
+                            emit=lambda event, data: self._emit(job, event, data), cancel=job.token,
+                            archive_hash=hash_file(job.input_path), index_source='api', load_model=load_model)
+        finally:
+            self._return_models(borrowed)
+        write_batch_outputs(run, options.keywords, job.output_dir, options.tolerance)
+        archive_path = os.path.join(job.directory, 'resultados.zip')
+        with open(archive_path, 'wb') as f:
+            f.write(create_download_zip(run.results, options.keywords, run.pending, run.stop_reason,
+                                        options.tolerance, run.vocabulary))
+        job.result = dict(run.summary(), keywords=options.keywords)
+        job.archive_path = archive_path
+        job.stop_reason = run.stop_reason
+
+    def _run_split(self, job: Job) -> None:
+        from utils.splitter import create_zip_advanced, run_split
+
+        params = job.params
+        segments, stop_reason = run_split(
+            job.input_path, job.output_dir, emit=lambda event, data: self._emit(job, event, data), cancel=job.token,
+            interval_minutes=params.get('interval_minutes', 2),
+            silence_detection=params.get('silence_detection', True),
+            min_silence_len=params.get('min_silence_len', 1000),
+            silence_thresh_adjustment=params.get('silence_thresh', 16),
+            output_format=params.get('format', 'mp3'), output_quality=params.get('quality', 'medium'),
+        )
+        job.result = {'segments': [asdict(segment) for segment in segments], 'stop_reason': stop_reason}
+        job.stop_reason = stop_reason
+        if segments:
+            archive_path = os.path.join(job.directory, 'segmentos.zip')
+            with open(archive_path, 'wb') as f:
+                f.write(create_zip_advanced(segments, True, stop_reason))
+            job.archive_path = archive_path
@@ -0,0 +1,272 @@
+import re
+import unicodedata
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_text(text: str) -> str:
+    """Unicode case folding without diacritics ("Extorsión" -> "extorsion")"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized tokens split on word boundaries"""
+    return _WORD_RE.findall(normalize_text(text))
+
+
+def clean_keywords(keywords: Iterable[str]) -> List[str]:
+    """Stripped, non-empty keywords in their original order"""
+    return [keyword.strip() for keyword in keywords or [] if keyword and keyword.strip()]
+
+
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Levenshtein distance; with `max_distance`, stops early returning max_distance + 1"""
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def allowed_distance(term: str, tolerance: int) -> int:
+    """Edits tolerated for a term: none up to 3 letters, then one per 3 letters, capped by `tolerance`"""
+    return min(tolerance, max(0, (len(term) - 1) // 3))
+
+
+class BKTree:
+    """BK-tree over edit distance: finds every word within d edits of a query"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        self.words: Set[str] = set()
+        for word in words:
+            self.add(word)
+
+    @property
+    def size(self) -> int:
+        return len(self.words)
+
+    def add(self, word: str) -> bool:
+        """Insert a word; False if it was already present"""
+        if word in self.words:
+            return False
+        self.words.add(word)
+        if self.root is None:
+            self.root = (word, {})
+            return True
+        node = self.root
+        while True:
+            distance = edit_distance(word, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return True
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[str, int]]:
+        """Words within `max_distance` edits, with their distance"""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            candidate, children = stack.pop()
+            distance = edit_distance(word, candidate)
+            if distance <= max_distance:
+                results.append((candidate, distance))
+            # Desigualdad triangular: solo pueden servir hijos a distancia d ± max_distance
+            stack.extend(
+                child for edge, child in children.items()
+                if distance - max_distance <= edge <= distance + max_distance
+            )
+        return results
+
+
+class FuzzyVocabulary:
+    """
+    Vocabulario de una transcripción o de un corpus completo para coincidencias
+    aproximadas.
+
+    Las variantes de cada término se buscan una sola vez en el BK-tree y quedan
+    en memoria; al añadir palabras nuevas (p. ej. el siguiente archivo del lote)
+    solo esas palabras se comparan con los términos ya consultados.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.tree = BKTree()
+        self._variants: Dict[Tuple[str, int], Set[str]] = {}
+        self.update(words)
+
+    def update(self, words: Iterable[str]) -> None:
+        for word in words:
+            if self.tree.add(word):
+                for (term, distance), variants in self._variants.items():
+                    if edit_distance(term, word, distance) <= distance:
+                        variants.add(word)
+
+    def variants(self, term: str, max_distance: int) -> Set[str]:
+        """Vocabulary words within `max_distance` edits of `term`"""
+        if max_distance <= 0:
+            return {term}
+        key = (term, max_distance)
+        if key not in self._variants:
+            self._variants[key] = {word for word, _ in self.tree.search(term, max_distance)}
+        return self._variants[key]
+
+    def expand(self, keyword: str, tolerance: int = 0) -> List[Set[str]]:
+        """Accepted tokens for each term of a keyword"""
+        return [self.variants(term, allowed_distance(term, tolerance)) for term in tokenize(keyword)]
+
+
+class TokenIndex:
+    """
+    Índice invertido de tokens normalizados de una transcripción.
+
+    Cada segmento (o texto) se tokeniza una sola vez; después, buscar una
+    palabra clave o contar sus apariciones es una consulta al diccionario, y el
+    mismo índice sirve cuando cambian las palabras clave. Las frases se
+    resuelven comprobando posiciones consecutivas.
+    """
+
+    def __init__(self, texts: Iterable[str], ids: Optional[Iterable[int]] = None):
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+        self.size = 0
+        for doc_id, text in zip(ids if ids is not None else count(), texts):
+            for position, token in enumerate(tokenize(text or '')):
+                self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+            self.size += 1
+        self._fuzzy: Optional[FuzzyVocabulary] = None
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict]) -> 'TokenIndex':
+        return cls(segment.get('text', '') for segment in segments)
+
+    @property
+    def vocabulary(self) -> List[str]:
+        return list(self.postings)
+
+    def fuzzy_vocabulary(self) -> FuzzyVocabulary:
+        """BK-tree of this index's own vocabulary, built on first use"""
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyVocabulary(self.postings)
+        return self._fuzzy
+
+    def _term_postings(self, variants: Set[str]) -> Dict[int, List[int]]:
+        if len(variants) == 1:
+            return self.postings.get(next(iter(variants)), {})
+        merged: Dict[int, List[int]] = {}
+        for token in variants:
+            for doc_id, positions in self.postings.get(token, {}).items():
+                merged.setdefault(doc_id, []).extend(positions)
+        return merged
+
+    def occurrences(self, keyword: str, tolerance: int = 0,
+                    vocabulary: Optional[FuzzyVocabulary] = None) -> Dict[int, int]:
+        """
+        Number of occurrences of a word or phrase per segment. With `tolerance`,
+        each term also matches tokens within a few edits (see `allowed_distance`);
+        `vocabulary` lets a batch share one corpus-wide BK-tree.
+        """
+        if tolerance > 0:
+            options = (vocabulary or self.fuzzy_vocabulary()).expand(keyword, tolerance)
+        else:
+            options = [{term} for term in tokenize(keyword)]
+        if not options:
+            return {}
+        first = self._term_postings(options[0])
+        if not first:
+            return {}
+        if len(options) == 1:
+            return {doc_id: len(positions) for doc_id, positions in first.items()}
+
+        rest = [self._term_postings(variants) for variants in options[1:]]
+        counts = {}
+        for doc_id, positions in first.items():
+            if not all(doc_id in postings for postings in rest):
+                continue
+            following = [set(postings[doc_id]) for postings in rest]
+            matches = sum(
+                1 for p in positions
+                if all(p + offset in following[offset - 1] for offset in range(1, len(options)))
+            )
+            if matches:
+                counts[doc_id] = matches
+        return counts
+
+    def count(self, keyword: str, tolerance: int = 0, vocabulary: Optional[FuzzyVocabulary] = None) -> int:
+        return sum(self.occurrences(keyword, tolerance, vocabulary).values())
+
+    def keyword_counts(self, keywords: Iterable[str], tolerance: int = 0,
+                       vocabulary: Optional[FuzzyVocabulary] = None) -> Dict[str, int]:
+        """Occurrences of each keyword found at least once"""
+        counts = {keyword: self.count(keyword, tolerance, vocabulary) for keyword in clean_keywords(keywords)}
+        return {keyword: n for keyword, n in counts.items() if n}
+
+    def found_keywords(self, keywords: Iterable[str], tolerance: int = 0,
+                       vocabulary: Optional[FuzzyVocabulary] = None) -> List[str]:
+        return list(self.keyword_counts(keywords, tolerance, vocabulary))
+
+    def segments_with(self, keywords: Iterable[str], tolerance: int = 0,
+                      vocabulary: Optional[FuzzyVocabulary] = None) -> Set[int]:
+        """Ids of the segments containing any keyword"""
+        ids: Set[int] = set()
+        for keyword in clean_keywords(keywords):
+            ids.update(self.occurrences(keyword, tolerance, vocabulary))
+        return ids
+
+
+def find_keyword_spans(text: str, keywords: Iterable[str], tolerance: int = 0,
+                       vocabulary: Optional[FuzzyVocabulary] = None) -> List[Tuple[int, int, str]]:
+    """
+    Character spans (start, end, keyword) of whole-word keyword matches in the
+    NFC form of `text`, ignoring case and diacritics and, with `tolerance`,
+    allowing small misspellings. Overlaps keep the first.
+    """
+    text = unicodedata.normalize('NFC', text)
+    words = [(normalize_text(m.group()), m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+    tokens = [word for word, _, _ in words]
+    if tolerance > 0 and vocabulary is None:
+        vocabulary = FuzzyVocabulary(tokens)
+
+    spans = []
+    for keyword in clean_keywords(keywords):
+        if tolerance > 0:
+            options = vocabulary.expand(keyword, tolerance)
+        else:
+            options = [{term} for term in tokenize(keyword)]
+        size = len(options)
+        if not size:
+            continue
+        for i in range(len(tokens) - size + 1):
+            if all(tokens[i + k] in options[k] for k in range(size)):
+                spans.append((words[i][1], words[i + size - 1][2], keyword))
+
+    merged: List[Tuple[int, int, str]] = []
+    for span in sorted(spans):
+        if not merged or span[0] >= merged[-1][1]:
+            merged.append(span)
+    return merged
+
+
+def mark_keywords(text: str, keywords: Iterable[str], mark_start: str = '<mark>',
+                  mark_end: str = '</mark>', tolerance: int = 0,
+                  vocabulary: Optional[FuzzyVocabulary] = None) -> Tuple[str, List[str]]:
+    """Wrap every keyword match in `mark_start`/`mark_end` and return the keywords found"""
+    text = unicodedata.normalize('NFC', text or '')
+    spans = find_keyword_spans(text, keywords, tolerance, vocabulary)
+    parts, last = [], 0
+    for start, end, _ in spans:
+        parts.extend([text[last:start], mark_start, text[start:end], mark_end])
+        last = end
+    parts.append(text[last:])
+    found = [keyword for keyword in clean_keywords(keywords) if any(k == keyword for _, _, k in spans)]
+    return ''.join(parts), found
@@ -0,0 +1,36 @@
+import re
+import unicodedata
+from typing import List, Tuple
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercase, drop punctuation and split into words for WER scoring"""
+    text = unicodedata.normalize('NFC', text).lower()
+    return re.findall(r"\w+", text)
+
+
+def word_edit_distance(reference: List[str], hypothesis: List[str]) -> int:
+    """Levenshtein distance between two word sequences"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current[j] = min(
+                previous[j] + 1,                            # borrado
+                current[j - 1] + 1,                         # inserción
+                previous[j - 1] + (ref_word != hyp_word)    # sustitución
+            )
+        previous = current
+    return previous[-1]
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """Return (edits, reference word count) so WER can be pooled over a corpus"""
+    ref_words = normalize_words(reference)
+    return word_edit_distance(ref_words, normalize_words(hypothesis)), len(ref_words)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word error rate of a hypothesis against a reference transcript"""
+    edits, total = word_errors(reference, hypothesis)
+    return edits / total if total else float(edits > 0)
@@ -0,0 +1,48 @@
+import os
+
+import torch
+import whisper
+from torch import nn
+
+from utils.engines import DEFAULT_ENGINE, DEFAULT_THREADS, apply_engine
+
+# Modelo por defecto y modo de inferencia (configurables por entorno)
+DEFAULT_MODEL = os.environ.get('WHISPER_MODEL', 'base')
+DEFAULT_QUANTIZED = os.environ.get('WHISPER_QUANTIZED', '0').lower() in ('1', 'true', 'yes')
+
+
+def _to_plain_linear(module: nn.Module) -> nn.Module:
+    """
+    Replace Whisper's Linear subclass with torch.nn.Linear in place.
+    Dynamic quantization only recognises the exact nn.Linear type.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+            plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.load_state_dict(child.state_dict())
+            setattr(module, name, plain)
+        else:
+            _to_plain_linear(child)
+    return module
+
+
+def quantize_model(model: whisper.model.Whisper) -> whisper.model.Whisper:
+    """int8 dynamic quantization of every linear layer (CPU only)"""
+    model = _to_plain_linear(model.cpu().float())
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper_model(name: str = DEFAULT_MODEL, quantized: bool = DEFAULT_QUANTIZED,
+                       device: str = None, engine: str = DEFAULT_ENGINE,
+                       threads: int = DEFAULT_THREADS) -> whisper.model.Whisper:
+    """
+    Load a Whisper model, optionally with int8 dynamic quantization and an
+    exported encoder graph (`engine` = 'torchscript' or 'onnx').
+    Quantized models and exported engines always run on CPU.
+    """
+    if quantized or engine != 'eager':
+        device = 'cpu'
+    model = whisper.load_model(name, device=device)
+    if quantized:
+        model = quantize_model(model)
+    return apply_engine(model, name, engine, threads, quantized)
@@ -0,0 +1,57 @@
+import json
+import os
+import re
+import subprocess
+from typing import Dict
+
+
+def probe_audio(path: str) -> Dict:
+    """
+    Leer duración y formato del primer stream de audio con ffprobe,
+    sin decodificar el archivo.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels,bits_per_sample,bits_per_raw_sample,duration",
+        "-show_entries", "format=duration",
+        "-of", "json",
+        path
+    ]
+    output = subprocess.run(cmd, capture_output=True, check=True).stdout
+    info = json.loads(output or b'{}')
+    stream = (info.get('streams') or [{}])[0]
+    duration = stream.get('duration') or info.get('format', {}).get('duration') or 0
+    bits = int(stream.get('bits_per_sample') or stream.get('bits_per_raw_sample') or 0)
+    return {
+        'duration_seconds': float(duration),
+        'sample_rate': int(stream.get('sample_rate') or 0),
+        'channels': int(stream.get('channels') or 0),
+        'bits_per_sample': bits,
+    }
+
+
+_FFMPEG_DURATION_RE = re.compile(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)')
+
+
+def probe_duration(path: str) -> float:
+    """
+    Duration in seconds without decoding: ffprobe, then the header that
+    `ffmpeg -i` prints, then an estimate as 16-bit PCM at 16 kHz.
+    """
+    try:
+        duration = probe_audio(path)['duration_seconds']
+        if duration > 0:
+            return duration
+    except Exception:
+        pass
+    try:
+        stderr = subprocess.run(["ffmpeg", "-nostdin", "-hide_banner", "-i", path],
+                                capture_output=True).stderr.decode(errors='ignore')
+        match = _FFMPEG_DURATION_RE.search(stderr)
+        if match:
+            hours, minutes, seconds = match.groups()
+            return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except Exception:
+        pass
+    return os.path.getsize(path) / (16000 * 2)
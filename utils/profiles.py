@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import torch
+
+
+@dataclass(frozen=True)
+class DecodeProfile:
+    """Named set of Whisper decoding options trading speed for accuracy"""
+    name: str
+    description: str
+    beam_size: Optional[int]
+    best_of: Optional[int]
+    temperature: Tuple[float, ...]
+    compression_ratio_threshold: Optional[float]
+    logprob_threshold: Optional[float]
+    no_speech_threshold: Optional[float]
+    condition_on_previous_text: bool
+    fp16: bool
+
+    def transcribe_options(self) -> Dict:
+        """Keyword arguments for `model.transcribe` / `backend.transcribe`"""
+        return {
+            'beam_size': self.beam_size,
+            'best_of': self.best_of,
+            'temperature': self.temperature,
+            'compression_ratio_threshold': self.compression_ratio_threshold,
+            'logprob_threshold': self.logprob_threshold,
+            'no_speech_threshold': self.no_speech_threshold,
+            'condition_on_previous_text': self.condition_on_previous_text,
+            # FP16 solo tiene sentido en GPU; en CPU Whisper usaría FP32 con una advertencia
+            'fp16': self.fp16 and torch.cuda.is_available(),
+        }
+
+
+PROFILES: Dict[str, DecodeProfile] = {
+    'rápido': DecodeProfile(
+        name='rápido',
+        description="Greedy sin re-decodificaciones ni contexto previo",
+        beam_size=None,
+        best_of=None,
+        temperature=(0.0,),
+        compression_ratio_threshold=None,
+        # Con una sola temperatura no provoca re-decodificaciones, pero Whisper lo
+        # necesita para no descartar habla segura con no_speech_prob alta
+        logprob_threshold=-1.0,
+        no_speech_threshold=0.6,
+        condition_on_previous_text=False,
+        fp16=True,
+    ),
+    'equilibrado': DecodeProfile(
+        name='equilibrado',
+        description="Greedy con hasta 2 re-decodificaciones por ventana",
+        beam_size=None,
+        best_of=2,
+        temperature=(0.0, 0.4, 0.8),
+        compression_ratio_threshold=2.4,
+        logprob_threshold=-1.0,
+        no_speech_threshold=0.6,
+        condition_on_previous_text=True,
+        fp16=True,
+    ),
+    # Las opciones por defecto de whisper.transcribe: lo que se usaba antes de los perfiles
+    'estándar': DecodeProfile(
+        name='estándar',
+        description="Opciones por defecto de Whisper: greedy con hasta 5 re-decodificaciones",
+        beam_size=None,
+        best_of=None,
+        temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        compression_ratio_threshold=2.4,
+        logprob_threshold=-1.0,
+        no_speech_threshold=0.6,
+        condition_on_previous_text=True,
+        fp16=True,
+    ),
+    'preciso': DecodeProfile(
+        name='preciso',
+        description="Beam search de 5 con la secuencia completa de temperaturas",
+        beam_size=5,
+        best_of=5,
+        temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        compression_ratio_threshold=2.4,
+        logprob_threshold=-1.0,
+        no_speech_threshold=0.6,
+        condition_on_previous_text=True,
+        fp16=True,
+    ),
+}
+DEFAULT_PROFILE = 'estándar'
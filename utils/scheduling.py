@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.cancellation import CancelToken
+from utils.probe import probe_duration
+
+# Historial de RTF observados por configuración (configurable por entorno)
+RTF_HISTORY = os.environ.get(
+    'RTF_HISTORY',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_rtf.json')
+)
+RTF_SMOOTHING = 0.3
+PROBE_WORKERS = 8
+_SKIPPED = object()
+
+
+def probe_durations(paths: Iterable[str], workers: int = PROBE_WORKERS) -> Dict[str, float]:
+    """Durations of many files, probed concurrently (each probe only reads the header)"""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as executor:
+        return dict(zip(paths, executor.map(probe_duration, paths)))
+
+
+def longest_first(paths: Iterable[str], durations: Dict[str, float]) -> List[str]:
+    """
+    Orden LPT (longest processing time first): con varios trabajadores, empezar
+    por los archivos largos evita que uno de ellos quede solo al final del lote.
+    """
+    return sorted(paths, key=lambda path: -durations.get(path, 0.0))
+
+
+def run_parallel(func: Callable, items: Iterable, workers: int = 1,
+                 cancel: Optional[CancelToken] = None) -> Iterator[Tuple[object, object]]:
+    """
+    Apply `func` to every item and yield (item, result) as each one finishes.
+    Items start in the given order; with one worker everything runs inline.
+    Once `cancel` fires no new item starts, but the ones already running are
+    still yielded, so their results are kept. Closing the iterator early waits
+    for the items already running and discards them.
+    """
+    cancelled = (lambda: cancel.cancelled) if cancel is not None else (lambda: False)
+    if workers <= 1:
+        for item in items:
+            if cancelled():
+                return
+            yield item, func(item)
+        return
+
+    def start(item):
+        # Un hilo libre no empieza un elemento nuevo después de la cancelación
+        return _SKIPPED if cancelled() else func(item)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(start, item): item for item in items}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            result = future.result()
+            if result is not _SKIPPED:
+                yield futures[future], result
+            if cancelled():
+                for pending in futures:
+                    pending.cancel()
+    finally:
+        # Si se abandona la iteración (interrupción), lo pendiente no llega a empezar
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def load_rtf(key: str, path: str = RTF_HISTORY) -> Optional[float]:
+    """Last smoothed real-time factor recorded for a configuration"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+
+
+def record_rtf(key: str, rtf: float, path: str = RTF_HISTORY) -> None:
+    """Blend a newly observed real-time factor into the history"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        history = {}
+    previous = history.get(key)
+    history[key] = rtf if previous is None else (1 - RTF_SMOOTHING) * previous + RTF_SMOOTHING * rtf
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+@dataclass
+class BatchProgress:
+    """
+    Progreso de un lote medido en segundos de audio.
+
+    El RTF (segundos de proceso por segundo de audio) se mide sobre los
+    archivos ya terminados; hasta el primero se usa `prior_rtf`, p. ej. el
+    histórico de esta máquina y modelo. La ETA reparte el audio pendiente entre
+    los trabajadores que aún pueden tener trabajo.
+    """
+    total_seconds: float
+    total_files: int
+    workers: int = 1
+    prior_rtf: Optional[float] = None
+    done_seconds: float = 0.0
+    done_files: int = 0
+    timed_seconds: float = 0.0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.time)
+
+    def complete(self, duration: float, processing_time: Optional[float] = None) -> None:
+        """Count a finished file; without `processing_time` (e.g. a failure) it does not affect the RTF"""
+        self.done_seconds += duration
+        self.done_files += 1
+        if processing_time is not None:
+            self.timed_seconds += duration
+            self.busy_seconds += processing_time
+
+    @property
+    def fraction(self) -> float:
+        if self.total_seconds <= 0:
+            return self.done_files / self.total_files if self.total_files else 1.0
+        return min(1.0, self.done_seconds / self.total_seconds)
+
+    @property
+    def rtf(self) -> Optional[float]:
+        if self.timed_seconds > 0:
+            return self.busy_seconds / self.timed_seconds
+        return self.prior_rtf
+
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self.started_at
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated wall-clock seconds left, or None without any RTF yet"""
+        if self.rtf is None:
+            return None
+        remaining_files = self.total_files - self.done_files
+        if remaining_files <= 0:
+            return 0.0
+        remaining = max(0.0, self.total_seconds - self.done_seconds)
+        return remaining * self.rtf / max(1, min(self.workers, remaining_files))
@@ -0,0 +1,56 @@
+from math import ceil
+from typing import Callable, Dict, List, Optional
+
+# Estilos compartidos del visor de segmentos: se envían una vez por página
+SEGMENT_VIEW_CSS = """
+<style>
+.seg-view { display: flex; flex-direction: column; gap: 8px; }
+.seg-view .seg { padding: 10px 12px; border-left: 3px solid #ccc; background-color: #f9f9f9; border-radius: 4px; }
+.seg-view .seg.hit { border-left: 4px solid #d32f2f; background-color: #fff3e0; }
+.seg-view .seg.target { outline: 2px solid #1976d2; }
+.seg-view .seg-meta { font-size: 12px; color: #666; margin-bottom: 4px; }
+.seg-view .seg.hit .seg-meta { color: #d32f2f; font-weight: bold; }
+.seg-view .seg-text { font-size: 14px; line-height: 1.5; }
+.seg-view .seg-hits { font-size: 12px; color: #d32f2f; margin-top: 4px; }
+.seg-view mark.kw { background-color: #ffeb3b; color: #d32f2f; font-weight: bold; }
+</style>
+"""
+KEYWORD_MARK_CLASS = '<mark class="kw">'
+PAGE_SIZES = [25, 50, 100, 200]
+
+
+def page_count(total: int, page_size: int) -> int:
+    """Number of pages needed for `total` items (at least one)"""
+    return max(1, ceil(total / page_size))
+
+
+def page_of(position: int, page_size: int) -> int:
+    """1-based page holding the item at `position`"""
+    return position // page_size + 1
+
+
+def render_segment_page(rows: List[Dict], format_time: Callable[[float], str],
+                        target: Optional[int] = None) -> str:
+    """
+    Una página del visor como un único bloque HTML con clases compartidas.
+
+    Cada fila lleva "index", "start_time", "end_time", "text" (HTML ya resaltado),
+    "hit" y, opcionalmente, "hits" con las marcas por palabra del segmento.
+    """
+    blocks = []
+    for row in rows:
+        classes = 'seg' + (' hit' if row.get('hit') else '') + (' target' if row['index'] == target else '')
+        marker = '🎯 ' if row.get('hit') else ''
+        hits = ''
+        if row.get('hits'):
+            items = ' · '.join(
+                f"<strong>{hit['text']}</strong> {format_time(hit['start'])} → {format_time(hit['end'])}"
+                for hit in row['hits']
+            )
+            hits = f'<div class="seg-hits">📍 {items}</div>'
+        blocks.append(
+            f'<div class="{classes}" id="seg-{row["index"]}">'
+            f'<div class="seg-meta">{marker}#{row["index"]} | ⏱️ {row["start_time"]} → {row["end_time"]}</div>'
+            f'<div class="seg-text">{row["text"]}</div>{hits}</div>'
+        )
+    return SEGMENT_VIEW_CSS + '<div class="seg-view">' + ''.join(blocks) + '</div>'
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+# Caché de fragmentos de audio (configurable por entorno)
+SNIPPET_DIR = os.environ.get(
+    'SNIPPET_DIR',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_snippets')
+)
+SNIPPET_CACHE_MAX_MB = int(os.environ.get('SNIPPET_CACHE_MAX_MB', '256'))
+SNIPPET_PADDING_SECONDS = 1.0
+SNIPPET_SAMPLE_RATE = 16000
+
+
+def parse_timestamp(value: str) -> float:
+    """Seconds from an SRT/VTT timestamp ("HH:MM:SS,mmm", "MM:SS.mmm")"""
+    seconds = 0.0
+    for part in value.strip().replace(',', '.').split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _snippet_key(source_path: str, start: float, end: float) -> str:
+    # Tamaño y fecha de modificación identifican el archivo sin leerlo completo
+    stat = os.stat(source_path)
+    identity = f"{os.path.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}|{start:.3f}|{end:.3f}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+def extract_snippet(source_path: str, start: float, end: float,
+                    padding: float = SNIPPET_PADDING_SECONDS,
+                    directory: Optional[str] = None) -> str:
+    """
+    Extrae [start - padding, end + padding] a un WAV mono de 16 kHz y devuelve su ruta.
+
+    ffmpeg busca directamente la posición de inicio (-ss antes de -i), por lo que
+    el coste depende de la duración del fragmento y no de la del archivo. Los
+    fragmentos quedan en caché en disco.
+    """
+    directory = directory or SNIPPET_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    start = max(start - padding, 0.0)
+    end = max(end + padding, start)
+    target = os.path.join(directory, f"{_snippet_key(source_path, start, end)}.wav")
+    if os.path.exists(target):
+        os.utime(target)  # marcar como usado recientemente para el LRU
+        return target
+
+    # Nombre único: dos sesiones pueden extraer el mismo acierto a la vez.
+    # Sin extensión .wav para que la expulsión LRU no lo tome por un fragmento
+    fd, tmp_target = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", source_path,
+        "-vn", "-ac", "1", "-ar", str(SNIPPET_SAMPLE_RATE), "-f", "wav", "-y", tmp_target
+    ]
+    try:
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        os.replace(tmp_target, target)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"No se pudo extraer el fragmento: {e.stderr.decode(errors='ignore')[-300:]}") from e
+    finally:
+        if os.path.exists(tmp_target):
+            os.remove(tmp_target)
+
+    evict_snippets(directory, keep=target)
+    return target
+
+
+def evict_snippets(directory: str = SNIPPET_DIR, max_mb: int = SNIPPET_CACHE_MAX_MB,
+                   keep: Optional[str] = None) -> None:
+    """Remove least recently used snippets until the directory fits its size cap"""
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith('.wav'):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Expulsado por otro proceso mientras se listaba
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_mb * 1024 * 1024:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
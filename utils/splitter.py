@@ -0,0 +1,278 @@
+import io
+import os
+import tempfile
+import zipfile
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils.cancellation import CancelToken
+from utils.workspace import AudioWorkspace
+
+
+@dataclass
+class SegmentInfo:
+    filename: str
+    filepath: str
+    duration_seconds: float
+    start_time: float
+    end_time: float
+    file_size_mb: float
+
+
+def get_audio_info(workspace: AudioWorkspace) -> Dict:
+    """Obtener información básica del archivo de audio"""
+    try:
+        duration_seconds = len(workspace) / 1000
+        file_size_mb = os.path.getsize(workspace.source_path) / (1024 * 1024)
+
+        return {
+            'duration_seconds': duration_seconds,
+            'duration_formatted': format_duration(duration_seconds),
+            'file_size_mb': file_size_mb,
+            'sample_rate': workspace.sample_rate,
+            'channels': workspace.channels,
+            'format': workspace.bits_per_sample,  # bits per sample
+            'success': True
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def format_duration(seconds: float) -> str:
+    """Formatear duración en formato legible"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+
+    if hours > 0:
+        return f"{hours}h {minutes}m {secs}s"
+    elif minutes > 0:
+        return f"{minutes}m {secs}s"
+    else:
+        return f"{secs}s"
+
+
+def calculate_estimated_segments(duration_seconds: float, interval_minutes: int) -> int:
+    """Calcular número estimado de segmentos"""
+    interval_seconds = interval_minutes * 60
+    return int(duration_seconds / interval_seconds) + (1 if duration_seconds % interval_seconds > 0 else 0)
+
+
+def divide_audio_advanced(
+    source: Union[str, AudioWorkspace],
+    interval_minutes: int = 2,
+    silence_detection: bool = True,
+    min_silence_len: int = 1000,
+    silence_thresh_adjustment: int = 16,
+    fade_duration: int = 100,
+    output_format: str = "mp3",
+    output_quality: str = "medium",
+    cancel: Optional[CancelToken] = None,
+    output_dir: Optional[str] = None
+) -> Iterator[Tuple[float, List[SegmentInfo]]]:
+    """
+    Función avanzada para dividir audio con múltiples opciones.
+    Acepta una ruta o un AudioWorkspace ya decodificado (se lee sin copiar).
+    Con `cancel`, se detiene entre segmentos conservando los ya exportados.
+    Los segmentos se escriben en `output_dir` o en un directorio temporal nuevo.
+    Con una ruta, el espacio de trabajo propio se borra al terminar.
+    """
+    owned_workspace = None
+    try:
+        # Directorio de salida (temporal único si no se indica)
+        temp_dir = output_dir or tempfile.mkdtemp(prefix="audio_segments_")
+        os.makedirs(temp_dir, exist_ok=True)
+
+        # Decodificar una sola vez (o reutilizar el espacio de trabajo de la sesión)
+        if isinstance(source, AudioWorkspace):
+            audio = source
+        else:
+            audio = owned_workspace = AudioWorkspace(source)
+
+        # Configurar calidad de salida
+        bitrate_map = {
+            "low": "64k",
+            "medium": "128k",
+            "high": "192k",
+            "very_high": "320k"
+        }
+        export_bitrate = bitrate_map.get(output_quality, "128k")
+
+        # Convertir minutos a milisegundos
+        interval_ms = interval_minutes * 60 * 1000
+
+        # Configurar umbral de silencio
+        silence_thresh = audio.dBFS - silence_thresh_adjustment
+
+        # Variables para segmentación
+        start = 0
+        segment_count = 1
+        segments_info = []
+
+        total_duration = len(audio)
+
+        while start < total_duration:
+            end = min(start + interval_ms, total_duration)
+
+            # Detectar silencios si está habilitado
+            if silence_detection and end < total_duration:
+                try:
+                    silent_ranges = audio.detect_silence(
+                        start,
+                        end,
+                        min_silence_len=min_silence_len,
+                        silence_thresh=silence_thresh
+                    )
+
+                    # Ajustar el corte al último silencio si existe
+                    if silent_ranges:
+                        segment_len = end - start
+                        # Buscar silencio cerca del final del segmento
+                        for silence_start, silence_end in reversed(silent_ranges):
+                            if silence_start >= (segment_len - 30 * 1000):  # Últimos 30 segundos
+                                end = start + silence_start
+                                break
+                except Exception:
+                    # Si falla la detección de silencio, continuar sin ella
+                    pass
+
+            # Recortar directamente del mapa de memoria
+            segment = audio.segment(start, end)
+
+            # Aplicar fade in/out si está configurado
+            if fade_duration > 0:
+                segment = segment.fade_in(fade_duration).fade_out(fade_duration)
+
+            # Generar nombre del archivo
+            segment_filename = f"audio_seg_{segment_count:03d}.{output_format}"
+            segment_filepath = os.path.join(temp_dir, segment_filename)
+
+            # Exportar segmento
+            segment.export(
+                segment_filepath,
+                format=output_format,
+                bitrate=export_bitrate
+            )
+
+            # Crear información del segmento
+            segment_info = SegmentInfo(
+                filename=segment_filename,
+                filepath=segment_filepath,
+                duration_seconds=len(segment) / 1000,
+                start_time=start / 1000,
+                end_time=end / 1000,
+                file_size_mb=os.path.getsize(segment_filepath) / (1024 * 1024)
+            )
+
+            segments_info.append(segment_info)
+
+            # Actualizar contadores
+            start = end
+            segment_count += 1
+
+            # Yield progress para el progress bar
+            progress = min(start / total_duration, 1.0)
+            yield progress, segments_info
+
+            # Frontera entre segmentos: cancelación o límite de tiempo
+            if cancel is not None and cancel.cancelled and start < total_duration:
+                return
+
+        yield 1.0, segments_info  # Completado
+
+    except Exception as e:
+        raise Exception(f"Error procesando audio: {str(e)}")
+    finally:
+        # El PCM decodificado ocupa cientos de MB por hora de audio
+        if owned_workspace is not None:
+            owned_workspace.close()
+
+
+def create_zip_advanced(segments: List[SegmentInfo], include_metadata: bool = True,
+                        stop_reason: Optional[str] = None) -> bytes:
+    """Crear ZIP con los segmentos y metadata opcional"""
+    zip_buffer = io.BytesIO()
+
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # Agregar archivos de audio
+        for segment in segments:
+            if os.path.exists(segment.filepath):
+                zipf.write(segment.filepath, segment.filename)
+
+        # Agregar metadata si está habilitado
+        if include_metadata:
+            metadata_content = create_metadata_file(segments, stop_reason)
+            zipf.writestr("SEGMENTOS_INFO.txt", metadata_content)
+
+    zip_buffer.seek(0)
+    return zip_buffer.read()
+
+
+def create_metadata_file(segments: List[SegmentInfo], stop_reason: Optional[str] = None) -> str:
+    """Crear archivo de metadata con información de los segmentos"""
+    content = "📊 INFORMACIÓN DE SEGMENTOS DE AUDIO\n"
+    content += "=" * 50 + "\n\n"
+
+    if stop_reason:
+        content += f"⏹️ DIVISIÓN INCOMPLETA ({stop_reason}): "
+        content += f"el último segmento termina en {format_duration(segments[-1].end_time)}\n\n"
+
+    total_duration = sum(seg.duration_seconds for seg in segments)
+    total_size = sum(seg.file_size_mb for seg in segments)
+
+    content += f"📈 RESUMEN GENERAL:\n"
+    content += f"• Total de segmentos: {len(segments)}\n"
+    content += f"• Duración total: {format_duration(total_duration)}\n"
+    content += f"• Tamaño total: {total_size:.2f} MB\n"
+    content += f"• Duración promedio por segmento: {format_duration(total_duration/len(segments))}\n\n"
+
+    content += "📋 DETALLE POR SEGMENTO:\n"
+    content += "-" * 50 + "\n"
+
+    for i, segment in enumerate(segments, 1):
+        content += f"{i:2d}. {segment.filename}\n"
+        content += f"    ⏱️  Duración: {format_duration(segment.duration_seconds)}\n"
+        content += f"    📏 Tiempo: {format_duration(segment.start_time)} → {format_duration(segment.end_time)}\n"
+        content += f"    💾 Tamaño: {segment.file_size_mb:.2f} MB\n"
+        content += "\n"
+
+    return content
+
+
+def run_split(source_path: str, output_dir: str, emit: Optional[Callable[[str, Dict], None]] = None,
+              cancel: Optional[CancelToken] = None, include_metadata: bool = True,
+              **options) -> Tuple[List[SegmentInfo], Optional[str]]:
+    """
+    División completa sin interfaz (CLI, API) con las opciones de
+    `divide_audio_advanced`. `emit(evento, datos)` recibe "start", "segment" por
+    cada segmento exportado y "done". Devuelve los segmentos y, si se detuvo
+    antes del final, el motivo.
+    """
+    emit = emit or (lambda event, data: None)
+    cancel = cancel or CancelToken()
+    workspace = AudioWorkspace(source_path)
+    segments: List[SegmentInfo] = []
+    completed = False
+    try:
+        total_ms = len(workspace)
+        emit("start", {
+            "file": os.path.basename(source_path),
+            "duration_seconds": total_ms / 1000,
+            "estimated_segments": calculate_estimated_segments(total_ms / 1000, options.get('interval_minutes', 2)),
+        })
+        for fraction, current in divide_audio_advanced(workspace, cancel=cancel, output_dir=output_dir, **options):
+            for segment in current[len(segments):]:
+                emit("segment", dict(asdict(segment), fraction=fraction))
+            segments = list(current)
+        completed = True
+    finally:
+        if not completed:
+            cancel.cancel()
+        workspace.close()
+    finished = bool(segments) and segments[-1].end_time * 1000 >= total_ms
+    stop_reason = None if finished else cancel.reason
+    if include_metadata and segments:
+        with open(os.path.join(output_dir, "SEGMENTOS_INFO.txt"), 'w', encoding='utf-8') as f:
+            f.write(create_metadata_file(segments, stop_reason))
+    emit("done", {"segments": len(segments), "stop_reason": stop_reason})
+    return segments, stop_reason
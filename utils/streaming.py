@@ -0,0 +1,182 @@
+import subprocess
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Mismos parámetros que usa whisper.audio.load_audio
+SAMPLE_RATE = 16000
+DEFAULT_WINDOW_SECONDS = 300
+PROMPT_MAX_CHARS = 200
+# Un segmento que termina a menos de esto del borde se considera cortado
+EDGE_MARGIN_SECONDS = 1.0
+
+
+def _read_exact(stream, size: int) -> bytes:
+    """Read up to `size` bytes from a pipe, stopping only at EOF"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        data = stream.read(remaining)
+        if not data:
+            break
+        chunks.append(data)
+        remaining -= len(data)
+    return b''.join(chunks)
+
+
+def ffmpeg_pcm_command(file: str, sr: int = SAMPLE_RATE, output: str = "-") -> List[str]:
+    """ffmpeg command that decodes any input to mono 16-bit PCM at `sr`"""
+    return [
+        "ffmpeg", "-nostdin", "-threads", "0", "-y",
+        "-i", file,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+        output
+    ]
+
+
+def iter_audio_windows(file: str, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                       sr: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """
+    Decodifica el audio con ffmpeg y lo entrega por ventanas de `window_seconds`
+    como arrays float32 mono, sin cargar nunca el archivo completo en memoria.
+    """
+    cmd = ffmpeg_pcm_command(file, sr)
+    window_bytes = int(window_seconds * sr) * 2  # int16 = 2 bytes por muestra
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    produced = False
+    try:
+        while True:
+            chunk = _read_exact(process.stdout, window_bytes)
+            if len(chunk) < 2:
+                break
+            chunk = chunk[:len(chunk) - len(chunk) % 2]
+            produced = True
+            yield np.frombuffer(chunk, np.int16).astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+    if not produced and process.returncode != 0:
+        raise RuntimeError(f"Failed to load audio: ffmpeg exited with code {process.returncode}")
+
+
+def iter_array_windows(audio: np.ndarray, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                       sr: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Slice an already decoded (possibly memory-mapped) array into windows"""
+    window_samples = int(window_seconds * sr)
+    for start in range(0, len(audio), window_samples):
+        yield audio[start:start + window_samples]
+
+
+def _with_last_flag(iterable) -> Iterator[Tuple[object, bool]]:
+    """Yield (item, is_last) pairs using one item of lookahead"""
+    iterator = iter(iterable)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous, False
+        previous = item
+    yield previous, True
+
+
+def shift_segment(segment: Dict, offset: float, segment_id: int) -> Dict:
+    """Return a copy of a Whisper segment moved to global time"""
+    shifted = dict(segment)
+    shifted['id'] = segment_id
+    shifted['start'] = segment['start'] + offset
+    shifted['end'] = segment['end'] + offset
+    if 'seek' in segment:
+        # seek se expresa en frames del espectrograma (100 por segundo)
+        shifted['seek'] = int(segment['seek'] + offset * 100)
+    if segment.get('words'):
+        shifted['words'] = [
+            {**word, 'start': word['start'] + offset, 'end': word['end'] + offset}
+            for word in segment['words']
+        ]
+    return shifted
+
+
+def transcribe_streaming(model, audio: Union[str, np.ndarray], language: str = 'es',
+                         window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                         **options) -> Iterator[Dict]:
+    """
+    Transcribe un archivo ventana por ventana y entrega los segmentos a medida
+    que se decodifican, con marcas de tiempo globales. `audio` puede ser una
+    ruta (se decodifica con ffmpeg) o un array ya decodificado, por ejemplo
+    el PCM memory-mapped de la caché de audio.
+
+    Si el último segmento de una ventana llega hasta el borde probablemente
+    quedó cortado: se descarta y el audio desde su inicio (como mucho una
+    ventana) se vuelve a decodificar al comienzo de la siguiente. Si termina
+    claramente antes del borde se conserva y solo se arrastran los últimos
+    EDGE_MARGIN_SECONDS. El buffer nunca supera dos ventanas.
+    """
+    options.pop('verbose', None)
+    prompt: Optional[str] = options.pop('initial_prompt', None)
+    condition_on_previous_text = options.get('condition_on_previous_text', True)
+
+    carry = np.zeros(0, dtype=np.float32)
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    margin_samples = int(EDGE_MARGIN_SECONDS * SAMPLE_RATE)
+    offset = 0.0
+    segment_id = 0
+
+    if isinstance(audio, str):
+        windows = iter_audio_windows(audio, window_seconds)
+    else:
+        windows = iter_array_windows(audio, window_seconds)
+
+    for chunk, is_last in _with_last_flag(windows):
+        buffer = np.concatenate([carry, chunk]) if carry.size else np.asarray(chunk, dtype=np.float32)
+
+        result = model.transcribe(buffer, language=language, verbose=None,
+                                  initial_prompt=prompt, **options)
+        segments = result.get('segments', [])
+
+        cut_sample = len(buffer)
+        if not is_last and segments:
+            tail_end = int(segments[-1]['end'] * SAMPLE_RATE)
+            if tail_end < len(buffer) - margin_samples:
+                # Silencio o música tras el último segmento: no arrastrarlo entero
+                cut_sample = len(buffer) - margin_samples
+            elif len(segments) > 1 and segments[-1]['start'] * SAMPLE_RATE >= len(buffer) - window_samples:
+                tail = segments.pop()
+                cut_sample = int(tail['start'] * SAMPLE_RATE)
+
+        emitted: List[str] = []
+        for segment in segments:
+            yield shift_segment(segment, offset, segment_id)
+            emitted.append(segment.get('text', ''))
+            segment_id += 1
+
+        # Copiar el resto para liberar el buffer de la ventana anterior
+        carry = np.array(buffer[cut_sample:], dtype=np.float32)
+        offset += cut_sample / SAMPLE_RATE
+
+        if condition_on_previous_text and emitted:
+            prompt = ''.join(emitted)[-PROMPT_MAX_CHARS:]
+
+
+def transcribe_windowed(model, audio: Union[str, np.ndarray], language: str = 'es',
+                        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                        on_segment: Optional[Callable[[Dict], None]] = None,
+                        **options) -> Dict:
+    """
+    Collect `transcribe_streaming` into a result shaped like `model.transcribe`.
+    `on_segment` is called with every segment as soon as it is decoded.
+    """
+    segments = []
+    for segment in transcribe_streaming(model, audio, language, window_seconds, **options):
+        segments.append(segment)
+        if on_segment is not None:
+            on_segment(segment)
+    return {
+        "text": ''.join(segment.get('text', '') for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
@@ -0,0 +1,98 @@
+import csv
+import io
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Tamaño de intervalo por defecto del mapa de calor y límite de columnas dibujadas
+TIMELINE_BIN_SECONDS = 60
+MAX_TIMELINE_BINS = 400
+BIN_STEPS = [10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400]
+
+
+def hit_arrays(hits: List[Dict], keywords: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Start times and keyword rows of the hits whose keyword is in `keywords`"""
+    rows = {keyword: row for row, keyword in enumerate(keywords)}
+    pairs = [(hit['start'], rows[hit['keyword']]) for hit in hits or [] if hit.get('keyword') in rows]
+    if not pairs:
+        return np.zeros(0), np.zeros(0, dtype=np.int64)
+    times, keyword_rows = zip(*pairs)
+    return np.asarray(times, dtype=np.float64), np.asarray(keyword_rows, dtype=np.int64)
+
+
+def bin_count(duration: float, bin_seconds: float) -> int:
+    """Number of bins covering `duration` (at least one)"""
+    return max(1, math.ceil(duration / bin_seconds))
+
+
+def bin_counts(times: np.ndarray, keyword_rows: np.ndarray, n_keywords: int,
+               bin_seconds: float, n_bins: int) -> np.ndarray:
+    """
+    Matriz (palabras clave x intervalos) de conteos. Cada acierto se reduce a un
+    índice plano fila * n_bins + intervalo y un único np.bincount agrega todos.
+    """
+    bins = np.clip((times // bin_seconds).astype(np.int64), 0, n_bins - 1)
+    flat = np.bincount(keyword_rows * n_bins + bins, minlength=n_keywords * n_bins)
+    return flat.reshape(n_keywords, n_bins)
+
+
+def keyword_timeline(hits: List[Dict], keywords: List[str], duration: float,
+                     bin_seconds: float = TIMELINE_BIN_SECONDS) -> np.ndarray:
+    """Per-keyword hit counts over fixed time bins of one file"""
+    times, keyword_rows = hit_arrays(hits, keywords)
+    return bin_counts(times, keyword_rows, len(keywords), bin_seconds, bin_count(duration, bin_seconds))
+
+
+def file_offsets(durations: Sequence[float]) -> np.ndarray:
+    """Start of each file when the batch is laid end to end in order"""
+    return np.concatenate(([0.0], np.cumsum(durations, dtype=np.float64)[:-1]))
+
+
+def batch_timeline(files: Sequence[Tuple[List[Dict], float]], keywords: List[str],
+                   bin_seconds: float = TIMELINE_BIN_SECONDS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Conteos por palabra clave sobre el lote completo, con los archivos uno tras
+    otro en el orden recibido (p. ej. segmentos consecutivos de una grabación).
+
+    Devuelve la matriz y el desplazamiento de inicio de cada archivo.
+    """
+    durations = [duration for _, duration in files]
+    offsets = file_offsets(durations)
+    per_file = [hit_arrays(hits, keywords) for hits, _ in files]
+    if per_file:
+        times = np.concatenate([file_times + offset for (file_times, _), offset in zip(per_file, offsets)])
+        keyword_rows = np.concatenate([rows for _, rows in per_file])
+    else:
+        times, keyword_rows = np.zeros(0), np.zeros(0, dtype=np.int64)
+    n_bins = bin_count(sum(durations), bin_seconds)
+    return bin_counts(times, keyword_rows, len(keywords), bin_seconds, n_bins), offsets
+
+
+def fit_bin_seconds(duration: float, bin_seconds: float = TIMELINE_BIN_SECONDS,
+                    max_bins: int = MAX_TIMELINE_BINS) -> float:
+    """Smallest bin size >= `bin_seconds` that keeps `duration` within `max_bins` bins"""
+    for step in [bin_seconds] + [step for step in BIN_STEPS if step > bin_seconds]:
+        if bin_count(duration, step) <= max_bins:
+            return step
+    return math.ceil(duration / max_bins)
+
+
+def timeline_csv(files: Sequence[Tuple[str, List[Dict], float]], keywords: List[str],
+                 bin_seconds: float = TIMELINE_BIN_SECONDS) -> str:
+    """
+    CSV con una fila por intervalo de cada archivo: tiempos dentro del archivo,
+    tiempos en el lote completo y el conteo de cada palabra clave.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['archivo', 'inicio_s', 'fin_s', 'inicio_lote_s', 'fin_lote_s'] + list(keywords))
+    offsets = file_offsets([duration for _, _, duration in files])
+    for (filename, hits, duration), offset in zip(files, offsets):
+        counts = keyword_timeline(hits, keywords, duration, bin_seconds)
+        starts = np.arange(counts.shape[1]) * bin_seconds
+        ends = np.minimum(starts + bin_seconds, duration) if duration > 0 else starts + bin_seconds
+        for column, (start, end) in enumerate(zip(starts, ends)):
+            writer.writerow([filename, f"{start:.1f}", f"{end:.1f}", f"{offset + start:.1f}",
+                             f"{offset + end:.1f}"] + counts[:, column].tolist())
+    return output.getvalue()
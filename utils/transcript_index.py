@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Base de datos de transcripciones (configurable por entorno)
+TRANSCRIPT_DB = os.environ.get(
+    'TRANSCRIPT_DB',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_transcripts.sqlite')
+)
+
+# Modos de búsqueda de la página de búsqueda
+SEARCH_MODES = ('palabras', 'frase', 'avanzada')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    file_key TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    duration REAL,
+    language TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_file ON segments(file_id, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def build_match_query(query: str, mode: str = 'palabras') -> str:
+    """
+    Translate user input into an FTS5 MATCH expression: every word ("palabras"),
+    the exact phrase ("frase") or raw FTS5 syntax ("avanzada").
+    """
+    if mode == 'avanzada':
+        return query.strip()
+    terms = [term.replace('"', '""') for term in query.split()]
+    if not terms:
+        return ''
+    if mode == 'frase':
+        return '"' + ' '.join(terms) + '"'
+    return ' AND '.join(f'"{term}"' for term in terms)
+
+
+class TranscriptIndex:
+    """
+    Índice persistente de transcripciones en SQLite con búsqueda de texto
+    completo (FTS5, sin distinguir mayúsculas ni tildes).
+
+    Cada archivo se identifica por una clave estable (p. ej. hash del ZIP y ruta
+    relativa): volver a indexarlo reemplaza sus segmentos en lugar de duplicarlos.
+    """
+
+    def __init__(self, path: str = TRANSCRIPT_DB):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Una conexión por operación: Streamlit ejecuta cada sesión en su propio hilo
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start_run(self, source: str, metadata: Optional[Dict] = None) -> int:
+        """Register a transcription run (page, model, profile, keywords...)"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO runs (created_at, source, metadata) VALUES (?, ?, ?)',
+                (time.time(), source, json.dumps(metadata or {}, ensure_ascii=False))
+            )
+            return cursor.lastrowid
+
+    def add_transcript(self, run_id: int, file_key: str, filename: str, segments: List[Dict],
+                       duration: Optional[float] = None, language: Optional[str] = None) -> int:
+        """Store (or replace) the segments of one transcribed file"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM files WHERE file_key = ?', (file_key,))
+            file_id = conn.execute(
+                'INSERT INTO files (run_id, file_key, filename, duration, language, indexed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (run_id, file_key, filename, duration, language, time.time())
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO segments (file_id, position, start, end, text) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (file_id, position, float(segment['start']), float(segment['end']), segment.get('text', '').strip())
+                    for position, segment in enumerate(segments)
+                ]
+            )
+            return file_id
+
+    def search(self, query: str, mode: str = 'palabras', limit: int = 200,
+               mark_start: str = '<mark>', mark_end: str = '</mark>') -> List[Dict]:
+        """Matching segments ordered by relevance, with a highlighted snippet"""
+        match = build_match_query(query, mode)
+        if not match:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT files.filename, files.file_key, runs.created_at, runs.source,
+                       segments.position, segments.start, segments.end,
+                       snippet(segments_fts, 0, ?, ?, '…', 24) AS snippet
+                FROM segments_fts
+                JOIN segments ON segments.id = segments_fts.rowid
+                JOIN files ON files.id = segments.file_id
+                JOIN runs ON runs.id = files.run_id
+                WHERE segments_fts MATCH ?
+                ORDER BY bm25(segments_fts)
+                LIMIT ?
+                """,
+                (mark_start, mark_end, match, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of runs, files and segments in the index"""
+        with self._connect() as conn:
+            return {
+                table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('runs', 'files', 'segments')
+            }
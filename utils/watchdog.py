@@ -0,0 +1,190 @@
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Límite por archivo: margen fijo + duración x RTF x factor (configurable por entorno)
+WATCHDOG_MIN_SECONDS = float(os.environ.get('WATCHDOG_MIN_SECONDS', '60'))
+WATCHDOG_FACTOR = float(os.environ.get('WATCHDOG_FACTOR', '4'))
+WATCHDOG_LOAD_SECONDS = float(os.environ.get('WATCHDOG_LOAD_SECONDS', '600'))
+DEFAULT_RTF = 1.0
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def watchdog_timeout(duration: float, rtf: Optional[float] = None) -> float:
+    """Wall-clock limit for transcribing a file of `duration` seconds"""
+    return WATCHDOG_MIN_SECONDS + max(0.0, duration) * (rtf or DEFAULT_RTF) * WATCHDOG_FACTOR
+
+
+def _json_default(value):
+    """numpy values inside Whisper results"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+class TranscriptionWorker:
+    """
+    Proceso hijo con su propio backend que transcribe un archivo por petición.
+
+    Cada petición tiene un tiempo límite: si ffmpeg o el modelo se cuelgan (p.
+    ej. un archivo corrupto o un bucle de repeticiones), se mata el grupo de
+    procesos completo y el archivo se devuelve como error. El proceso se vuelve
+    a lanzar en la siguiente petición. Una instancia atiende una petición a la
+    vez; `close()` puede llamarse desde otro hilo para abortar la que esté en curso.
+    """
+
+    def __init__(self, backend: str, model_name: Optional[str] = None, quantized: Optional[bool] = None,
+                 engine: Optional[str] = None, fast_model: Optional[str] = None):
+        self.config = {'backend': backend, 'model_name': model_name, 'quantized': quantized,
+                       'engine': engine, 'fast_model': fast_model}
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._replies: Optional[queue.Queue] = None
+        self._closed = False
+
+    def _start(self) -> Optional[str]:
+        """Launch the child and wait for its model; returns an error message on failure"""
+        with self._lock:
+            if self._closed:
+                return "Procesamiento detenido"
+            if self._proc is not None and self._proc.poll() is None:
+                return None
+            self._proc = subprocess.Popen(
+                [sys.executable, '-m', 'utils.watchdog'], cwd=REPO_ROOT,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8',
+                # Grupo de procesos propio: matarlo también mata el ffmpeg que esté decodificando
+                start_new_session=(os.name == 'posix')
+            )
+            self._replies = queue.Queue()
+            threading.Thread(target=self._read, args=(self._proc.stdout, self._replies), daemon=True).start()
+            self._send(self.config)
+        reply = self._wait(WATCHDOG_LOAD_SECONDS)
+        if self._closed:
+            return "Procesamiento detenido"
+        if reply is None:
+            self._kill()
+            return f"El modelo no cargó en {WATCHDOG_LOAD_SECONDS:.0f} s"
+        if not reply.get('ready'):
+            self._kill()
+            return f"Error cargando modelo Whisper: {reply.get('error')}"
+        return None
+
+    @staticmethod
+    def _read(stream, replies: queue.Queue) -> None:
+        for line in stream:
+            try:
+                replies.put(json.loads(line))
+            except ValueError:
+                continue
+        # Fin del proceso (normal, muerto o matado)
+        replies.put({'exited': True})
+
+    def _send(self, message: Dict) -> None:
+        self._proc.stdin.write(json.dumps(message) + '\n')
+        self._proc.stdin.flush()
+
+    def _wait(self, timeout: float) -> Optional[Dict]:
+        try:
+            reply = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return {'ready': False, 'error': 'el proceso terminó'} if reply.get('exited') else reply
+
+    def _kill(self) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            if os.name == 'posix':
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+        except OSError:
+            proc.kill()
+        proc.wait()
+
+    def transcribe(self, audio_path: str, timeout: float, language: str = 'es', streaming: bool = False,
+                   profile: Optional[str] = None, cascade_keywords: Optional[List[str]] = None) -> Dict:
+        """Transcribe in the child; on timeout or crash the child is killed and an error is returned"""
+        error = self._start()
+        if error:
+            return {"error": error}
+        request = {'path': audio_path, 'language': language, 'streaming': streaming,
+                   'profile': profile, 'cascade_keywords': cascade_keywords}
+        try:
+            self._send(request)
+        except (OSError, ValueError, AttributeError):
+            self._kill()
+            return {"error": "Procesamiento detenido" if self._closed else "El proceso de transcripción terminó"}
+        reply = self._wait(timeout)
+        if reply is None:
+            self._kill()
+            return {"error": f"Tiempo límite excedido ({timeout:.0f} s): transcripción abortada"}
+        if 'result' not in reply:
+            self._kill()
+            return {"error": "Procesamiento detenido" if self._closed
+                    else f"El proceso de transcripción terminó inesperadamente ({reply.get('error')})"}
+        return reply['result']
+
+    def close(self) -> None:
+        """Stop the child, aborting any request in progress"""
+        with self._lock:
+            self._closed = True
+        self._kill()
+
+
+def _serve() -> None:
+    """Child loop: config line, then one JSON request per line"""
+    # El protocolo usa el stdout original; cualquier print de las librerías va a stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    def reply(message: Dict) -> None:
+        protocol.write(json.dumps(message, default=_json_default) + '\n')
+        protocol.flush()
+
+    from utils.backends import create_backend
+    from utils.batch import transcribe_file
+    from utils.profiles import DEFAULT_PROFILE
+
+    config = json.loads(sys.stdin.readline() or '{}')
+    try:
+        backend = create_backend(config['backend'], model_name=config.get('model_name'),
+                                 quantized=config.get('quantized'), engine=config.get('engine'))
+    except Exception as e:
+        reply({'ready': False, 'error': str(e)})
+        return
+    reply({'ready': True})
+
+    fast_backend = None
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get('cascade_keywords') and fast_backend is None:
+            # Modelo rápido de la cascada solo si se usa
+            try:
+                fast_backend = create_backend(config['backend'], model_name=config.get('fast_model'),
+                                              quantized=config.get('quantized'), engine=config.get('engine'))
+            except Exception as e:
+                reply({'result': {"error": f"Error cargando modelo rápido: {e}"}})
+                continue
+        result = transcribe_file(backend, request['path'], language=request.get('language') or 'es',
+                                 streaming=request.get('streaming', False),
+                                 profile=request.get('profile') or DEFAULT_PROFILE,
+                                 cascade_keywords=request.get('cascade_keywords'), fast_backend=fast_backend)
+        reply({'result': result})
+
+
+if __name__ == '__main__':
+    _serve()
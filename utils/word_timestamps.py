@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.keywords import FuzzyVocabulary, TokenIndex, clean_keywords, tokenize
+from utils.streaming import SAMPLE_RATE
+
+# Margen de audio alrededor del segmento para que la alineación no corte palabras
+ALIGN_PADDING_SECONDS = 0.5
+# Whisper alinea como máximo 30 s por llamada
+MAX_ALIGN_SECONDS = 30.0
+
+def keyword_word_spans(words: List[Dict], keyword: str, tolerance: int = 0) -> List[List[int]]:
+    """[first, last] indices of the aligned words that spell `keyword` as whole tokens"""
+    tokens, owners = [], []
+    for index, word in enumerate(words):
+        for token in tokenize(word['word']):
+            tokens.append(token)
+            owners.append(index)
+
+    if tolerance > 0:
+        options = FuzzyVocabulary(tokens).expand(keyword, tolerance)
+    else:
+        options = [{term} for term in tokenize(keyword)]
+    size = len(options)
+    if not size:
+        return []
+    return [
+        [owners[i], owners[i + size - 1]]
+        for i in range(len(tokens) - size + 1) if all(tokens[i + k] in options[k] for k in range(size))
+    ]
+
+
+def refine_keyword_hits(backend, audio: np.ndarray, segments: List[Dict], keywords: List[str],
+                        language: str = 'es', padding: float = ALIGN_PADDING_SECONDS,
+                        token_index: Optional[TokenIndex] = None, tolerance: int = 0,
+                        vocabulary: Optional[FuzzyVocabulary] = None) -> List[Dict]:
+    """
+    Marcas de tiempo por palabra solo para los segmentos con palabras clave.
+
+    Cada segmento con coincidencia se alinea por separado (con un pequeño margen),
+    así que el coste crece con el número de aciertos y no con la duración del
+    archivo. Devuelve una entrada por acierto con su tiempo absoluto.
+    """
+    keywords = clean_keywords(keywords)
+    token_index = token_index or TokenIndex.from_segments(segments)
+    matched_by_segment: Dict[int, List[str]] = {}
+    for keyword in keywords:
+        for index in token_index.occurrences(keyword, tolerance, vocabulary):
+            matched_by_segment.setdefault(index, []).append(keyword)
+
+    duration = len(audio) / SAMPLE_RATE
+    hits: List[Dict] = []
+
+    for index in sorted(matched_by_segment):
+        segment, matched = segments[index], matched_by_segment[index]
+        text = segment.get('text', '')
+
+        start = max(segment['start'] - padding, 0.0)
+        end = min(segment['end'] + padding, duration, start + MAX_ALIGN_SECONDS)
+        clip = np.asarray(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], dtype=np.float32)
+        try:
+            words = backend.align_words(clip, text, language=language)
+        except Exception:
+            words = []
+
+        for keyword in matched:
+            spans = keyword_word_spans(words, keyword, tolerance)
+            if not spans:
+                # Sin alineación utilizable: se conserva el rango del segmento
+                hits.append({'keyword': keyword, 'text': keyword, 'segment': index,
+                             'start': segment['start'], 'end': segment['end'], 'aligned': False})
+                continue
+            for first, last in spans:
+                hits.append({
+                    'keyword': keyword,
+                    'text': ''.join(w['word'] for w in words[first:last + 1]).strip(),
+                    'segment': index,
+                    'start': round(start + words[first]['start'], 3),
+                    'end': round(start + words[last]['end'], 3),
+                    'aligned': True,
+                })
+
+    return hits
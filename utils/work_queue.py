@@ -0,0 +1,570 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.cancellation import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# Cola compartida entre nodos: base de datos y audios de los lotes (configurable por entorno)
+WORK_QUEUE_DIR = os.environ.get(
+    'WORK_QUEUE_DIR',
+    os.path.join(os.environ.get('TEMP_DIR', tempfile.gettempdir()), 'isteraudio_work')
+)
+WORK_QUEUE_DB = os.environ.get('WORK_QUEUE_DB', os.path.join(WORK_QUEUE_DIR, 'cola.sqlite'))
+WORK_LEASE_SECONDS = float(os.environ.get('WORK_LEASE_SECONDS', '120'))
+WORK_MAX_ATTEMPTS = int(os.environ.get('WORK_MAX_ATTEMPTS', '3'))
+WORK_POLL_SECONDS = 2.0
+STOP_UNFINISHED = 'elementos sin terminar en los nodos'
+
+# Estados de un elemento de trabajo
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    base_dir TEXT NOT NULL,
+    params TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    batch_id TEXT NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    path TEXT NOT NULL,
+    start_time REAL NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    result TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (batch_id, key)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items(state, batch_id, duration);
+"""
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@dataclass
+class WorkItem:
+    """Un archivo (o un fragmento de un archivo largo) de un lote en la cola"""
+    id: int
+    batch_id: str
+    key: str
+    parent: str
+    path: str
+    start_time: float
+    duration: float
+    attempts: int
+    lease_owner: Optional[str] = None
+    lease_token: Optional[str] = None
+
+
+class WorkQueue:
+    """
+    Cola de trabajo compartida en SQLite para repartir lotes entre varios nodos.
+
+    Cada nodo reclama un elemento con un arrendamiento (lease) de duración
+    limitada y lo renueva mientras lo procesa. Si el nodo muere, el arrendamiento
+    caduca y el siguiente reclamo lo vuelve a poner en cola (hasta
+    WORK_MAX_ATTEMPTS intentos). Solo quien tiene el arrendamiento vigente puede
+    entregar el resultado, de modo que un nodo que se recupera tarde no pisa el
+    trabajo de otro. La base de datos y los audios deben estar en un disco
+    compartido con bloqueos fiables (mismo equipo o NFS/SMB con bloqueo).
+    """
+
+    def __init__(self, path: str = WORK_QUEUE_DB):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(self.directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Una conexión por operación: los hilos de un nodo no comparten conexiones
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create_batch(self, base_dir: str, params: Dict, items: List[Dict], batch_id: Optional[str] = None) -> str:
+        """Register a batch and queue its items (dicts with key, parent, path, start_time, duration)"""
+        batch_id = batch_id or new_batch_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT INTO batches (id, created_at, base_dir, params) VALUES (?, ?, ?, ?)',
+                         (batch_id, now, base_dir, json.dumps(params, ensure_ascii=False)))
+            conn.executemany(
+                'INSERT INTO items (batch_id, key, parent, path, start_time, duration, state, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(batch_id, item['key'], item['parent'], item['path'], item.get('start_time', 0.0),
+                  item.get('duration', 0.0), QUEUED, now) for item in items]
+            )
+        return batch_id
+
+    def batch(self, batch_id: str) -> Optional[Dict]:
+        """Batch parameters and base directory, or None if unknown"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM batches WHERE id = ?', (batch_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row['params']), id=row['id'], base_dir=row['base_dir'], created_at=row['created_at'])
+
+    def _requeue_expired(self, conn, now: float) -> None:
+        # Arrendamientos caducados: nodo muerto o colgado. Tras WORK_MAX_ATTEMPTS, el elemento falla
+        conn.execute(
+            'UPDATE items SET state = ?, result = ?, lease_token = NULL, updated_at = ? '
+            'WHERE state = ? AND lease_expires < ? AND attempts >= ?',
+            (FAILED, json.dumps({"error": f"Abandonado tras {WORK_MAX_ATTEMPTS} intentos sin respuesta del nodo"}),
+             now, LEASED, now, WORK_MAX_ATTEMPTS)
+        )
+        conn.execute(
+            'UPDATE items SET state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL, '
+            'updated_at = ? WHERE state = ? AND lease_expires < ?',
+            (QUEUED, now, LEASED, now)
+        )
+
+    def claim(self, owner: str, lease_seconds: float = WORK_LEASE_SECONDS,
+              batch_id: Optional[str] = None) -> Optional[WorkItem]:
+        """
+        Lease the next item: oldest batch first and, inside it, the longest
+        item first (LPT). Returns None when nothing is queued.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Bloqueo de escritura desde el principio: dos nodos nunca reclaman el mismo elemento
+            conn.execute('BEGIN IMMEDIATE')
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                'SELECT items.* FROM items JOIN batches ON batches.id = items.batch_id '
+                'WHERE items.state = ? AND (? IS NULL OR items.batch_id = ?) '
+                'ORDER BY batches.created_at, items.duration DESC, items.id LIMIT 1',
+                (QUEUED, batch_id, batch_id)
+            ).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute(
+                'UPDATE items SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_token = ?, '
+                'lease_expires = ?, updated_at = ? WHERE id = ?',
+                (LEASED, owner, token, now + lease_seconds, now, row['id'])
+            )
+        return WorkItem(row['id'], row['batch_id'], row['key'], row['parent'], row['path'], row['start_time'],
+                        row['duration'], row['attempts'] + 1, owner, token)
+
+    def _update_leased(self, item: WorkItem, assignments: str, values: Tuple) -> bool:
+        """Update an item only while `item` still holds its lease"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f'UPDATE items SET {assignments}, updated_at = ? WHERE id = ? AND state = ? AND lease_token = ?',
+                values + (time.time(), item.id, LEASED, item.lease_token)
+            )
+            return cursor.rowcount == 1
+
+    def renew(self, item: WorkItem, lease_seconds: float = WORK_LEASE_SECONDS) -> bool:
+        """Extend the lease; False if it was lost (expired and claimed again)"""
+        return self._update_leased(item, 'lease_expires = ?', (time.time() + lease_seconds,))
+
+    def complete(self, item: WorkItem, result: Dict) -> bool:
+        """Store the result (a transcription or its error); False if the lease was lost"""
+        return self._update_leased(item, 'state = ?, result = ?, lease_token = NULL',
+                                   (DONE, json.dumps(result, ensure_ascii=False)))
+
+    def release(self, item: WorkItem, error: str) -> bool:
+        """
+        Devuelve a la cola un elemento que el nodo no pudo procesar (modelo que
+        no carga, lote ilegible...). Tras WORK_MAX_ATTEMPTS falla con `error`.
+        """
+        if item.attempts >= WORK_MAX_ATTEMPTS:
+            return self._update_leased(item, 'state = ?, result = ?, lease_token = NULL',
+                                       (FAILED, json.dumps({"error": error}, ensure_ascii=False)))
+        return self._update_leased(item, 'state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL',
+                                   (QUEUED,))
+
+    def progress(self, batch_id: str) -> Dict:
+        """Item counts and audio seconds per state; expired leases are re-queued first"""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._requeue_expired(conn, time.time())
+            rows = conn.execute(
+                'SELECT state, COUNT(*) AS items, SUM(duration) AS seconds FROM items '
+                'WHERE batch_id = ? GROUP BY state', (batch_id,)
+            ).fetchall()
+        counts = {state: 0 for state in (QUEUED, LEASED, DONE, FAILED)}
+        seconds = dict.fromkeys(counts, 0.0)
+        for row in rows:
+            counts[row['state']] = row['items']
+            seconds[row['state']] = row['seconds'] or 0.0
+        total_seconds = sum(seconds.values())
+        return dict(counts, total=sum(counts.values()), total_seconds=total_seconds,
+                    done_seconds=seconds[DONE] + seconds[FAILED],
+                    fraction=(seconds[DONE] + seconds[FAILED]) / total_seconds if total_seconds else 1.0)
+
+    def has_open_items(self, batch_id: Optional[str] = None) -> bool:
+        """Whether any item is still queued or leased"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM items JOIN batches ON batches.id = items.batch_id '
+                'WHERE items.state IN (?, ?) AND (? IS NULL OR items.batch_id = ?) LIMIT 1',
+                (QUEUED, LEASED, batch_id, batch_id)
+            ).fetchone()
+        return row is not None
+
+    def results(self, batch_id: str) -> List[Tuple[WorkItem, Optional[Dict]]]:
+        """Every item of the batch with its result (None while not finished)"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM items WHERE batch_id = ? ORDER BY id', (batch_id,)).fetchall()
+        return [(WorkItem(row['id'], row['batch_id'], row['key'], row['parent'], row['path'], row['start_time'],
+                          row['duration'], row['attempts'], row['lease_owner']),
+                 json.loads(row['result']) if row['result'] else None) for row in rows]
+
+
+class LeaseKeeper:
+    """Renew an item's lease in the background while it is being processed"""
+
+    def __init__(self, work_queue: WorkQueue, item: WorkItem, lease_seconds: float = WORK_LEASE_SECONDS):
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(work_queue, item, lease_seconds), daemon=True)
+
+    def _run(self, work_queue: WorkQueue, item: WorkItem, lease_seconds: float) -> None:
+        while not self._stop.wait(lease_seconds / 3):
+            try:
+                if not work_queue.renew(item, lease_seconds):
+                    self.lost = True
+                    return
+            except sqlite3.Error:
+                # Base de datos ocupada o disco compartido caído: reintentar en la próxima vuelta
+                continue
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+@dataclass
+class NodeOptions:
+    """Modelo y paralelismo de un nodo; las opciones de decodificación vienen de cada lote"""
+    workers: int = 1
+    watchdog: bool = True
+    backend: Optional[str] = None
+    model_name: Optional[str] = None
+    quantized: Optional[bool] = None
+    engine: Optional[str] = None
+    lease_seconds: float = WORK_LEASE_SECONDS
+
+
+def _compact_result(result: Dict) -> Dict:
+    """What collecting needs from a transcription: text, plain segments, timing and error"""
+    if result.get("error"):
+        return {"error": result["error"]}
+    return {
+        "text": result.get("text", ""),
+        "segments": [{"start": float(seg["start"]), "end": float(seg["end"]), "text": seg["text"]}
+                     for seg in result.get("segments", [])],
+        "processing_time": float(result.get("processing_time") or 0.0),
+        "duration": float(result.get("duration") or 0.0),
+        "error": None,
+    }
+
+
+def enqueue_batch(work_queue: WorkQueue, audio_files: List[str], base_dir: str, options,
+                  chunk_minutes: int = 0, emit: Optional[Callable[[str, Dict], None]] = None) -> str:
+    """
+    Encola un lote: un elemento por archivo original (los duplicados esperan su
+    resultado al recoger) y, con `chunk_minutes`, los archivos más largos se
+    dividen por silencios en fragmentos WAV que se reparten por separado.
+    `options` es un BatchOptions; `base_dir` debe ser visible para todos los nodos.
+    """
+    from utils.batch import find_duplicate_audio, validate_audio_file
+    from utils.scheduling import probe_durations
+    from utils.splitter import divide_audio_advanced
+
+    emit = emit or (lambda event, data: None)
+    valid_files = [f for f in audio_files if validate_audio_file(f)]
+    duplicates = find_duplicate_audio(valid_files)
+    originals = [f for f in valid_files if f not in duplicates]
+    durations = probe_durations(originals)
+
+    items = []
+    batch_id = new_batch_id()
+    # Fragmentos junto a la cola (disco compartido), fuera del directorio de entrada
+    chunks_dir = os.path.join(work_queue.directory, 'fragmentos', batch_id)
+    for position, audio_file in enumerate(originals):
+        key = os.path.relpath(audio_file, base_dir)
+        duration = durations.get(audio_file, 0.0)
+        if not chunk_minutes or duration <= chunk_minutes * 60 * 1.5:
+            items.append({"key": key, "parent": key, "path": audio_file, "duration": duration})
+            continue
+        # Cortes en silencios y sin fundidos: el audio de cada fragmento queda intacto.
+        # Cada paso de la división trae la lista acumulada; la última tiene todos los fragmentos
+        segments = []
+        for _, segments in divide_audio_advanced(audio_file, interval_minutes=chunk_minutes, fade_duration=0,
+                                                 output_format='wav', output_dir=os.path.join(chunks_dir, str(position))):
+            continue
+        items.extend({"key": f"{key}#{i:03d}", "parent": key, "path": segment.filepath,
+                      "start_time": segment.start_time, "duration": segment.duration_seconds}
+                     for i, segment in enumerate(segments, 1))
+        emit("chunked", {"file": key, "duration_seconds": duration, "chunks": len(segments)})
+
+    valid = set(valid_files)
+    params = {
+        "options": asdict(options),
+        "files": [os.path.relpath(f, base_dir) for f in valid_files],
+        "invalid": [os.path.relpath(f, base_dir) for f in audio_files if f not in valid],
+        "duplicates": {os.path.relpath(dup, base_dir): os.path.relpath(orig, base_dir)
+                       for dup, orig in duplicates.items()},
+        "chunk_minutes": chunk_minutes,
+    }
+    work_queue.create_batch(base_dir, params, items, batch_id)
+    emit("enqueued", {"batch": batch_id, "files": len(audio_files), "valid": len(valid_files),
+                      "duplicates": len(duplicates), "items": len(items),
+                      "audio_seconds": sum(item["duration"] for item in items)})
+    return batch_id
+
+
+def run_node(work_queue: WorkQueue, node: NodeOptions, emit: Optional[Callable[[str, Dict], None]] = None,
+             cancel: Optional[CancelToken] = None, batch_id: Optional[str] = None,
+             exit_when_idle: bool = False, owner: Optional[str] = None) -> int:
+    """
+    Nodo de trabajo: `node.workers` hilos, cada uno con su réplica del modelo
+    (con vigilancia, un proceso hijo), reclaman elementos de la cola, los
+    transcriben con las opciones de su lote y entregan el resultado. Con
+    `exit_when_idle` termina cuando no queda nada en cola ni en curso; si no,
+    espera trabajo nuevo hasta `cancel`. Devuelve los elementos entregados.
+    """
+    import socket
+
+    from utils.backends import DEFAULT_BACKEND, create_backend
+    from utils.batch import transcribe_file
+    from utils.cascade import CASCADE_FAST_MODEL
+    from utils.watchdog import TranscriptionWorker, watchdog_timeout
+
+    emit = emit or (lambda event, data: None)
+    cancel = cancel or CancelToken()
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    backend_name = node.backend or DEFAULT_BACKEND
+    backend_options = {"model_name": node.model_name, "quantized": node.quantized, "engine": node.engine}
+    batches: Dict[str, Dict] = {}
+    completed = []
+    lock = threading.Lock()
+
+    def batch_options(item: WorkItem) -> Dict:
+        with lock:
+            if item.batch_id not in batches:
+                batch = work_queue.batch(item.batch_id)
+                if batch is None:
+                    raise ValueError(f"Lote desconocido: {item.batch_id}")
+                batches[item.batch_id] = batch["options"]
+            return batches[item.batch_id]
+
+    def process(item: WorkItem, watchdog, replica: Dict) -> Tuple[Dict, bool]:
+        """Transcribe one leased item; returns its result and whether it was delivered"""
+        options = batch_options(item)
+        cascade_keywords = options["keywords"] if options["cascade"] else None
+        transcribe_options = {"language": options["language"], "streaming": options["streaming"],
+                              "profile": options["profile"], "cascade_keywords": cascade_keywords}
+        with LeaseKeeper(work_queue, item, node.lease_seconds) as keeper:
+            if watchdog is not None:
+                result = watchdog.transcribe(item.path, watchdog_timeout(item.duration), **transcribe_options)
+            else:
+                # Réplica propia del hilo; el modelo rápido solo si algún lote usa cascada
+                if "backend" not in replica:
+                    replica["backend"] = create_backend(backend_name, **backend_options)
+                if cascade_keywords and "fast" not in replica:
+                    replica["fast"] = create_backend(
+                        backend_name, **dict(backend_options, model_name=CASCADE_FAST_MODEL))
+                result = transcribe_file(replica["backend"], item.path, fast_backend=replica.get("fast"),
+                                         **transcribe_options)
+        return result, not keeper.lost and work_queue.complete(item, _compact_result(result))
+
+    def serve(slot: int) -> None:
+        watchdog = TranscriptionWorker(backend_name, fast_model=CASCADE_FAST_MODEL, **backend_options) \
+            if node.watchdog else None
+        replica = {}
+        try:
+            while not cancel.cancelled:
+                try:
+                    item = work_queue.claim(owner, node.lease_seconds, batch_id)
+                    idle = item is None and exit_when_idle and not work_queue.has_open_items(batch_id)
+                except sqlite3.Error as e:
+                    # Base de datos bloqueada o disco compartido caído: esperar y reintentar
+                    logger.warning("No se pudo reclamar trabajo de la cola: %s", e)
+                    cancel.wait(WORK_POLL_SECONDS)
+                    continue
+                if idle:
+                    return
+                if item is None:
+                    # Nada en cola: esperar (o a que caduque el arrendamiento de otro nodo)
+                    cancel.wait(WORK_POLL_SECONDS)
+                    continue
+                try:
+                    result, delivered = process(item, watchdog, replica)
+                except Exception as e:
+                    # Fallo del nodo, no del audio: el elemento vuelve a la cola para otro intento
+                    logger.exception("Error procesando %s del lote %s", item.key, item.batch_id)
+                    error = f"{type(e).__name__}: {e}"
+                    try:
+                        work_queue.release(item, error)
+                    except sqlite3.Error:
+                        pass  # el arrendamiento caducará solo
+                    emit("item", {"batch": item.batch_id, "item": item.key, "slot": slot, "attempt": item.attempts,
+                                  "status": "error", "error": error, "duration": item.duration,
+                                  "processing_time": None})
+                    cancel.wait(WORK_POLL_SECONDS)
+                    continue
+                if delivered:
+                    with lock:
+                        completed.append(item.key)
+                emit("item", {"batch": item.batch_id, "item": item.key, "slot": slot, "attempt": item.attempts,
+                              "status": "lost" if not delivered else "error" if result.get("error") else "ok",
+                              "error": result.get("error"), "duration": item.duration,
+                              "processing_time": result.get("processing_time")})
+        finally:
+            if watchdog is not None:
+                watchdog.close()
+
+    emit("node", {"owner": owner, "workers": node.workers, "batch": batch_id})
+    threads = [threading.Thread(target=serve, args=(slot,), daemon=True) for slot in range(node.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    emit("done", {"owner": owner, "items": len(completed), "stop_reason": cancel.reason})
+    return len(completed)
+
+
+def merge_chunks(chunks: List[Tuple[WorkItem, Dict]]) -> Dict:
+    """Join the transcriptions of a file's chunks, shifting segments to the file's timeline"""
+    chunks = sorted(chunks, key=lambda chunk: chunk[0].start_time)
+    for item, result in chunks:
+        if result.get("error"):
+            return {"error": f"{item.key}: {result['error']}" if len(chunks) > 1 else result["error"]}
+    segments = [dict(seg, start=seg["start"] + item.start_time, end=seg["end"] + item.start_time)
+                for item, result in chunks for seg in result.get("segments", [])]
+    return {
+        "text": " ".join(result.get("text", "").strip() for _, result in chunks).strip(),
+        "segments": segments,
+        "processing_time": sum(result.get("processing_time", 0.0) for _, result in chunks),
+        "duration": sum(result.get("duration", 0.0) for _, result in chunks),
+        "error": None,
+    }
+
+
+def collect_batch(work_queue: WorkQueue, batch_id: str, output_dir: str,
+                  emit: Optional[Callable[[str, Dict], None]] = None, cancel: Optional[CancelToken] = None,
+                  wait: bool = True, index_source: Optional[str] = 'cola'):
+    """
+    Recoge un lote de la cola con el mismo análisis que `run_batch`: palabras
+    clave, marcas por palabra, duplicados, TXT/SRT en `output_dir` e indexado.
+    Con `wait`, espera (emitiendo "progress") a que los nodos terminen o a
+    `cancel`; lo que no haya terminado queda en `pending`. Devuelve un BatchRun.
+    """
+    from utils.backends import create_backend
+    from utils.batch import BatchOptions, BatchRun, process_transcriptions
+    from utils.transcript_index import TranscriptIndex
+
+    emit = emit or (lambda event, data: None)
+    cancel = cancel or CancelToken()
+    batch = work_queue.batch(batch_id)
+    if batch is None:
+        raise ValueError(f"Lote desconocido: {batch_id}")
+    options = BatchOptions(**batch["options"])
+    base_dir = batch["base_dir"]
+    start_total = time.time()
+
+    last_done = None
+    while wait and not cancel.cancelled:
+        progress = work_queue.progress(batch_id)
+        if (progress[DONE], progress[FAILED]) != last_done:
+            last_done = (progress[DONE], progress[FAILED])
+            emit("progress", dict(progress, batch=batch_id))
+        if not progress[QUEUED] and not progress[LEASED]:
+            break
+        cancel.wait(WORK_POLL_SECONDS)
+
+    by_file: Dict[str, List[Tuple[WorkItem, Optional[Dict]]]] = {}
+    for item, result in work_queue.results(batch_id):
+        by_file.setdefault(item.parent, []).append((item, result))
+    finished = []
+    for key, chunks in by_file.items():
+        if all(result is not None for _, result in chunks):
+            finished.append((os.path.join(base_dir, key), merge_chunks(chunks)))
+    pending_duplicates: Dict[str, List[str]] = {}
+    for duplicate, original in batch["duplicates"].items():
+        pending_duplicates.setdefault(os.path.join(base_dir, original), []).append(os.path.join(base_dir, duplicate))
+
+    run = BatchRun(invalid=batch["invalid"])
+    os.makedirs(output_dir, exist_ok=True)
+    aligner = create_backend(options.backend, model_name=options.model_name, quantized=options.quantized,
+                             engine=options.engine) if finished else None
+    transcript_index = TranscriptIndex() if index_source and finished else None
+    run_id = transcript_index.start_run(index_source, {
+        "batch": batch_id, "backend": options.backend, "model": options.model_name, "profile": options.profile,
+        "cascade": options.cascade, "keywords": options.keywords,
+    }) if transcript_index else None
+
+    finished_keys = set()
+    outcomes = process_transcriptions(finished, options.keywords, output_dir, pending_duplicates, aligner=aligner,
+                                      tolerance=options.tolerance, vocabulary=run.vocabulary, base_dir=base_dir)
+    for file_outcomes in outcomes:
+        for outcome in file_outcomes:
+            key = os.path.relpath(outcome.audio_file, base_dir)
+            finished_keys.add(key)
+            event = {"file": key, "duplicate_of": os.path.relpath(outcome.original, base_dir) if outcome.original else None}
+            if outcome.error:
+                run.errors.append((key, outcome.error))
+                event.update(status="error", error=outcome.error)
+            else:
+                result = outcome.result
+                run.results.append(result)
+                if transcript_index:
+                    segments = outcome.transcription.get("segments", [])
+                    transcript_index.add_transcript(
+                        run_id, f"{batch_id}:{key}", result.filename, segments,
+                        duration=segments[-1]["end"] if segments else 0.0, language=options.language
+                    )
+                event.update(status="ok", duration=result.duration, keywords=result.keyword_counts or {},
+                             warning=outcome.warning)
+            emit("file", event)
+
+    positions = {key: i for i, key in enumerate(batch["files"])}
+    run.results.sort(key=lambda r: positions.get(os.path.relpath(r.filepath, base_dir), len(positions)))
+    run.pending = [key for key in batch["files"] if key not in finished_keys]
+    run.stop_reason = (cancel.reason or STOP_UNFINISHED) if run.pending else None
+    if not run.pending:
+        # Lote recogido por completo: los fragmentos WAV ya no hacen falta
+        shutil.rmtree(os.path.join(work_queue.directory, 'fragmentos', batch_id), ignore_errors=True)
+    run.elapsed = time.time() - start_total
+    emit("done", {"results": len(run.results), "errors": len(run.errors), "pending": run.pending,
+                  "stop_reason": run.stop_reason, "elapsed": run.elapsed})
+    return run
@@ -0,0 +1,144 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+from pydub import AudioSegment
+
+from utils.probe import probe_audio
+
+# Las ventanas de energía se calculan por bloques de 1 minuto
+ENERGY_BLOCK_MS = 60 * 1000
+SAMPLE_WIDTH = 2  # PCM de 16 bits
+MAX_AMPLITUDE = float(2 ** (8 * SAMPLE_WIDTH - 1))
+
+
+class AudioWorkspace:
+    """
+    Audio decodificado una sola vez a PCM de 16 bits en un archivo memory-mapped.
+
+    La información del archivo, el umbral en dBFS, la búsqueda de silencios y el
+    recorte de segmentos leen directamente del mapa de memoria, de modo que
+    repetir la división con otros parámetros solo cuesta la exportación.
+    """
+
+    def __init__(self, source_path: str, directory: Optional[str] = None):
+        self.source_path = source_path
+        self.directory = directory or tempfile.mkdtemp(prefix="audio_workspace_")
+        self.pcm_path = os.path.join(self.directory, "decoded.pcm")
+
+        try:
+            probe = probe_audio(source_path)
+            self.sample_rate = probe['sample_rate'] or 44100
+            self.channels = probe['channels'] or 2
+            self.bits_per_sample = probe['bits_per_sample'] or SAMPLE_WIDTH * 8
+            self.sample_width = SAMPLE_WIDTH
+
+            self._decode()
+            raw = np.memmap(self.pcm_path, dtype=np.int16, mode='r')
+        except BaseException:
+            # Sin espacio de trabajo no hay close(): borrar aquí el directorio temporal
+            if directory is None:
+                shutil.rmtree(self.directory, ignore_errors=True)
+            raise
+        self.frame_count = len(raw) // self.channels
+        self.pcm = raw[:self.frame_count * self.channels].reshape(self.frame_count, self.channels)
+
+        self._energy_cumsum: Optional[np.ndarray] = None
+        self._count_cumsum: Optional[np.ndarray] = None
+        self._dbfs: Optional[float] = None
+
+    def _decode(self) -> None:
+        cmd = [
+            "ffmpeg", "-nostdin", "-y", "-i", self.source_path,
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(self.sample_rate), "-ac", str(self.channels),
+            self.pcm_path
+        ]
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"No se pudo decodificar el audio: {e.stderr.decode(errors='ignore')[-300:]}") from e
+
+    def __len__(self) -> int:
+        """Duration in milliseconds, rounded like pydub's AudioSegment"""
+        return round(1000 * (self.frame_count / self.sample_rate))
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frame_count / self.sample_rate
+
+    def _frame_at(self, ms):
+        """Frame index of a millisecond position (same rule as pydub slicing)"""
+        return np.minimum((np.asarray(ms, dtype=np.int64) * self.sample_rate) // 1000, self.frame_count)
+
+    def _ensure_energy(self) -> None:
+        """Compute the cumulative per-millisecond energy once, block by block"""
+        if self._energy_cumsum is not None:
+            return
+
+        n_ms = len(self)
+        bounds = self._frame_at(np.arange(n_ms + 1))
+        energy = np.zeros(n_ms, dtype=np.float64)
+
+        for m0 in range(0, n_ms, ENERGY_BLOCK_MS):
+            m1 = min(m0 + ENERGY_BLOCK_MS, n_ms)
+            f0, f1 = bounds[m0], bounds[m1]
+            block = np.asarray(self.pcm[f0:f1], dtype=np.float64)
+            frame_energy = np.concatenate([[0.0], np.cumsum((block * block).sum(axis=1))])
+            local = bounds[m0:m1 + 1] - f0
+            energy[m0:m1] = frame_energy[local[1:]] - frame_energy[local[:-1]]
+
+        self._energy_cumsum = np.concatenate([[0.0], np.cumsum(energy)])
+        self._count_cumsum = bounds * self.channels
+
+    def _window_rms(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        self._ensure_energy()
+        total = self._energy_cumsum[ends] - self._energy_cumsum[starts]
+        count = np.maximum(self._count_cumsum[ends] - self._count_cumsum[starts], 1)
+        return np.sqrt(total / count)
+
+    @property
+    def dBFS(self) -> float:
+        """Loudness of the whole file, as pydub's AudioSegment.dBFS"""
+        if self._dbfs is None:
+            rms = float(self._window_rms(np.array([0]), np.array([len(self)]))[0])
+            self._dbfs = 20 * np.log10(rms / MAX_AMPLITUDE) if rms > 0 else -float('inf')
+        return self._dbfs
+
+    def detect_silence(self, start_ms: int, end_ms: int, min_silence_len: int = 1000,
+                       silence_thresh: float = -16) -> List[List[int]]:
+        """
+        Vectorized equivalent of pydub.silence.detect_silence over [start_ms, end_ms).
+        Ranges are returned relative to `start_ms`, like on a sliced segment.
+        """
+        seg_len = end_ms - start_ms
+        if seg_len < min_silence_len:
+            return []
+
+        thresh = (10 ** (silence_thresh / 20)) * MAX_AMPLITUDE
+        starts = np.arange(0, seg_len - min_silence_len + 1)
+        rms = self._window_rms(start_ms + starts, start_ms + starts + min_silence_len)
+        silent = starts[rms <= thresh]
+        if not silent.size:
+            return []
+
+        # Igual que pydub: un nuevo rango empieza tras un hueco mayor que min_silence_len
+        breaks = np.nonzero(np.diff(silent) > min_silence_len)[0]
+        range_starts = np.concatenate([[silent[0]], silent[breaks + 1]])
+        range_ends = np.concatenate([silent[breaks], [silent[-1]]]) + min_silence_len
+        return [[int(s), int(e)] for s, e in zip(range_starts, range_ends)]
+
+    def segment(self, start_ms: int, end_ms: int) -> AudioSegment:
+        """Build a pydub AudioSegment for [start_ms, end_ms) from the memory map"""
+        f0, f1 = self._frame_at(min(start_ms, len(self))), self._frame_at(min(end_ms, len(self)))
+        data = np.ascontiguousarray(self.pcm[f0:f1]).tobytes()
+        return AudioSegment(data=data, sample_width=self.sample_width,
+                            frame_rate=self.sample_rate, channels=self.channels)
+
+    def close(self) -> None:
+        """Release the memory map and delete the workspace directory"""
+        self.pcm = None
+        shutil.rmtree(self.directory, ignore_errors=True)